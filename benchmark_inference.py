@@ -0,0 +1,348 @@
+"""
+End-to-end inference benchmark for the src/ components
+Replays data/fer2013/test faces and synthetic multi-face frames through
+FaceDetector, EmotionRecognizer, CrossDatasetEnsemble,
+ThreeDatasetEnsemble and DistilledStudent. Reports for each component:
+    - import and model load time (models are loaded eagerly here, one
+      dummy batch each), then first-call latency of the loaded component
+    - p50/p95/p99 latency per stage (detect, preprocess, inference,
+      predict = the public predict_emotion() call, frame = detect + predict)
+    - throughput at batch sizes 1..64
+    - peak RSS
+Each component runs in its own process so load time and memory are not
+mixed up between them. Results are written as JSON; --compare checks them
+against an earlier run and exits non-zero on a regression.
+
+Usage:
+    python benchmark_inference.py [--backend auto|keras|tflite] [--images 300]
+                                  [--components FaceDetector ThreeDatasetEnsemble]
+                                  [--output models/benchmarks/inference.json]
+                                  [--compare baseline.json --tolerance 0.15]
+"""
+
+import argparse
+import importlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+import cv2
+
+sys.path.append('src')
+
+from perf_stats import StageTimer, peak_rss_mb
+from dataset_cache import list_image_files
+import model_warmup
+
+TEST_DIR = 'data/fer2013/test'
+BATCH_SIZES = [1, 2, 4, 8, 16, 32, 64]
+FACES_PER_FRAME = [1, 2, 4, 8]
+
+# Component -> (module, class, accepts backend)
+COMPONENTS = {
+    'FaceDetector': ('face_detector', 'FaceDetector', False),
+    'EmotionRecognizer': ('emotion_recognizer', 'EmotionRecognizer', False),
+    'CrossDatasetEnsemble': ('cross_dataset_ensemble_imagenet', 'CrossDatasetEnsemble', True),
+    'ThreeDatasetEnsemble': ('three_dataset_ensemble', 'ThreeDatasetEnsemble', True),
+    'DistilledStudent': ('distilled_student', 'DistilledStudent', True),
+}
+
+# Constructor options: benchmark the full ensemble, not the FER_CASCADE setting
+OPTIONS = {
+    'ThreeDatasetEnsemble': {'cascade': False},
+}
+
+# Recognizer -> [(preprocess method, model attribute)] for the stage split
+MEMBERS = {
+    'EmotionRecognizer': [('preprocess_face', 'model')],
+    'CrossDatasetEnsemble': [('preprocess_fer', 'fer_model'),
+                             ('preprocess_mobilenet', 'mobilenet_model')],
+    'ThreeDatasetEnsemble': [('preprocess_fer', 'fer_model'),
+                             ('preprocess_multi', 'multi_model')],
+    'DistilledStudent': [('preprocess', 'model')],
+}
+
+
+def load_faces(count):
+    """Evenly spaced test images (all classes), as BGR"""
+    paths, labels, _ = list_image_files(TEST_DIR)
+    if not paths:
+        raise FileNotFoundError(f"No images in {TEST_DIR}")
+    step = max(1, len(paths) // count)
+    return [cv2.imread(path) for path in paths[::step][:count]]
+
+
+def synthetic_frames(faces, faces_per_frame, count, size=(640, 480), face_px=120, seed=0):
+    """
+    Frames with faces_per_frame upscaled test faces on a noisy background
+    Faces go on a grid so they never overlap.
+    """
+    rng = np.random.RandomState(seed + faces_per_frame)
+    width, height = size
+    cols = int(np.ceil(np.sqrt(faces_per_frame)))
+    rows = int(np.ceil(faces_per_frame / cols))
+    cell_w, cell_h = width // cols, height // rows
+    face_px = min(face_px, cell_w - 10, cell_h - 10)
+
+    frames = []
+    for _ in range(count):
+        frame = rng.randint(60, 190, (height, width, 3)).astype(np.uint8)
+        frame = cv2.GaussianBlur(frame, (7, 7), 0)
+        for slot in range(faces_per_frame):
+            face = cv2.resize(faces[rng.randint(len(faces))], (face_px, face_px))
+            x = (slot % cols) * cell_w + rng.randint(0, cell_w - face_px + 1)
+            y = (slot // cols) * cell_h + rng.randint(0, cell_h - face_px + 1)
+            frame[y:y + face_px, x:x + face_px] = face
+        frames.append(frame)
+    return frames
+
+
+def crop_faces(frame, boxes):
+    return [frame[max(0, y1):y2, max(0, x1):x2] for (x1, y1, x2, y2) in boxes]
+
+
+def predict_batch(name, component, faces):
+    """One batched prediction the way the apps call it"""
+    if hasattr(component, 'predict_emotions'):
+        return component.predict_emotions(faces, use_smoothing=False)
+    # EmotionRecognizer has no batch API: batch its model directly
+    preprocess, model = MEMBERS[name][0]
+    batch = np.concatenate([getattr(component, preprocess)(f) for f in faces])
+    return getattr(component, model).predict_on_batch(batch)
+
+
+def throughput(name, component, faces, seconds):
+    """Images/s at each batch size (each size runs for ~seconds)"""
+    results = {}
+    for batch_size in BATCH_SIZES:
+        batch = [faces[i % len(faces)] for i in range(batch_size)]
+        predict_batch(name, component, batch)
+        images = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < seconds:
+            predict_batch(name, component, batch)
+            images += batch_size
+        results[str(batch_size)] = images / (time.perf_counter() - start)
+    return results
+
+
+def bench_detector(detector, faces, args, timer):
+    for faces_per_frame in FACES_PER_FRAME:
+        frames = synthetic_frames(faces, faces_per_frame, args.frames)
+        detected = 0
+        for frame in frames:
+            with timer.stage(f'detect_{faces_per_frame}_faces'):
+                boxes = detector.detect_faces(frame)
+            detected += len(boxes)
+        print(f"  {faces_per_frame} face(s)/frame: detected {detected / len(frames):.2f} on average")
+
+
+def bench_recognizer(name, recognizer, faces, args, timer):
+    members = [(getattr(recognizer, p), getattr(recognizer, m)) for p, m in MEMBERS[name]]
+    # Buffer-reusing path used by predict_emotions() (all model inputs at once)
+    batched = getattr(recognizer, 'preprocessor', None)
+
+    for _ in range(args.repeats):
+        for face in faces:
+            for preprocess, model in members:
+                with timer.stage('preprocess'):
+                    x = preprocess(face)
+                with timer.stage('inference'):
+                    model.predict_on_batch(x)
+            if batched is not None:
+                with timer.stage('preprocess_batched'):
+                    batched([face])
+            with timer.stage('predict'):
+                recognizer.predict_emotion(face, use_smoothing=False)
+
+    # Full frame: detection, crops, one batched prediction
+    from face_detector import FaceDetector
+    detector = FaceDetector('haar')
+    for faces_per_frame in FACES_PER_FRAME:
+        for frame in synthetic_frames(faces, faces_per_frame, args.frames):
+            with timer.stage(f'frame_{faces_per_frame}_faces'):
+                crops = crop_faces(frame, detector.detect_faces(frame))
+                if crops:
+                    predict_batch(name, recognizer, crops)
+
+    print("  Measuring batch throughput...")
+    return throughput(name, recognizer, faces, args.seconds)
+
+
+def run_component(name, args):
+    """Benchmark one component in this process; returns its result dict"""
+    module_name, class_name, takes_backend = COMPONENTS[name]
+    faces = load_faces(args.images)
+
+    start = time.perf_counter()
+    try:
+        module = importlib.import_module(module_name)
+    except ImportError as e:
+        return {'skipped': str(e)}
+    import_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    try:
+        cls = getattr(module, class_name)
+        options = OPTIONS.get(name, {})
+        component = cls(backend=args.backend, **options) if takes_backend else cls(**options)
+        # Models load lazily: force the load (and TF import) into load_s
+        model_load_s = model_warmup.load_models(component)
+    except (ImportError, OSError, ValueError) as e:
+        return {'skipped': str(e)}
+    load_s = time.perf_counter() - start
+
+    result = {'import_s': import_s, 'load_s': load_s, 'model_load_s': model_load_s}
+    timer = StageTimer()
+
+    if name == 'FaceDetector':
+        start = time.perf_counter()
+        component.detect_faces(synthetic_frames(faces, 1, 1)[0])
+        result['first_call_ms'] = 1000 * (time.perf_counter() - start)
+        bench_detector(component, faces, args, timer)
+    else:
+        start = time.perf_counter()
+        component.predict_emotion(faces[0], use_smoothing=False)
+        result['first_call_ms'] = 1000 * (time.perf_counter() - start)
+        result['throughput'] = bench_recognizer(name, component, faces, args, timer)
+
+    result['stages'] = timer.summary()
+    result['peak_rss_mb'] = peak_rss_mb()
+    return result
+
+
+def compare(results, baseline, tolerance):
+    """
+    Print p50 latency and best throughput against a baseline run
+    Returns:
+        List of regression descriptions (empty if none)
+    """
+    regressions = []
+    print(f"\nComparison with baseline (tolerance {tolerance:.0%}):")
+    for name, current in results['components'].items():
+        previous = baseline.get('components', {}).get(name)
+        if not previous or 'stages' not in current or 'stages' not in previous:
+            continue
+        for stage, stats in current['stages'].items():
+            old = previous['stages'].get(stage)
+            if not old or not old.get('count'):
+                continue
+            change = stats['p50_ms'] / old['p50_ms'] - 1
+            flag = ''
+            if change > tolerance:
+                flag = '  ✗ REGRESSION'
+                regressions.append(f"{name}/{stage} p50 {change:+.0%}")
+            print(f"  {name:<22} {stage:<18} {old['p50_ms']:>8.2f} -> "
+                  f"{stats['p50_ms']:>8.2f} ms ({change:+.0%}){flag}")
+        if 'throughput' in current and 'throughput' in previous:
+            old_best = max(previous['throughput'].values())
+            new_best = max(current['throughput'].values())
+            change = new_best / old_best - 1
+            flag = ''
+            if change < -tolerance:
+                flag = '  ✗ REGRESSION'
+                regressions.append(f"{name} throughput {change:+.0%}")
+            print(f"  {name:<22} {'best images/s':<18} {old_best:>8.0f} -> "
+                  f"{new_best:>8.0f}    ({change:+.0%}){flag}")
+    return regressions
+
+
+def print_results(results):
+    for name, result in results['components'].items():
+        print(f"\n{name}")
+        if 'skipped' in result:
+            print(f"  skipped: {result['skipped']}")
+            continue
+        rss = result['peak_rss_mb']
+        print(f"  import {result['import_s']:.2f}s, load {result['load_s']:.2f}s, "
+              f"first call {result['first_call_ms']:.1f} ms, "
+              f"peak RSS {f'{rss:.0f} MB' if rss else 'n/a'}")
+        print(f"  {'Stage':<18} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'n':>6}")
+        for stage, stats in result['stages'].items():
+            print(f"  {stage:<18} {stats['p50_ms']:>8.2f} {stats['p95_ms']:>8.2f} "
+                  f"{stats['p99_ms']:>8.2f} {stats['count']:>6}")
+        if 'throughput' in result:
+            print("  Images/s by batch size: " + ", ".join(
+                f"{size}: {rate:.0f}" for size, rate in result['throughput'].items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--components', nargs='+', choices=list(COMPONENTS),
+                        default=list(COMPONENTS))
+    parser.add_argument('--backend', choices=['auto', 'keras', 'tflite'], default=None,
+                        help='Ensemble backend (default: $FER_BACKEND or auto)')
+    parser.add_argument('--images', type=int, default=300, help='Test faces to replay')
+    parser.add_argument('--repeats', type=int, default=2, help='Passes over the faces')
+    parser.add_argument('--frames', type=int, default=50,
+                        help='Synthetic frames per faces-per-frame setting')
+    parser.add_argument('--seconds', type=float, default=2.0,
+                        help='Measuring time per batch size')
+    parser.add_argument('--output', default='models/benchmarks/inference.json')
+    parser.add_argument('--compare', help='Baseline JSON from an earlier run')
+    parser.add_argument('--tolerance', type=float, default=0.15,
+                        help='Allowed relative slowdown before --compare fails')
+    parser.add_argument('--component', help=argparse.SUPPRESS)
+    parser.add_argument('--result', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # Child process: one component
+    if args.component:
+        result = run_component(args.component, args)
+        with open(args.result, 'w') as f:
+            json.dump(result, f)
+        return
+
+    print("=" * 70)
+    print("Inference Benchmark")
+    print("=" * 70)
+
+    results = {
+        'time': time.time(),
+        'host': {'platform': platform.platform(), 'processor': platform.processor(),
+                 'cpu_count': os.cpu_count(), 'python': platform.python_version()},
+        'config': {'backend': args.backend or os.getenv('FER_BACKEND', 'auto'),
+                   'images': args.images, 'repeats': args.repeats, 'frames': args.frames,
+                   'batch_sizes': BATCH_SIZES, 'faces_per_frame': FACES_PER_FRAME},
+        'components': {}
+    }
+
+    for name in args.components:
+        print(f"\n[{name}]")
+        with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as tmp:
+            result_path = tmp.name
+        try:
+            command = [sys.executable] + sys.argv + ['--component', name, '--result', result_path]
+            code = subprocess.call(command)
+            if code != 0:
+                results['components'][name] = {'skipped': f'benchmark process exited with {code}'}
+                continue
+            with open(result_path) as f:
+                results['components'][name] = json.load(f)
+        finally:
+            os.remove(result_path)
+
+    print_results(results)
+
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\n✓ Results saved to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n✗ {len(regressions)} regression(s): " + "; ".join(regressions))
+            sys.exit(1)
+        print("\n✓ No regressions")
+
+
+if __name__ == '__main__':
+    main()
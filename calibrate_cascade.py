@@ -0,0 +1,99 @@
+"""
+Tune the ThreeDatasetEnsemble cascade threshold (FER_CASCADE=1)
+Runs the FER2013 CNN and the three-dataset model over data/fer2013/test,
+then for each uncertainty criterion (margin, entropy) finds the threshold
+that lets the most faces skip the heavy model while the cascade stays
+within --tolerance of the full ensemble's accuracy. The criterion with
+the most skipped faces is written to models/cascade.json, which the
+ensemble reads at startup.
+
+Usage:
+    python calibrate_cascade.py [--tolerance 0.005] [--backend keras|tflite]
+                                [--dataset data/fer2013/test]
+"""
+
+import argparse
+import json
+import os
+import sys
+
+sys.path.append('src')
+
+from model_evaluation import ENSEMBLES, evaluate_variant
+from cascade import CRITERIA, CONFIG_PATH, calibrate
+
+MEMBERS = {
+    'keras': ('fer_model_best.h5', 'final_cross_dataset.h5'),
+    'tflite': ('tflite/fer_model_best.tflite', 'tflite/final_cross_dataset.tflite'),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dataset', default='data/fer2013/test')
+    parser.add_argument('--tolerance', type=float, default=0.005,
+                        help='Accepted accuracy drop vs. the full ensemble (0.005 = 0.5 points)')
+    parser.add_argument('--backend', choices=list(MEMBERS), default='keras')
+    parser.add_argument('--batch-size', type=int, default=512)
+    parser.add_argument('--threads', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--output', default=CONFIG_PATH)
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("Cascade Threshold Calibration (ThreeDatasetEnsemble)")
+    print("=" * 70)
+
+    if not os.path.isdir(args.dataset):
+        print(f"ERROR: {args.dataset} not found")
+        sys.exit(1)
+
+    cheap_name, heavy_name = MEMBERS[args.backend]
+    weights = ENSEMBLES['ThreeDatasetEnsemble' + (' (tflite)' if args.backend == 'tflite' else '')]
+
+    print(f"\n[1/2] Running both models on {args.dataset}...")
+    outputs = {}
+    for name in (cheap_name, heavy_name):
+        outputs[name] = evaluate_variant(name, args.dataset, args.batch_size, args.threads)
+        ms = 1000 * outputs[name]['seconds'] / len(outputs[name]['labels'])
+        print(f"  ✓ {name}: {ms:.2f} ms/face (batch {args.batch_size})")
+
+    cheap_probs = outputs[cheap_name]['probs']
+    ensemble_probs = weights[cheap_name] * cheap_probs + weights[heavy_name] * outputs[heavy_name]['probs']
+    labels = outputs[cheap_name]['labels']
+
+    print(f"\n[2/2] Searching thresholds (tolerance {args.tolerance * 100:.2f} points)...")
+    results = [calibrate(cheap_probs, ensemble_probs, labels, criterion, args.tolerance)
+               for criterion in CRITERIA]
+    print(f"  {'Criterion':<10} {'Threshold':>10} {'Accuracy':>9} {'Skip heavy':>11}")
+    for result in results:
+        print(f"  {result['criterion']:<10} {result['threshold']:>10.4f} "
+              f"{result['accuracy'] * 100:>8.2f}% {result['skip_fraction'] * 100:>10.1f}%")
+    best = max(results, key=lambda r: r['skip_fraction'])
+
+    # Estimated per-face model time with the cascade (batched throughput)
+    cheap_ms, heavy_ms = (1000 * outputs[name]['seconds'] / len(labels)
+                          for name in (cheap_name, heavy_name))
+    best['ms_per_face'] = {'ensemble': cheap_ms + heavy_ms,
+                           'cascade': cheap_ms + (1 - best['skip_fraction']) * heavy_ms}
+    best['backend'] = args.backend
+    best['dataset'] = args.dataset
+    best['weights'] = weights
+    best['all_criteria'] = results
+
+    print(f"\n  Ensemble accuracy: {best['ensemble_accuracy'] * 100:.2f}%  "
+          f"FER2013 CNN alone: {best['cheap_accuracy'] * 100:.2f}%")
+    print(f"  Chosen: {best['criterion']} > {best['threshold']:.4f} -> "
+          f"{best['accuracy'] * 100:.2f}%, {best['skip_fraction'] * 100:.1f}% of faces skip "
+          f"the heavy model")
+    print(f"  Model time per face: {best['ms_per_face']['ensemble']:.2f} ms -> "
+          f"{best['ms_per_face']['cascade']:.2f} ms")
+
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(best, f, indent=2)
+    print(f"\n✓ Saved to {args.output} (enable with FER_CASCADE=1)")
+
+
+if __name__ == '__main__':
+    main()
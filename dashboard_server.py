@@ -11,9 +11,16 @@ import sqlite3
 from datetime import datetime, timedelta
 import subprocess
 import json
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+import metrics
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for browser access
+# Prometheus metrics at /metrics (request timing per endpoint)
+metrics.register_flask(app)
 
 # Configuration
 DB_PATH = os.getenv('FER_DB', '/home/pi/fer_events.db')
@@ -50,12 +57,13 @@ def get_all_users():
 def regenerate_dashboards():
     """Regenerate all dashboard charts"""
     try:
-        result = subprocess.run(
-            ['python3', DASHBOARD_SCRIPT, DB_PATH],
-            capture_output=True,
-            text=True,
-            timeout=60
-        )
+        with metrics.timer('fer_stage_seconds', stage='regenerate'):
+            result = subprocess.run(
+                ['python3', DASHBOARD_SCRIPT, DB_PATH],
+                capture_output=True,
+                text=True,
+                timeout=60
+            )
         return {
             'success': result.returncode == 0,
             'stdout': result.stdout,
@@ -0,0 +1,288 @@
+"""
+Distill ThreeDatasetEnsemble into one compact student CNN
+
+Teacher: the ensemble's weighted soft probabilities
+(0.3 x FER2013 CNN + 0.7 x MobileNetV3 three-dataset model), computed once
+per image with the ensemble's own preprocessing and cached.
+Student: small depthwise-separable CNN on 48x48 (or 64x64) grayscale
+faces, trained on temperature-softened teacher targets plus the true
+labels. The result, models/student_distilled.h5, can replace the
+ensemble at inference (FER_RECOGNIZER=student).
+
+Reports test accuracy of teacher and student, how often they agree,
+and per-face CPU latency.
+
+Usage:
+    python distill_ensemble.py [--size 48|64] [--temperature 4] [--alpha 0.7]
+                               [--epochs 40] [--datasets data/fer2013 data/raf-db]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import numpy as np
+import cv2
+
+sys.path.append('src')
+
+import tensorflow as tf
+from tensorflow.keras import layers
+from tensorflow.keras.callbacks import ModelCheckpoint, EarlyStopping, ReduceLROnPlateau
+
+from three_dataset_ensemble import ThreeDatasetEnsemble
+from distilled_student import DistilledStudent
+from dataset_cache import list_image_files, pack_split, load_packed, stat_fingerprint
+from data_pipeline import augment_batch, AUTOTUNE
+
+NUM_CLASSES = 7
+
+STUDENT_AUGMENT = dict(rotation_range=10, width_shift_range=0.1, height_shift_range=0.1,
+                       zoom_range=0.1, horizontal_flip=True)
+
+
+def read_faces(paths):
+    """BGR images; raises ValueError naming the first unreadable file"""
+    faces = []
+    for path in paths:
+        img = cv2.imread(path)
+        if img is None or img.size == 0:
+            raise ValueError(f"Cannot decode {path} (python verify_dataset.py "
+                             f"--root <dataset> lists every unreadable file)")
+        faces.append(img)
+    return faces
+
+
+def teacher_targets(ensemble, directory, batch_size=256, cache_dir='data/cache/distill'):
+    """
+    Ensemble probabilities for every image of a split (cached)
+    Returns:
+        (N, 7) float32 array in list_image_files() order
+    """
+    paths, _, _ = list_image_files(directory)
+    key = '_'.join(os.path.normpath(directory).split(os.sep)[1:])
+    fingerprint = {
+        'files': stat_fingerprint(directory, paths),
+        'models': [os.path.getmtime(path) for path in ensemble.MODEL_PATHS],
+        'weights': ensemble.weights,
+        'cascade': getattr(ensemble, 'cascade', None)
+    }
+    targets_path = os.path.join(cache_dir, f"{key}_teacher.npy")
+    meta_path = os.path.join(cache_dir, f"{key}_teacher.json")
+    try:
+        with open(meta_path) as f:
+            if json.load(f) == fingerprint:
+                print(f"  ✓ Cached teacher targets for {directory}")
+                return np.load(targets_path)
+    except (OSError, ValueError):
+        pass
+
+    targets = np.zeros((len(paths), NUM_CLASSES), dtype=np.float32)
+    for start in range(0, len(paths), batch_size):
+        faces = read_faces(paths[start:start + batch_size])
+        results = ensemble.predict_emotions(faces, use_smoothing=False)
+        targets[start:start + len(faces)] = [probs for _, _, probs, _, _ in results]
+        print(f"\r  Teacher {directory}: {min(start + batch_size, len(paths))}/{len(paths)}", end='')
+    print()
+
+    os.makedirs(cache_dir, exist_ok=True)
+    np.save(targets_path, targets)
+    with open(meta_path, 'w') as f:
+        json.dump(fingerprint, f)
+    return targets
+
+
+def student_arrays(directory, size):
+    """Packed grayscale images and labels at the student's input size"""
+    pack_split(directory, (size, size), 'grayscale')
+    images, labels, _ = load_packed(directory, (size, size), 'grayscale', check=False)
+    return images, labels
+
+
+def build_student(size):
+    """Compact CNN returning logits"""
+    inputs = layers.Input(shape=(size, size, 1))
+    x = layers.Conv2D(32, 3, padding='same', use_bias=False)(inputs)
+    x = layers.BatchNormalization()(x)
+    x = layers.ReLU()(x)
+    for filters in (64, 128, 256):
+        for _ in range(2):
+            x = layers.SeparableConv2D(filters, 3, padding='same', use_bias=False)(x)
+            x = layers.BatchNormalization()(x)
+            x = layers.ReLU()(x)
+        x = layers.MaxPooling2D(2)(x)
+    x = layers.GlobalAveragePooling2D()(x)
+    x = layers.Dropout(0.3)(x)
+    logits = layers.Dense(NUM_CLASSES, name='logits')(x)
+    return tf.keras.Model(inputs, logits, name='fer_student')
+
+
+def distillation_loss(temperature, alpha):
+    """
+    alpha * T^2 * KL(teacher_T || student_T) + (1 - alpha) * CE(labels)
+    y_true packs [teacher probabilities | one-hot labels]
+    """
+    def loss(y_true, logits):
+        teacher, hard = y_true[:, :NUM_CLASSES], y_true[:, NUM_CLASSES:]
+        # Softening probabilities: softmax(log p / T) == softmax(teacher_logits / T)
+        soft_teacher = tf.nn.softmax(tf.math.log(teacher + 1e-7) / temperature)
+        log_soft_student = tf.nn.log_softmax(logits / temperature)
+        kd = -tf.reduce_sum(soft_teacher * log_soft_student, axis=1) * temperature ** 2
+        ce = tf.keras.losses.categorical_crossentropy(hard, logits, from_logits=True)
+        return alpha * kd + (1 - alpha) * ce
+    return loss
+
+
+def label_accuracy(y_true, logits):
+    return tf.cast(tf.equal(tf.argmax(y_true[:, NUM_CLASSES:], 1), tf.argmax(logits, 1)),
+                   tf.float32)
+
+
+def teacher_agreement(y_true, logits):
+    return tf.cast(tf.equal(tf.argmax(y_true[:, :NUM_CLASSES], 1), tf.argmax(logits, 1)),
+                   tf.float32)
+
+
+def make_dataset(images, targets, labels, batch_size, shuffle):
+    y = np.concatenate([targets, np.eye(NUM_CLASSES, dtype=np.float32)[labels]], axis=1)
+    ds = tf.data.Dataset.from_tensor_slices((images, y))
+    if shuffle:
+        ds = ds.shuffle(len(y), reshuffle_each_iteration=True)
+    ds = ds.batch(batch_size)
+
+    def prepare(x, y):
+        x = tf.cast(x, tf.float32)
+        if shuffle:
+            x = augment_batch(x, **STUDENT_AUGMENT)
+        return x / 255.0, y
+
+    return ds.map(prepare, num_parallel_calls=AUTOTUNE).prefetch(AUTOTUNE)
+
+
+def latency_ms(predict, faces, repeats=3):
+    """Median single-face latency (preprocessing + inference)"""
+    for face in faces[:10]:
+        predict(face)
+    times = []
+    for _ in range(repeats):
+        for face in faces:
+            start = time.perf_counter()
+            predict(face)
+            times.append(time.perf_counter() - start)
+    return 1000 * float(np.median(times))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', type=int, choices=[48, 64], default=48)
+    parser.add_argument('--temperature', type=float, default=4.0)
+    parser.add_argument('--alpha', type=float, default=0.7,
+                        help='Weight of the teacher term (rest: true labels)')
+    parser.add_argument('--epochs', type=int, default=40)
+    parser.add_argument('--batch-size', type=int, default=128)
+    parser.add_argument('--datasets', nargs='+', default=['data/fer2013', 'data/raf-db'])
+    parser.add_argument('--output', default=DistilledStudent.MODEL_PATHS[0])
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("Knowledge Distillation: Three-Dataset Ensemble -> Student CNN")
+    print("=" * 70)
+
+    datasets = [d for d in args.datasets if os.path.isdir(os.path.join(d, 'train'))]
+    if not datasets:
+        print("ERROR: No datasets found")
+        sys.exit(1)
+
+    print("\n[1/5] Loading teacher ensemble...")
+    # Teacher targets are the full 0.3/0.7 blend for every face ($FER_CASCADE ignored)
+    ensemble = ThreeDatasetEnsemble(backend='keras', cascade=False)
+
+    print("\n[2/5] Computing teacher targets...")
+    splits = {}
+    for dataset in datasets:
+        for split in ('train', 'test'):
+            directory = os.path.join(dataset, split)
+            if not os.path.isdir(directory):
+                continue
+            images, labels = student_arrays(directory, args.size)
+            splits[directory] = (images, labels, teacher_targets(ensemble, directory))
+
+    train = [splits[d] for d in splits if d.endswith('train')]
+    train_images = np.concatenate([s[0] for s in train])
+    train_labels = np.concatenate([s[1] for s in train])
+    train_targets = np.concatenate([s[2] for s in train])
+    val_images, val_labels, val_targets = splits[os.path.join(datasets[0], 'test')]
+    print(f"  Training images: {len(train_labels)}")
+
+    print(f"\n[3/5] Training {args.size}x{args.size} student "
+          f"(T={args.temperature:g}, alpha={args.alpha:g})...")
+    student = build_student(args.size)
+    student.compile(optimizer=tf.keras.optimizers.Adam(1e-3),
+                    loss=distillation_loss(args.temperature, args.alpha),
+                    metrics=[label_accuracy, teacher_agreement])
+    print(f"  Student parameters: {student.count_params():,}")
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    weights_path = os.path.splitext(args.output)[0] + '_best.weights.h5'
+    student.fit(
+        make_dataset(train_images, train_targets, train_labels, args.batch_size, True),
+        validation_data=make_dataset(val_images, val_targets, val_labels, args.batch_size, False),
+        epochs=args.epochs,
+        callbacks=[
+            ModelCheckpoint(weights_path, save_best_only=True, save_weights_only=True,
+                            monitor='val_label_accuracy', mode='max', verbose=1),
+            EarlyStopping(monitor='val_label_accuracy', mode='max', patience=8, verbose=1),
+            ReduceLROnPlateau(monitor='val_loss', factor=0.5, patience=3, min_lr=1e-5, verbose=1)
+        ],
+        verbose=1
+    )
+    student.load_weights(weights_path)
+
+    # Inference model outputs probabilities, like the ensemble members
+    probs = layers.Softmax(name='emotion_output')(student.output)
+    tf.keras.Model(student.input, probs).save(args.output)
+    print(f"✓ Student saved to {args.output}")
+
+    print("\n[4/5] Test accuracy...")
+    report = {'size': args.size, 'temperature': args.temperature, 'alpha': args.alpha,
+              'student_parameters': student.count_params(), 'splits': {}}
+    print(f"  {'Split':<22} {'Ensemble':>9} {'Student':>9} {'Agreement':>10}")
+    for directory, (images, labels, targets) in splits.items():
+        if not directory.endswith('test'):
+            continue
+        logits = student.predict(images.astype(np.float32) / 255.0, batch_size=256, verbose=0)
+        student_pred = np.argmax(logits, axis=1)
+        teacher_pred = np.argmax(targets, axis=1)
+        row = {'ensemble_accuracy': float(np.mean(teacher_pred == labels)),
+               'student_accuracy': float(np.mean(student_pred == labels)),
+               'agreement': float(np.mean(student_pred == teacher_pred))}
+        report['splits'][directory] = row
+        print(f"  {directory:<22} {row['ensemble_accuracy']*100:>8.2f}% "
+              f"{row['student_accuracy']*100:>8.2f}% {row['agreement']*100:>9.2f}%")
+
+    print("\n[5/5] CPU latency per face (preprocessing + inference)...")
+    test_paths, _, _ = list_image_files(os.path.join(datasets[0], 'test'))
+    sample = test_paths[::max(1, len(test_paths) // 200)][:200]
+    # Only a timing sample: skip unreadable files
+    faces = [img for img in map(cv2.imread, sample) if img is not None and img.size > 0]
+    student_model = DistilledStudent(backend='keras', model_path=args.output)
+    ensemble_ms = latency_ms(lambda f: ensemble.predict_emotion(f, use_smoothing=False), faces)
+    student_ms = latency_ms(lambda f: student_model.predict_emotion(f, use_smoothing=False), faces)
+    report.update(ensemble_ms=ensemble_ms, student_ms=student_ms)
+    print(f"  Ensemble: {ensemble_ms:.2f} ms")
+    print(f"  Student:  {student_ms:.2f} ms ({ensemble_ms / student_ms:.1f}x faster)")
+
+    report_path = os.path.splitext(args.output)[0] + '.json'
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print("\n" + "=" * 70)
+    print(f"✓ Report saved to {report_path}")
+    print("Use it in the apps with: FER_RECOGNIZER=student")
+    print("Then re-export for production: python export_tflite_models.py")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+"""
+Accuracy vs compute of video frame sampling policies
+
+Runs the ensemble on EVERY frame of a video once (reference), then
+replays the video through each sampling policy and compares the
+interpolated per-frame emotions against the reference.
+
+Usage:
+    python evaluate_frame_sampling.py video.mp4 [--rates 1 2 3 5] [--json out.json]
+"""
+
+import argparse
+import json
+import sys
+import time
+import numpy as np
+
+sys.path.append('src')
+
+from face_detector import FaceDetector
+from three_dataset_ensemble import ThreeDatasetEnsemble
+from frame_sampler import AdaptiveFrameSampler
+from video_stream import read_video_file
+
+
+def dense_pass(video_path, face_detector, recognizer):
+    """
+    Reference: detection + inference on every frame
+    Scores the largest face, the one analyze_video's timeline follows, so
+    multi-face clips compare the same subject on both sides.
+    """
+    reference = []  # (timestamp, box or None, probs or None)
+    start = time.time()
+    for frame, progress, timestamp in read_video_file(video_path):
+        boxes = []
+        for x1, y1, x2, y2 in face_detector.detect_faces(frame):
+            x1, y1 = max(0, x1), max(0, y1)
+            x2, y2 = min(frame.shape[1], x2), min(frame.shape[0], y2)
+            if x2 > x1 and y2 > y1:
+                boxes.append((x1, y1, x2, y2))
+        box, probs = None, None
+        if boxes:
+            box = max(boxes, key=lambda b: (b[2] - b[0]) * (b[3] - b[1]))
+            x1, y1, x2, y2 = box
+            _, _, probs, _, _ = recognizer.predict_emotion(frame[y1:y2, x1:x2],
+                                                           use_smoothing=False)
+        reference.append((timestamp, box, probs))
+        print(f"\r  Reference pass: {progress:3d}%", end='')
+    print()
+    return reference, time.time() - start
+
+
+class FixedStrideSampler(AdaptiveFrameSampler):
+    """Previous behaviour: analyze every Nth frame"""
+
+    def __init__(self, stride):
+        super().__init__()
+        self.stride = stride
+
+    def should_analyze(self, frame, timestamp):
+        self.frame_times.append(timestamp)
+        return len(self.frame_times) % self.stride == 0
+
+
+def replay(video_path, sampler, reference):
+    """Run a sampling policy, taking keyframe results from the reference"""
+    for index, (frame, _, timestamp) in enumerate(read_video_file(video_path)):
+        if index >= len(reference):
+            break
+        if sampler.should_analyze(frame, timestamp):
+            _, box, probs = reference[index]
+            sampler.set_face_boxes([] if box is None else [box], frame.shape)
+            sampler.record(timestamp, probs)
+
+    predicted = sampler.interpolate()
+    matches, total = 0, 0
+    for (_, _, ref_probs), probs in zip(reference, predicted):
+        if ref_probs is None:
+            continue
+        total += 1
+        if probs is not None and np.argmax(probs) == np.argmax(ref_probs):
+            matches += 1
+    return matches / total if total else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('video')
+    parser.add_argument('--rates', type=float, nargs='+', default=[1, 2, 3, 5],
+                        help='Adaptive budgets (max inferences per second of video)')
+    parser.add_argument('--strides', type=int, nargs='+', default=[5, 10, 30],
+                        help='Fixed strides to compare')
+    parser.add_argument('--json', help='Write results to this file')
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("Frame Sampling: Accuracy vs Compute")
+    print("=" * 70)
+
+    face_detector = FaceDetector(method='haar')
+    # Reference and policies use the full ensemble ($FER_CASCADE ignored)
+    recognizer = ThreeDatasetEnsemble(cascade=False)
+
+    reference, dense_seconds = dense_pass(args.video, face_detector, recognizer)
+    frames = len(reference)
+    if frames == 0:
+        print(f"ERROR: No frames decoded from {args.video}")
+        sys.exit(1)
+    per_frame = dense_seconds / frames
+
+    policies = [(f"fixed every {n}", FixedStrideSampler(n)) for n in args.strides]
+    policies += [(f"adaptive {r:g}/s", AdaptiveFrameSampler(max_rate=r)) for r in args.rates]
+
+    results = []
+    print(f"\n{'Policy':<20} {'Inferences':>10} {'% frames':>9} {'Inf/s':>7} "
+          f"{'Est. time':>10} {'Agreement':>10}")
+    print("-" * 70)
+    for name, sampler in policies:
+        agreement = replay(args.video, sampler, reference)
+        stats = sampler.stats()
+        row = {
+            'policy': name,
+            'inferences': stats['analyzed'],
+            'analyzed_fraction': stats['analyzed_fraction'],
+            'inferences_per_second': stats['inferences_per_second'],
+            'estimated_seconds': stats['analyzed'] * per_frame,
+            'agreement': agreement
+        }
+        results.append(row)
+        print(f"{name:<20} {row['inferences']:>10d} {row['analyzed_fraction']*100:>8.1f}% "
+              f"{row['inferences_per_second']:>7.2f} {row['estimated_seconds']:>9.1f}s "
+              f"{agreement*100:>9.1f}%")
+
+    print("-" * 70)
+    print(f"Reference: {frames} frames, {dense_seconds:.1f}s "
+          f"({per_frame*1000:.1f} ms/frame detect + infer)")
+    print("Agreement = interpolated per-frame emotion matches the every-frame reference")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'video': args.video, 'frames': frames,
+                       'dense_seconds': dense_seconds, 'policies': results}, f, indent=2)
+        print(f"\n✓ Results saved to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""
+Accuracy of every model variant on the same test sets
+Evaluates the Keras models, their TFLite conversions (quantized and
+float), the TF.js web model and the two ensembles on data/fer2013/test
+(and data/raf-db/test when present), several variants in parallel
+processes. Reports accuracy, macro F1, per-class F1, expected calibration
+error (ECE), NLL and images/s, plus confusion matrices.
+
+Missing models are skipped. The TF.js model needs tensorflowjs
+(pip install tensorflowjs) for a one-off conversion to a SavedModel.
+
+Usage:
+    python evaluate_models.py [--variants fer_model_best.h5 fer_model.tflite]
+                              [--jobs 4] [--batch-size 512]
+                              [--output models/evaluation.json]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+
+sys.path.append('src')
+
+from dataset_cache import list_image_files, pack_split
+from model_evaluation import (VARIANTS, ENSEMBLES, available_variants, evaluate_variant,
+                              score)
+
+DATASETS = ['data/fer2013/test', 'data/raf-db/test']
+
+
+def print_confusion(name, matrix, class_names):
+    print(f"\n  {name}")
+    print("  " + " " * 10 + "".join(f"{c[:7]:>8}" for c in class_names))
+    for class_name, row in zip(class_names, matrix):
+        print(f"  {class_name[:10]:<10}" + "".join(f"{v:>8}" for v in row))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--variants', nargs='+', choices=list(VARIANTS),
+                        help='Default: every variant whose model file exists')
+    parser.add_argument('--datasets', nargs='+', default=DATASETS)
+    parser.add_argument('--jobs', type=int, default=min(4, os.cpu_count() or 1),
+                        help='Variants evaluated in parallel')
+    parser.add_argument('--batch-size', type=int, default=512)
+    parser.add_argument('--confusion', action='store_true', help='Print confusion matrices')
+    parser.add_argument('--output', default='models/evaluation.json')
+    args = parser.parse_args()
+
+    print("=" * 78)
+    print("Model Variant Evaluation")
+    print("=" * 78)
+
+    variants = args.variants or available_variants()
+    datasets = [d for d in args.datasets if os.path.isdir(d)]
+    for name in VARIANTS:
+        if name not in variants:
+            print(f"  ⚠ Skipping {name} (model not found)")
+    if not variants or not datasets:
+        print("ERROR: Nothing to evaluate")
+        sys.exit(1)
+
+    # Pack up front so worker processes never pack the same split at once
+    print("\n[1/3] Packing test sets...")
+    formats = {((48, 48), 'grayscale'), ((96, 96), 'rgb')}
+    if any(VARIANTS[name][2] is None for name in variants):
+        formats.add(((64, 64), 'grayscale'))  # distill_ensemble.py --size 64
+    for directory in datasets:
+        for image_size, color_mode in sorted(formats):
+            pack_split(directory, image_size, color_mode)
+
+    threads = max(1, (os.cpu_count() or 1) // args.jobs)
+    print(f"\n[2/3] Evaluating {len(variants)} variant(s) x {len(datasets)} dataset(s), "
+          f"{args.jobs} in parallel ({threads} threads each)...")
+    outputs = {}
+    # Spawn: TensorFlow is not fork-safe
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=args.jobs, mp_context=context) as pool:
+        futures = {pool.submit(evaluate_variant, name, directory, args.batch_size, threads):
+                   (name, directory) for name in variants for directory in datasets}
+        for future in as_completed(futures):
+            name, directory = futures[future]
+            try:
+                outputs[name, directory] = future.result()
+                print(f"  ✓ {name} on {directory}")
+            except Exception as e:
+                print(f"  ✗ {name} on {directory}: {e}")
+
+    print("\n[3/3] Scoring...")
+    report = {'datasets': {}}
+    for directory in datasets:
+        _, _, class_names = list_image_files(directory)
+        results = {}
+        for name in variants:
+            if (name, directory) in outputs:
+                output = outputs[name, directory]
+                results[name] = score(output['probs'], output['labels'], class_names,
+                                      output['seconds'])
+                results[name]['load_seconds'] = output['load_seconds']
+        for ensemble, weights in ENSEMBLES.items():
+            if all((member, directory) in outputs for member in weights):
+                probs = sum(weight * outputs[member, directory]['probs']
+                            for member, weight in weights.items())
+                labels = outputs[next(iter(weights)), directory]['labels']
+                results[ensemble] = score(probs, labels, class_names)
+        report['datasets'][directory] = results
+
+        print(f"\n{directory}")
+        print(f"  {'Variant':<36} {'Acc':>7} {'MacroF1':>8} {'ECE':>6} {'NLL':>6} {'img/s':>8}")
+        for name, result in results.items():
+            rate = f"{result['images_per_sec']:.0f}" if 'images_per_sec' in result else '-'
+            print(f"  {name:<36} {result['accuracy']*100:>6.2f}% {result['macro_f1']:>8.3f} "
+                  f"{result['ece']:>6.3f} {result['nll']:>6.3f} {rate:>8}")
+        print("\n  Per-class F1:")
+        print(f"  {'Variant':<36}" + "".join(f"{c[:7]:>8}" for c in class_names))
+        for name, result in results.items():
+            print(f"  {name:<36}" + "".join(
+                f"{result['per_class'][c]['f1']:>8.3f}" for c in class_names))
+        if args.confusion:
+            for name, result in results.items():
+                print_confusion(name, np.array(result['confusion_matrix']), class_names)
+
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✓ Report saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
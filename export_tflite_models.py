@@ -0,0 +1,72 @@
+"""
+Export the ensemble models to float32 TensorFlow Lite flatbuffers
+Used by the production server (FER_BACKEND=tflite): the .tflite files
+are memory-mapped, so all worker processes share one copy of the weights.
+
+Only models whose .h5 is newer than their .tflite are converted.
+Unlike convert_to_tflite.py no quantization is applied, so predictions
+match the Keras models.
+
+Usage:
+    python export_tflite_models.py [--force]
+"""
+
+import os
+import sys
+
+sys.path.append('src')
+
+from tflite_model import tflite_path_for, tflite_is_fresh
+from model_registry import MODELS, model_path
+
+MODEL_FILES = [model_path(name) for name in MODELS]
+
+
+def is_stale(h5_path):
+    return not tflite_is_fresh(h5_path)
+
+
+def export_model(h5_path):
+    import tensorflow as tf
+
+    tflite_path = tflite_path_for(h5_path)
+    os.makedirs(os.path.dirname(tflite_path), exist_ok=True)
+
+    model = tf.keras.models.load_model(h5_path)
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    tflite_model = converter.convert()
+
+    # Atomic replace: running servers keep their mapping of the old file
+    tmp_path = tflite_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(tflite_model)
+    os.replace(tmp_path, tflite_path)
+    return tflite_path
+
+
+def main():
+    force = '--force' in sys.argv
+
+    print("=" * 60)
+    print("Exporting models to TensorFlow Lite (float32)")
+    print("=" * 60)
+
+    exported = 0
+    for h5_path in MODEL_FILES:
+        if not os.path.exists(h5_path):
+            print(f"  ⚠ Skipping missing model: {h5_path}")
+            continue
+        if not force and not is_stale(h5_path):
+            print(f"  ✓ Up to date: {tflite_path_for(h5_path)}")
+            continue
+        print(f"  Converting {h5_path}...")
+        tflite_path = export_model(h5_path)
+        size = os.path.getsize(tflite_path) / (1024 * 1024)
+        print(f"  ✓ {tflite_path} ({size:.2f} MB)")
+        exported += 1
+
+    print(f"\n✓ {exported} model(s) exported")
+
+
+if __name__ == '__main__':
+    main()
@@ -10,9 +10,16 @@ MobileNetV3 advantages:
 import tensorflow as tf
 from tensorflow.keras.layers import Dense, GlobalAveragePooling2D, Dropout, Input
 from tensorflow.keras.models import Model
-from tensorflow.keras.preprocessing.image import ImageDataGenerator
 from tensorflow.keras.callbacks import ModelCheckpoint, EarlyStopping, ReduceLROnPlateau
 import os
+import sys
+import time
+
+sys.path.append('src')
+
+from data_pipeline import image_dataset
+from training_modes import TrainingMode
+from feature_cache import cached_features, feature_dataset
 
 print("=" * 70)
 print("Fine-Tuning MobileNetV3 for Cross-Dataset Generalization")
@@ -21,6 +28,10 @@ print("=" * 70)
 
 os.makedirs('models/pretrained', exist_ok=True)
 
+# FER_TRAIN_MODE=fast: XLA + mixed precision (set before building layers)
+training_mode = TrainingMode()
+print(f"\nTraining mode: {training_mode.describe()}")
+
 print("\n🚀 Why MobileNetV3:")
 print("-" * 70)
 print("  ✓ 15% faster inference than MobileNetV2")
@@ -43,10 +54,9 @@ print("  → Learns facial expression patterns")
 print("  → Combines robustness + emotion understanding")
 print("-" * 70)
 
-# Data generators (RGB for MobileNetV3)
-print("\n[1/5] Setting up data generators...")
-train_datagen = ImageDataGenerator(
-    rescale=1./255,
+# Data pipelines (RGB for MobileNetV3)
+print("\n[1/5] Setting up data pipelines...")
+train_augment = dict(
     rotation_range=20,
     width_shift_range=0.2,
     height_shift_range=0.2,
@@ -56,30 +66,27 @@ train_datagen = ImageDataGenerator(
     fill_mode='nearest'
 )
 
-test_datagen = ImageDataGenerator(rescale=1./255)
-
 # MobileNetV3 recommended input size: 224x224 or 96x96
 # Using 96x96 for faster training
-train_generator = train_datagen.flow_from_directory(
+train_ds, train_info = image_dataset(
     'data/fer2013/train',
-    target_size=(96, 96),
+    image_size=(96, 96),
     batch_size=32,
     color_mode='rgb',
-    class_mode='categorical',
-    shuffle=True
+    shuffle=True,
+    augment=train_augment
 )
 
-test_generator = test_datagen.flow_from_directory(
+test_ds, test_info = image_dataset(
     'data/fer2013/test',
-    target_size=(96, 96),
+    image_size=(96, 96),
     batch_size=32,
     color_mode='rgb',
-    class_mode='categorical',
     shuffle=False
 )
 
-print(f"Training samples: {train_generator.samples}")
-print(f"Test samples: {test_generator.samples}")
+print(f"Training samples: {train_info['samples']}")
+print(f"Test samples: {test_info['samples']}")
 
 # Check TensorFlow version and load appropriate MobileNetV3
 print("\n[2/5] Loading MobileNetV3...")
@@ -119,22 +126,35 @@ print(f"  Demographics: Global (photos from worldwide)")
 
 # Build model with custom head
 print("\nBuilding custom emotion recognition head...")
+head_layers = [
+    Dropout(0.5),
+    Dense(256, activation='relu'),
+    Dropout(0.3),
+    Dense(128, activation='relu'),
+    Dropout(0.2),
+    # float32 output: softmax and loss at full precision under mixed precision
+    Dense(7, activation='softmax', name='emotion_output', dtype='float32')
+]
+
+
+def apply_head(x):
+    for layer in head_layers:
+        x = layer(x)
+    return x
+
+
 inputs = Input(shape=(96, 96, 3))
 x = base_model(inputs, training=False)
 x = GlobalAveragePooling2D()(x)
-x = Dropout(0.5)(x)
-x = Dense(256, activation='relu')(x)
-x = Dropout(0.3)(x)
-x = Dense(128, activation='relu')(x)
-x = Dropout(0.2)(x)
-outputs = Dense(7, activation='softmax', name='emotion_output')(x)
+outputs = apply_head(x)
 
 model = Model(inputs, outputs)
 
 model.compile(
-    optimizer=tf.keras.optimizers.Adam(learning_rate=0.001),
+    optimizer=training_mode.optimizer(tf.keras.optimizers.Adam(learning_rate=0.001)),
     loss='categorical_crossentropy',
-    metrics=['accuracy']
+    metrics=['accuracy'],
+    **training_mode.compile_kwargs()
 )
 
 print("\n✓ Model architecture ready")
@@ -163,15 +183,57 @@ early_stop_phase1 = EarlyStopping(
     verbose=1
 )
 
-history_phase1 = model.fit(
-    train_generator,
-    validation_data=test_generator,
-    epochs=10,
-    callbacks=[checkpoint_phase1, early_stop_phase1],
-    verbose=1
-)
+phase1_start = time.time()
+
+if os.getenv('FER_FEATURE_CACHE', '0') == '1':
+    # Frozen backbone: compute its features once, then train the head on them.
+    # The head layers are shared, so `model` ends up with the trained head.
+    views = int(os.getenv('FER_FEATURE_VIEWS', '5'))
+    print(f"\nFeature cache mode: {views} view(s) per training image")
+    train_features, train_labels = cached_features(
+        base_model, 'data/fer2013/train', (96, 96), views=views, augment=train_augment)
+    test_features, test_labels = cached_features(
+        base_model, 'data/fer2013/test', (96, 96))
+    
+    feature_inputs = Input(shape=(train_features.shape[2],))
+    head_model = Model(feature_inputs, apply_head(feature_inputs))
+    head_model.compile(
+        optimizer=training_mode.optimizer(tf.keras.optimizers.Adam(learning_rate=0.001)),
+        loss='categorical_crossentropy',
+        metrics=['accuracy'],
+        **training_mode.compile_kwargs()
+    )
+    
+    head_checkpoint = ModelCheckpoint(
+        'models/pretrained/mobilenetv3_phase1_head.h5',
+        save_best_only=True,
+        save_weights_only=True,
+        monitor='val_accuracy',
+        mode='max',
+        verbose=1
+    )
+    
+    history_phase1 = head_model.fit(
+        feature_dataset(train_features, train_labels, 7, batch_size=32),
+        validation_data=feature_dataset(test_features, test_labels, 7,
+                                        batch_size=32, shuffle=False),
+        epochs=10,
+        callbacks=[head_checkpoint, early_stop_phase1, training_mode.timer],
+        verbose=1
+    )
+    # Best head on the full model, as the image-based checkpoint would save it
+    head_model.load_weights('models/pretrained/mobilenetv3_phase1_head.h5')
+    model.save('models/pretrained/mobilenetv3_phase1.h5')
+else:
+    history_phase1 = model.fit(
+        train_ds,
+        validation_data=test_ds,
+        epochs=10,
+        callbacks=[checkpoint_phase1, early_stop_phase1, training_mode.timer],
+        verbose=1
+    )
 
-print(f"\n✓ Phase 1 complete")
+print(f"\n✓ Phase 1 complete ({time.time() - phase1_start:.0f}s)")
 print(f"  Val Accuracy: {max(history_phase1.history['val_accuracy'])*100:.2f}%")
 
 # Phase 2: Fine-tune entire model
@@ -188,9 +250,10 @@ base_model.trainable = True
 
 # Recompile with lower learning rate
 model.compile(
-    optimizer=tf.keras.optimizers.Adam(learning_rate=0.0001),  # 10x lower!
+    optimizer=training_mode.optimizer(tf.keras.optimizers.Adam(learning_rate=0.0001)),  # 10x lower!
     loss='categorical_crossentropy',
-    metrics=['accuracy']
+    metrics=['accuracy'],
+    **training_mode.compile_kwargs()
 )
 
 checkpoint_phase2 = ModelCheckpoint(
@@ -217,22 +280,25 @@ reduce_lr = ReduceLROnPlateau(
 )
 
 history_phase2 = model.fit(
-    train_generator,
-    validation_data=test_generator,
+    train_ds,
+    validation_data=test_ds,
     epochs=25,
-    callbacks=[checkpoint_phase2, early_stop_phase2, reduce_lr],
+    callbacks=[checkpoint_phase2, early_stop_phase2, reduce_lr, training_mode.timer],
     verbose=1
 )
 
 # Final evaluation
 print("\n[5/5] Final Evaluation...")
 print("=" * 70)
-test_loss, test_accuracy = model.evaluate(test_generator, verbose=0)
+test_loss, test_accuracy = model.evaluate(test_ds, verbose=0)
 print(f"\nTest Loss: {test_loss:.4f}")
 print(f"Test Accuracy: {test_accuracy*100:.2f}%")
 
-# Save final model
-model.save('models/pretrained/mobilenetv3_emotion_final.h5')
+# Save final model (float32 for inference)
+training_mode.save_float32(model, 'models/pretrained/mobilenetv3_emotion_final.h5')
+training_mode.finalize_checkpoint('models/pretrained/mobilenetv3_phase1.h5')
+training_mode.finalize_checkpoint('models/pretrained/mobilenetv3_finetuned.h5')
+training_mode.report('finetune_mobilenetv3', test_accuracy)
 
 print("\n" + "=" * 70)
 print("TRAINING COMPLETE!")
@@ -11,9 +11,14 @@ This achieves the project objective:
 """
 
 import tensorflow as tf
-from tensorflow.keras.preprocessing.image import ImageDataGenerator
 from tensorflow.keras.callbacks import ModelCheckpoint, EarlyStopping, ReduceLROnPlateau
 import os
+import sys
+
+sys.path.append('src')
+
+from data_pipeline import image_dataset
+from training_modes import TrainingMode
 
 print("=" * 70)
 print("Stage 3: RAF-DB Fine-tuning for Cross-Dataset Generalization")
@@ -39,6 +44,10 @@ print("-" * 70)
 # Check if previous model exists
 os.makedirs('models/pretrained', exist_ok=True)
 
+# FER_TRAIN_MODE=fast: XLA + mixed precision
+training_mode = TrainingMode()
+print(f"\nTraining mode: {training_mode.describe()}")
+
 previous_model = 'models/pretrained/mobilenetv3_finetuned.h5'
 if not os.path.exists(previous_model):
     print(f"\nERROR: Need ImageNet+FER2013 model first!")
@@ -94,7 +103,7 @@ for split in ['train', 'test']:
 
 # Load ImageNet+FER2013 model
 print("\n[1/5] Loading ImageNet+FER2013 model...")
-model = tf.keras.models.load_model(previous_model)
+model = training_mode.prepare_model(tf.keras.models.load_model(previous_model))
 print("✓ Model loaded")
 print(f"  This model already has:")
 print(f"    • ImageNet features (14M images)")
@@ -102,10 +111,9 @@ print(f"    • FER2013 emotion patterns (35K images)")
 print(f"  Now adding:")
 print(f"    • RAF-DB real-world robustness (30K images)")
 
-# Data generators with stronger augmentation for real-world diversity
-print("\n[2/5] Setting up RAF-DB data generators...")
-train_datagen = ImageDataGenerator(
-    rescale=1./255,
+# Data pipelines with stronger augmentation for real-world diversity
+print("\n[2/5] Setting up RAF-DB data pipelines...")
+train_augment = dict(
     rotation_range=30,      # More rotation (various angles)
     width_shift_range=0.3,  # More shift (off-center faces)
     height_shift_range=0.3,
@@ -116,35 +124,32 @@ train_datagen = ImageDataGenerator(
     fill_mode='nearest'
 )
 
-test_datagen = ImageDataGenerator(rescale=1./255)
-
 # Load RAF-DB data (using standard names)
-train_generator = train_datagen.flow_from_directory(
+train_ds, train_info = image_dataset(
     os.path.join(rafdb_path, 'train'),
-    target_size=(96, 96),
+    image_size=(96, 96),
     batch_size=32,
     color_mode='rgb',
-    class_mode='categorical',
-    shuffle=True
+    shuffle=True,
+    augment=train_augment
 )
 
-test_generator = test_datagen.flow_from_directory(
+test_ds, test_info = image_dataset(
     os.path.join(rafdb_path, 'test'),
-    target_size=(96, 96),
+    image_size=(96, 96),
     batch_size=32,
     color_mode='rgb',
-    class_mode='categorical',
     shuffle=False
 )
 
-print(f"RAF-DB Training samples: {train_generator.samples}")
-print(f"RAF-DB Test samples: {test_generator.samples}")
-print(f"Class indices: {train_generator.class_indices}")
+print(f"RAF-DB Training samples: {train_info['samples']}")
+print(f"RAF-DB Test samples: {test_info['samples']}")
+print(f"Class indices: {train_info['class_indices']}")
 
 # Verify we have 7 classes
-if len(train_generator.class_indices) != 7:
-    print(f"\nWARNING: Expected 7 emotion classes, found {len(train_generator.class_indices)}")
-    print(f"Classes found: {list(train_generator.class_indices.keys())}")
+if len(train_info['class_indices']) != 7:
+    print(f"\nWARNING: Expected 7 emotion classes, found {len(train_info['class_indices'])}")
+    print(f"Classes found: {list(train_info['class_indices'].keys())}")
     print("\nExpected: angry, disgust, fear, happy, neutral, sad, surprise")
     
     choice = input("\nContinue anyway? [y/N]: ")
@@ -161,9 +166,10 @@ for layer in model.layers:
 
 # Compile with very low learning rate
 model.compile(
-    optimizer=tf.keras.optimizers.Adam(learning_rate=0.00001),  # Very low!
+    optimizer=training_mode.optimizer(tf.keras.optimizers.Adam(learning_rate=0.00001)),  # Very low!
     loss='categorical_crossentropy',
-    metrics=['accuracy']
+    metrics=['accuracy'],
+    **training_mode.compile_kwargs()
 )
 
 # Callbacks
@@ -196,20 +202,22 @@ print("This will take 20-30 minutes...")
 print("-" * 70)
 
 history = model.fit(
-    train_generator,
-    validation_data=test_generator,
+    train_ds,
+    validation_data=test_ds,
     epochs=25,
-    callbacks=[checkpoint, early_stop, reduce_lr],
+    callbacks=[checkpoint, early_stop, reduce_lr, training_mode.timer],
     verbose=1
 )
 
 # Evaluate
 print("\n[5/5] Final evaluation...")
-test_loss, test_accuracy = model.evaluate(test_generator, verbose=0)
+test_loss, test_accuracy = model.evaluate(test_ds, verbose=0)
 print(f"\nRAF-DB Test Accuracy: {test_accuracy*100:.2f}%")
 
-# Save final model
-model.save('models/pretrained/final_cross_dataset.h5')
+# Save final model (float32 for inference)
+training_mode.save_float32(model, 'models/pretrained/final_cross_dataset.h5')
+training_mode.finalize_checkpoint('models/pretrained/rafdb_finetuned.h5')
+training_mode.report('finetune_rafdb', test_accuracy)
 
 print("\n" + "=" * 70)
 print("Three-Dataset Fine-tuning Complete!")
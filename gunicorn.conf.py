@@ -0,0 +1,122 @@
+"""
+Gunicorn configuration for the FER web apps
+Usage:
+    gunicorn -c gunicorn.conf.py mobile_native_camera:app
+    ./run_production.sh [mobile|mid_review|dashboard]
+
+The app is imported once in the master (preload_app) and workers are
+forked from it. Inference uses the TensorFlow Lite backend: TensorFlow
+itself is not fork-safe once its thread pools are running, while the
+memory-mapped .tflite files are shared by all workers through the page
+cache and each worker builds its own interpreter on first use.
+
+Environment:
+    FER_BIND       Address to listen on (default 0.0.0.0:5000)
+    FER_WORKERS    Worker processes (default: CPU count, max 4)
+    FER_THREADS    Threads per worker (default 4)
+    FER_SSL        1 to serve HTTPS with cert.pem/key.pem (default 0)
+    FER_BACKEND    Model backend (set to tflite here unless overridden)
+    FER_METRICS_DIR  Where workers share /metrics snapshots (default jobs/metrics)
+    FER_ADMIN_TOKEN  Bearer token for /admin/profile and /admin/models
+                     (default: local requests only)
+    FER_HOT_SWAP   1: workers swap re-exported models in place; 0: reload
+                   workers with SIGHUP instead (default 1)
+"""
+
+import os
+import sys
+import signal
+import subprocess
+import threading
+import time
+
+os.environ.setdefault('FER_BACKEND', 'tflite')
+# Any worker can answer a /metrics scrape with totals over all workers
+os.environ.setdefault('FER_METRICS_DIR', os.path.join(os.getenv('FER_JOBS_DIR', 'jobs'), 'metrics'))
+
+bind = os.getenv('FER_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('FER_WORKERS', str(min(4, os.cpu_count() or 1))))
+worker_class = 'gthread'
+threads = int(os.getenv('FER_THREADS', '4'))
+
+preload_app = True
+
+# Event streams and chunked uploads keep requests open
+timeout = 120
+keepalive = 5
+# Let running video jobs drain on reload/shutdown
+graceful_timeout = int(os.getenv('FER_GRACEFUL_TIMEOUT', '300'))
+
+if os.getenv('FER_SSL', '0') == '1':
+    certfile = 'cert.pem'
+    keyfile = 'key.pem'
+
+accesslog = '-'
+
+# Apps that load the emotion models
+INFERENCE_APPS = ('mobile_native_camera', 'mid_review_mobile_app')
+
+# How often to check the .h5 models for retrained versions (seconds)
+MODEL_POLL_INTERVAL = float(os.getenv('FER_MODEL_POLL_INTERVAL', '30'))
+# Workers pick up re-exported models themselves (model_registry.watch)
+HOT_SWAP = os.getenv('FER_HOT_SWAP', '1') == '1'
+
+
+def _serves_models(server):
+    app_uri = getattr(server.app, 'app_uri', None) or ''
+    return app_uri.split(':')[0] in INFERENCE_APPS
+
+
+def _export_models():
+    # Separate process so TensorFlow never initialises in the master
+    return subprocess.call([sys.executable, 'export_tflite_models.py'])
+
+
+def _watch_models(server):
+    """Re-export when a model file changes; reload workers unless they hot-swap"""
+    from export_tflite_models import MODEL_FILES, is_stale
+
+    while True:
+        time.sleep(MODEL_POLL_INTERVAL)
+        stale = [path for path in MODEL_FILES if os.path.exists(path) and is_stale(path)]
+        if not stale:
+            continue
+        server.log.info("Model changed (%s), re-exporting", ', '.join(stale))
+        if _export_models() != 0:
+            server.log.error("TFLite export failed, keeping current workers")
+            continue
+        if HOT_SWAP:
+            # Each worker notices the new .tflite on its next poll
+            continue
+        # HUP: start new workers (fresh interpreters), then retire the old ones
+        os.kill(server.pid, signal.SIGHUP)
+
+
+def on_starting(server):
+    sys.path.append('src')
+    import metrics
+    metrics.reset_dir()
+
+    if os.environ['FER_BACKEND'] == 'tflite' and _serves_models(server):
+        server.log.info("Checking TFLite exports")
+        if _export_models() != 0:
+            raise RuntimeError("TFLite export failed; run python export_tflite_models.py")
+
+
+def post_worker_init(worker):
+    # Workers reset inherited signal handlers, so install it after their setup.
+    # Profile every worker with: pkill -USR2 -P <master pid>
+    import sampling_profiler
+    sampling_profiler.install_signal_handler()
+    # Load and warm up this worker's models in the background (GET /health)
+    import model_warmup
+    model_warmup.start()
+    if HOT_SWAP:
+        import model_registry
+        model_registry.registry.watch(MODEL_POLL_INTERVAL)
+
+
+def when_ready(server):
+    if os.environ['FER_BACKEND'] == 'tflite' and _serves_models(server):
+        threading.Thread(target=_watch_models, args=(server,),
+                         name='model-watcher', daemon=True).start()
@@ -0,0 +1,233 @@
+"""
+Load test for the production server
+Starts gunicorn at several worker counts (or targets a running server)
+and reports requests/s and latency for concurrent clients.
+
+Mobile app: POSTs a synthetic camera frame (a FER2013 test face placed
+on a 640x480 canvas) to /process_frame. Dashboard: GETs /api/users.
+
+Every client sends the same frame, so servers started here run with the
+prediction cache off (FER_PREDICTION_CACHE=0) and measure inference;
+--prediction-cache measures the cached path instead. Each run reports
+the cache hit rate from the server's /metrics.
+
+Load shedding is off too (FER_LATENCY_BUDGET_MS=0) and each client uses
+its own session. Responses that reuse an earlier result ("reused") are
+counted separately and not in analyzed frames/s.
+
+Usage:
+    python load_test.py [--app mobile|dashboard] [--workers 1 2 4]
+                        [--clients 8] [--duration 20] [--json out.json]
+                        [--prediction-cache]
+    python load_test.py --url https://host:5000 --app mobile
+"""
+
+import argparse
+import base64
+import glob
+import json
+import os
+import re
+import ssl
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+import cv2
+import numpy as np
+
+APPS = {
+    'mobile': 'mobile_native_camera:app',
+    'dashboard': 'dashboard_server:app',
+}
+
+
+def synthetic_frame():
+    """Base64 JPEG data URL of a face on a camera-sized frame"""
+    canvas = np.full((480, 640, 3), 90, dtype=np.uint8)
+    samples = sorted(glob.glob('data/fer2013/test/*/*'))
+    if samples:
+        face = cv2.imread(samples[0])
+        face = cv2.resize(face, (200, 200), interpolation=cv2.INTER_CUBIC)
+        canvas[140:340, 220:420] = face
+    else:
+        print("⚠ No FER2013 test images found; frame has no face")
+    _, jpeg = cv2.imencode('.jpg', canvas, [cv2.IMWRITE_JPEG_QUALITY, 80])
+    return 'data:image/jpeg;base64,' + base64.b64encode(jpeg.tobytes()).decode()
+
+
+def make_request(base_url, app_name, payload):
+    if app_name == 'mobile':
+        return urllib.request.Request(
+            base_url + '/process_frame', data=payload,
+            headers={'Content-Type': 'application/json'}, method='POST')
+    return urllib.request.Request(base_url + '/api/users')
+
+
+def cache_counts(base_url):
+    """Prediction cache hits and misses so far, from /metrics (None if unavailable)"""
+    context = ssl._create_unverified_context()
+    try:
+        with urllib.request.urlopen(base_url + '/metrics', timeout=10, context=context) as response:
+            text = response.read().decode()
+    except Exception:
+        return None
+    counts = {'hit': 0.0, 'miss': 0.0}
+    for result, value in re.findall(r'^fer_prediction_cache_total\{result="(\w+)"\} (\S+)$',
+                                    text, re.MULTILINE):
+        counts[result] = counts.get(result, 0.0) + float(value)
+    return counts
+
+
+def run_clients(base_url, app_name, clients, duration):
+    """Hammer the server from `clients` threads for `duration` seconds"""
+    # Self-signed development certificate
+    context = ssl._create_unverified_context()
+    image = synthetic_frame()
+    latencies = []
+    errors = [0]
+    reused = [0]
+    lock = threading.Lock()
+    deadline = time.time() + duration
+
+    def client(index):
+        # One session per client: shed frames reuse that client's own results
+        payload = json.dumps({'image': image, 'session_id': f'load-test-{index}'}).encode()
+        while time.time() < deadline:
+            start = time.time()
+            try:
+                with urllib.request.urlopen(make_request(base_url, app_name, payload),
+                                            timeout=30, context=context) as response:
+                    body = response.read()
+                was_reused = app_name == 'mobile' and bool(json.loads(body).get('reused'))
+                with lock:
+                    latencies.append(time.time() - start)
+                    reused[0] += was_reused
+            except Exception:
+                with lock:
+                    errors[0] += 1
+
+    cache_before = cache_counts(base_url) if app_name == 'mobile' else None
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    started = time.time()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.time() - started
+
+    cache_hit_rate = None
+    cache_after = cache_counts(base_url) if cache_before is not None else None
+    if cache_after is not None:
+        hits = cache_after['hit'] - cache_before['hit']
+        lookups = hits + cache_after['miss'] - cache_before['miss']
+        cache_hit_rate = hits / lookups if lookups else None
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'requests_per_second': len(latencies) / elapsed,
+        'reused': reused[0],
+        'analyzed_per_second': (len(latencies) - reused[0]) / elapsed,
+        'p50_ms': latencies[len(latencies) // 2] * 1000 if latencies else None,
+        'p95_ms': latencies[int(len(latencies) * 0.95)] * 1000 if latencies else None,
+        'cache_hit_rate': cache_hit_rate,
+    }
+
+
+def wait_until_up(base_url, app_name, workers=1, timeout=180):
+    """Wait until the app answers (mobile: /health is 200, models warmed up)"""
+    context = ssl._create_unverified_context()
+    # / answers while the models are still loading in the background
+    path = '/health' if app_name == 'mobile' else '/'
+    # Any worker may answer, so ask until several in a row are ready
+    needed = 3 * workers if app_name == 'mobile' else 1
+    ready = 0
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            # 503 until warm-up has finished raises HTTPError
+            urllib.request.urlopen(base_url + path, timeout=5, context=context).read()
+            ready += 1
+            if ready >= needed:
+                return True
+        except Exception:
+            ready = 0
+            time.sleep(1)
+    return False
+
+
+def start_server(app_name, workers, port, prediction_cache=False):
+    # Identical frames would otherwise be answered from the prediction cache
+    # and load shedding would answer frames with earlier results
+    env = dict(os.environ, FER_WORKERS=str(workers), FER_BIND=f'127.0.0.1:{port}',
+               FER_SSL='0', FER_PREDICTION_CACHE='1' if prediction_cache else '0',
+               FER_LATENCY_BUDGET_MS='0')
+    return subprocess.Popen(['gunicorn', '-c', 'gunicorn.conf.py', APPS[app_name]],
+                            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--app', choices=sorted(APPS), default='mobile')
+    parser.add_argument('--url', help='Test a running server instead of starting one')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--json', help='Write results to this file')
+    parser.add_argument('--prediction-cache', action='store_true',
+                        help='Keep the prediction cache on in started servers')
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print(f"Load test: {args.app} ({args.clients} clients, {args.duration:g}s per run)")
+    print("=" * 70)
+
+    results = []
+    if args.url:
+        row = run_clients(args.url.rstrip('/'), args.app, args.clients, args.duration)
+        row['workers'] = None
+        results.append(row)
+    else:
+        base_url = f'http://127.0.0.1:{args.port}'
+        for workers in args.workers:
+            print(f"\nStarting gunicorn with {workers} worker(s)...")
+            server = start_server(args.app, workers, args.port, args.prediction_cache)
+            try:
+                if not wait_until_up(base_url, args.app, workers):
+                    print("ERROR: Server did not start")
+                    sys.exit(1)
+                # First requests build each worker's interpreters
+                run_clients(base_url, args.app, workers, 2)
+                row = run_clients(base_url, args.app, args.clients, args.duration)
+            finally:
+                server.terminate()
+                server.wait()
+            row['workers'] = workers
+            results.append(row)
+
+    print(f"\n{'Workers':>8} {'Requests':>9} {'Errors':>7} {'Reused':>7} {'Req/s':>8} "
+          f"{'Analyzed/s':>11} {'p50 ms':>8} {'p95 ms':>8} {'Cache hits':>11}")
+    print("-" * 86)
+    for row in results:
+        p50 = f"{row['p50_ms']:.0f}" if row['p50_ms'] is not None else '-'
+        p95 = f"{row['p95_ms']:.0f}" if row['p95_ms'] is not None else '-'
+        hit_rate = (f"{row['cache_hit_rate'] * 100:.0f}%" if row['cache_hit_rate'] is not None
+                    else '-')
+        print(f"{str(row['workers'] or 'remote'):>8} {row['requests']:>9d} {row['errors']:>7d} "
+              f"{row['reused']:>7d} {row['requests_per_second']:>8.1f} "
+              f"{row['analyzed_per_second']:>11.1f} {p50:>8} {p95:>8} {hit_rate:>11}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'app': args.app, 'clients': args.clients,
+                       'duration': args.duration, 'runs': results}, f, indent=2)
+        print(f"\n✓ Results saved to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
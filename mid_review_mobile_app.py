@@ -21,15 +21,30 @@ sys.path.append('src')
 from face_detector import FaceDetector
 from cross_dataset_ensemble_imagenet import CrossDatasetEnsemble
 from wellbeing_advisor import WellbeingAdvisor
+from load_shedder import LoadShedder
+from prediction_cache import cached_recognizer
+import metrics
+import model_warmup
+import model_registry
 
 # Initialize Flask app
 app = Flask(__name__)
+# Prometheus metrics at /metrics
+metrics.register_flask(app)
+# GET /health: 503 until the models are loaded and warmed up
+model_warmup.register_flask(app)
+# Model versions at /admin/models, hot-swap with POST /admin/models/<name>
+model_registry.register_flask(app)
 
 # Initialize models (load once)
 print("Loading models...")
 face_detector = FaceDetector(method='haar')
-emotion_recognizer = CrossDatasetEnsemble()
+# Reuse predictions for near-identical face crops (FER_PREDICTION_CACHE=0 disables)
+emotion_recognizer = cached_recognizer(CrossDatasetEnsemble())
 wellbeing = WellbeingAdvisor()
+# Degrades the stream when frames take longer than FER_LATENCY_BUDGET_MS
+shedder = LoadShedder('stream')
+model_warmup.register('emotion_recognizer', emotion_recognizer)
 print("Models loaded!")
 
 # Global variables
@@ -49,51 +64,70 @@ def generate_frames(camera_source=0):
     cap = cv2.VideoCapture(camera_source)
     frame_count = 0
     start_time = time.time()
+    # (box, emotion, confidence, agreement) per face of the last analyzed frame
+    detections = []
     
     while True:
-        success, frame = cap.read()
+        with metrics.timer('fer_stage_seconds', stage='capture'):
+            success, frame = cap.read()
         if not success:
             break
         
         # Mirror for selfie view
         frame = cv2.flip(frame, 1)
+        frame_start = time.perf_counter()
+        metrics.inc('fer_frames_total')
         
-        # Detect faces
-        faces = face_detector.detect_faces(frame)
-        
-        for (x1, y1, x2, y2) in faces:
-            x1, y1 = max(0, x1), max(0, y1)
-            x2, y2 = min(frame.shape[1], x2), min(frame.shape[0], y2)
-            
-            face_roi = frame[y1:y2, x1:x2]
+        # Over the latency budget, skipped frames redraw the last detections
+        analyzed = shedder.should_analyze()
+        if analyzed:
+            # Detect faces
+            with metrics.timer('fer_stage_seconds', stage='detect'):
+                faces = face_detector.detect_faces(frame, scale=shedder.detect_scale)
             
-            if face_roi.size > 0:
-                # Predict emotion
-                emotion, confidence, probs, individual, agreement = \
-                    emotion_recognizer.predict_emotion(face_roi)
-                
-                # Update globals
-                current_emotion = emotion
-                current_confidence = confidence
-                current_suggestion = wellbeing.get_suggestion(emotion)
-                model_agreement = "High" if agreement > 0.7 else "Moderate"
+            detections = []
+            for (x1, y1, x2, y2) in faces:
+                x1, y1 = max(0, x1), max(0, y1)
+                x2, y2 = min(frame.shape[1], x2), min(frame.shape[0], y2)
                 
-                # Draw on frame
-                color = emotion_recognizer.get_emotion_color(emotion)
-                thickness = 4 if agreement > 0.7 else 2
-                cv2.rectangle(frame, (x1, y1), (x2, y2), color, thickness)
+                face_roi = frame[y1:y2, x1:x2]
                 
-                # Emotion label
-                label = f"{emotion} ({confidence*100:.0f}%)"
-                label_size = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 1.5, 3)[0]
-                
-                # Background for label
-                cv2.rectangle(frame, (x1, y1 - 50), 
-                            (x1 + label_size[0] + 10, y1), (0, 0, 0), -1)
-                
-                # Label text
-                cv2.putText(frame, label, (x1 + 5, y1 - 15),
-                          cv2.FONT_HERSHEY_SIMPLEX, 1.5, color, 3)
+                if face_roi.size > 0:
+                    # Predict emotion
+                    metrics.inc('fer_faces_total')
+                    with metrics.timer('fer_stage_seconds', stage='predict'):
+                        emotion, confidence, probs, individual, agreement = \
+                            emotion_recognizer.predict_emotion(
+                                face_roi, single_model=shedder.single_model)
+                    
+                    # Update globals
+                    current_emotion = emotion
+                    current_confidence = confidence
+                    current_suggestion = wellbeing.get_suggestion(emotion)
+                    if agreement is None:
+                        # Shedding load: only the FER2013 CNN ran
+                        model_agreement = "N/A"
+                    else:
+                        model_agreement = "High" if agreement > 0.7 else "Moderate"
+                    detections.append(((x1, y1, x2, y2), emotion, confidence, agreement))
+        
+        for (x1, y1, x2, y2), emotion, confidence, agreement in detections:
+            # Draw on frame
+            color = emotion_recognizer.get_emotion_color(emotion)
+            thickness = 4 if agreement is not None and agreement > 0.7 else 2
+            cv2.rectangle(frame, (x1, y1), (x2, y2), color, thickness)
+            
+            # Emotion label
+            label = f"{emotion} ({confidence*100:.0f}%)"
+            label_size = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 1.5, 3)[0]
+            
+            # Background for label
+            cv2.rectangle(frame, (x1, y1 - 50), 
+                        (x1 + label_size[0] + 10, y1), (0, 0, 0), -1)
+            
+            # Label text
+            cv2.putText(frame, label, (x1 + 5, y1 - 15),
+                      cv2.FONT_HERSHEY_SIMPLEX, 1.5, color, 3)
         
         # Calculate FPS
         frame_count += 1
@@ -108,8 +142,12 @@ def generate_frames(camera_source=0):
                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
         
         # Encode frame
-        ret, buffer = cv2.imencode('.jpg', frame)
-        frame = buffer.tobytes()
+        with metrics.timer('fer_stage_seconds', stage='encode'):
+            ret, buffer = cv2.imencode('.jpg', frame)
+            frame = buffer.tobytes()
+        
+        if analyzed:
+            shedder.record(time.perf_counter() - frame_start)
         
         yield (b'--frame\r\n'
                b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
@@ -380,6 +418,7 @@ def get_emotion():
         'suggestion': current_suggestion,
         'agreement': model_agreement,
         'fps': fps,
+        'degradation': shedder.status(),
         'timestamp': datetime.now().isoformat()
     })
 
@@ -410,6 +449,11 @@ def get_contextual_advice():
 if __name__ == '__main__':
     import socket
     
+    # Serve at once; models load in the background (gunicorn: per worker)
+    model_warmup.start()
+    # Swap in retrained models without a restart
+    model_registry.registry.watch()
+    
     # Get laptop IP
     hostname = socket.gethostname()
     local_ip = socket.gethostbyname(hostname)
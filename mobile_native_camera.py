@@ -12,6 +12,10 @@ import base64
 import sys
 import os
 import json
+import time
+import shutil
+import tempfile
+import threading
 from datetime import datetime
 
 sys.path.append('src')
@@ -19,15 +23,44 @@ sys.path.append('src')
 from face_detector import FaceDetector
 from cross_dataset_ensemble_imagenet import CrossDatasetEnsemble
 from three_dataset_ensemble import ThreeDatasetEnsemble
+from distilled_student import DistilledStudent
 from wellbeing_advisor import WellbeingAdvisor
+from video_jobs import VideoJobQueue, new_job_id, is_valid_job_id
+from video_stream import (StreamingVideoDecoder, UploadOffsetError, read_video_file,
+                          create_upload, append_upload_chunk, finish_upload)
+from frame_sampler import AdaptiveFrameSampler, interpolate_keyframes
+from face_tracker import FaceTracker
+from load_shedder import LoadShedder
+from prediction_cache import cached_recognizer
+import metrics
+import sampling_profiler
+import model_warmup
+import model_registry
 
 app = Flask(__name__)
+# Prometheus metrics at /metrics
+metrics.register_flask(app)
+# On-demand stack sampling at /admin/profile (local requests or FER_ADMIN_TOKEN)
+sampling_profiler.register_flask(app)
+# GET /health: 503 until the models are loaded and warmed up
+model_warmup.register_flask(app)
+# Model versions at /admin/models, hot-swap with POST /admin/models/<name>
+model_registry.register_flask(app)
 
-# Initialize models
+# Initialize models (loaded lazily, warmed up in the background)
 print("Loading models...")
 face_detector = FaceDetector(method='haar')
-emotion_recognizer = ThreeDatasetEnsemble()
+# FER_RECOGNIZER=student: single distilled model instead of the ensemble
+if os.getenv('FER_RECOGNIZER', 'ensemble') == 'student':
+    emotion_recognizer = DistilledStudent()
+else:
+    emotion_recognizer = ThreeDatasetEnsemble()
+# Reuse predictions for near-identical face crops (FER_PREDICTION_CACHE=0 disables)
+emotion_recognizer = cached_recognizer(emotion_recognizer)
 wellbeing = WellbeingAdvisor()
+# Degrades /process_frame when frames take longer than FER_LATENCY_BUDGET_MS
+shedder = LoadShedder('camera')
+model_warmup.register('emotion_recognizer', emotion_recognizer)
 print("Models loaded!")
 
 @app.route('/')
@@ -309,6 +342,11 @@ def index():
                         🎬 Process Video
                     </button>
                     
+                    <button id="cancel-button" class="process-button" onclick="cancelVideo()"
+                            style="background: #d50000;">
+                        ✖ Cancel
+                    </button>
+                    
                     <div class="progress-bar" id="progress-bar">
                         <div class="progress-fill" id="progress-fill"></div>
                     </div>
@@ -347,6 +385,9 @@ def index():
                 'Disgust': '#008000', 'Neutral': '#808080'
             };
             
+            // Keeps face track IDs stable across this page's frames
+            const sessionId = Math.random().toString(36).slice(2) + Date.now().toString(36);
+            
             let currentTab = 'live';
             let processingInterval = null;
             let selectedFile = null;
@@ -418,12 +459,19 @@ def index():
                     const response = await fetch('/process_frame', {
                         method: 'POST',
                         headers: { 'Content-Type': 'application/json' },
-                        body: JSON.stringify({ image: imageData })
+                        body: JSON.stringify({ image: imageData, session_id: sessionId })
                     });
                     
                     const data = await response.json();
                     updateUI(data);
                     
+                    if (data.faces) {
+                        statusEl.innerHTML = data.faces.length > 1
+                            ? `✅ Camera active · ${data.faces.length} faces: ` +
+                              data.faces.map(f => `#${f.track_id} ${f.emotion}`).join(', ')
+                            : '✅ Camera active';
+                    }
+                    
                 } catch (error) {
                     console.error('Processing error:', error);
                 }
@@ -446,60 +494,65 @@ def index():
                 }
             }
             
+            let currentJobId = null;
+            let jobEvents = null;
+            
             async function processVideo() {
                 if (!selectedFile) return;
                 
                 const processBtn = document.getElementById('process-button');
+                const cancelBtn = document.getElementById('cancel-button');
                 const progressBar = document.getElementById('progress-bar');
                 const progressFill = document.getElementById('progress-fill');
                 
                 processBtn.disabled = true;
-                processBtn.innerText = '⏳ Processing...';
+                processBtn.innerText = '⏳ Uploading...';
                 progressBar.style.display = 'block';
                 
-                const formData = new FormData();
-                formData.append('video', selectedFile);
-                
                 try {
-                    const response = await fetch('/process_video', {
+                    // Start a chunked upload; analysis begins with the first chunks
+                    const response = await fetch('/uploads', {
                         method: 'POST',
-                        body: formData
+                        headers: { 'Content-Type': 'application/json' },
+                        body: JSON.stringify({ size: selectedFile.size })
                     });
+                    const job = await response.json();
+                    if (!response.ok) throw new Error(job.error);
                     
-                    const reader = response.body.getReader();
-                    const decoder = new TextDecoder();
+                    currentJobId = job.job_id;
+                    processBtn.innerText = '⏳ Processing...';
+                    cancelBtn.style.display = 'block';
                     
-                    while (true) {
-                        const { done, value } = await reader.read();
-                        if (done) break;
+                    // EventSource resumes from Last-Event-ID after a dropped connection
+                    jobEvents = new EventSource(job.events_url);
+                    jobEvents.onmessage = (event) => {
+                        const data = JSON.parse(event.data);
+                        
+                        if (data.progress !== undefined) {
+                            progressFill.style.width = data.progress + '%';
+                        }
                         
-                        const chunk = decoder.decode(value);
-                        const lines = chunk.split('\\n');
+                        if (data.emotion) {
+                            updateUI(data);
+                        }
                         
-                        for (const line of lines) {
-                            if (line.startsWith('data: ')) {
-                                const data = JSON.parse(line.slice(6));
-                                
-                                if (data.progress !== undefined) {
-                                    progressFill.style.width = data.progress + '%';
-                                }
-                                
-                                if (data.emotion) {
-                                    updateUI(data);
-                                }
-                                
-                                if (data.done) {
-                                    processBtn.disabled = false;
-                                    processBtn.innerText = '✅ Complete!';
-                                    setTimeout(() => {
-                                        processBtn.innerText = '🎬 Process Video';
-                                        progressBar.style.display = 'none';
-                                        progressFill.style.width = '0%';
-                                    }, 2000);
-                                }
-                            }
+                        if (data.done) {
+                            jobEvents.close();
+                            jobEvents = null;
+                            currentJobId = null;
+                            cancelBtn.style.display = 'none';
+                            processBtn.disabled = false;
+                            processBtn.innerText = data.status === 'done'
+                                ? '✅ Complete!' : '⚠️ ' + data.status;
+                            setTimeout(() => {
+                                processBtn.innerText = '🎬 Process Video';
+                                progressBar.style.display = 'none';
+                                progressFill.style.width = '0%';
+                            }, 2000);
                         }
-                    }
+                    };
+                    
+                    await uploadChunks(job.upload_url, selectedFile);
                     
                 } catch (error) {
                     console.error('Video processing error:', error);
@@ -508,6 +561,25 @@ def index():
                 }
             }
             
+            async function uploadChunks(uploadUrl, file) {
+                const chunkSize = 1024 * 1024;
+                for (let offset = 0; offset < file.size; offset += chunkSize) {
+                    const response = await fetch(uploadUrl + '?offset=' + offset, {
+                        method: 'PUT',
+                        headers: { 'Content-Type': 'application/octet-stream' },
+                        body: file.slice(offset, offset + chunkSize)
+                    });
+                    // Job cancelled or failed: the event stream reports why
+                    if (!response.ok) return;
+                }
+                await fetch(uploadUrl + '/complete', { method: 'POST' });
+            }
+            
+            async function cancelVideo() {
+                if (!currentJobId) return;
+                await fetch('/jobs/' + currentJobId + '/cancel', { method: 'POST' });
+            }
+            
             // Update UI with results
             function updateUI(data) {
                 if (data.emotion) {
@@ -534,136 +606,468 @@ def index():
     """
     return render_template_string(html)
 
+def crop_faces(frame, faces):
+    """Clip detected boxes to the frame; returns (boxes, face_rois)"""
+    boxes, rois = [], []
+    for (x1, y1, x2, y2) in faces:
+        x1, y1 = max(0, int(x1)), max(0, int(y1))
+        x2, y2 = min(frame.shape[1], int(x2)), min(frame.shape[0], int(y2))
+        
+        face_roi = frame[y1:y2, x1:x2]
+        if face_roi.size > 0:
+            boxes.append((x1, y1, x2, y2))
+            rois.append(face_roi)
+    return boxes, rois
+
+
+def agreement_label(agreement):
+    """Model agreement for display (None: a single model answered)"""
+    if agreement is None:
+        return 'N/A'
+    return 'High' if agreement > 0.7 else 'Moderate'
+
+
+def describe_faces(boxes, track_ids, results):
+    """JSON-ready per-face results, largest face first"""
+    faces = []
+    for box, track_id, (emotion, confidence, probs, individual, agreement) in \
+            zip(boxes, track_ids, results):
+        faces.append({
+            'track_id': track_id,
+            'box': list(box),
+            'emotion': emotion,
+            'confidence': float(confidence) * 100,
+            'agreement': agreement_label(agreement)
+        })
+    faces.sort(key=lambda f: (f['box'][2] - f['box'][0]) * (f['box'][3] - f['box'][1]),
+               reverse=True)
+    return faces
+
+
+# Face trackers for live camera sessions, keyed by client session ID
+session_trackers = {}
+session_lock = threading.Lock()
+SESSION_IDLE_TIMEOUT = 600
+
+
+def track_session_faces(session_id, boxes):
+    """Stable per-session track IDs for this frame's faces"""
+    with session_lock:
+        now = time.time()
+        for sid, tracker in list(session_trackers.items()):
+            if now - tracker.last_update > SESSION_IDLE_TIMEOUT:
+                del session_trackers[sid]
+                emotion_recognizer.drop_tracks([(sid, t) for t in tracker.tracks])
+        
+        tracker = session_trackers.setdefault(session_id, FaceTracker())
+        track_ids = tracker.update(boxes)
+        emotion_recognizer.drop_tracks([(session_id, t) for t in tracker.expired])
+    return track_ids
+
+
+# Last /process_frame response per session, reused for frames skipped under load
+session_responses = {}
+
+
+def remember_response(session_id, response):
+    with session_lock:
+        now = time.time()
+        for sid, (last_time, _) in list(session_responses.items()):
+            if now - last_time > SESSION_IDLE_TIMEOUT:
+                del session_responses[sid]
+                shedder.forget(sid)
+        session_responses[session_id] = (now, response)
+
+
+def frame_response(response):
+    return jsonify(dict(response, degradation=shedder.status()))
+
+
 @app.route('/process_frame', methods=['POST'])
 def process_frame():
-    """Process single frame from phone camera"""
+    """Process single frame from phone camera (every detected face)"""
     try:
+        start = time.perf_counter()
         # Get image data
         data = request.json
+        session_id = str(data.get('session_id') or request.remote_addr)
+        
+        # Over the latency budget: answer some frames with the previous result
+        previous = session_responses.get(session_id)
+        if previous is not None and not shedder.should_analyze(session_id):
+            return frame_response(dict(previous[1], reused=True))
+        
         image_data = data['image'].split(',')[1]  # Remove data:image/jpeg;base64,
         
         # Decode base64 to image
-        img_bytes = base64.b64decode(image_data)
-        nparr = np.frombuffer(img_bytes, np.uint8)
-        frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        with metrics.timer('fer_stage_seconds', stage='decode', source='camera'):
+            img_bytes = base64.b64decode(image_data)
+            nparr = np.frombuffer(img_bytes, np.uint8)
+            frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
         
         # Detect faces
-        faces = face_detector.detect_faces(frame)
+        with metrics.timer('fer_stage_seconds', stage='detect', source='camera'):
+            boxes, face_rois = crop_faces(
+                frame, face_detector.detect_faces(frame, scale=shedder.detect_scale))
+        metrics.inc('fer_frames_total', source='camera')
         
-        if len(faces) > 0:
-            x1, y1, x2, y2 = faces[0]
-            x1, y1 = max(0, x1), max(0, y1)
-            x2, y2 = min(frame.shape[1], x2), min(frame.shape[0], y2)
+        if face_rois:
+            with metrics.timer('fer_stage_seconds', stage='track', source='camera'):
+                track_ids = track_session_faces(session_id, boxes)
             
-            face_roi = frame[y1:y2, x1:x2]
+            # One batched forward pass per model for all faces,
+            # smoothing history kept per tracked face
+            metrics.inc('fer_faces_total', len(face_rois), source='camera')
+            with metrics.timer('fer_stage_seconds', stage='predict', source='camera'):
+                results = emotion_recognizer.predict_emotions(
+                    face_rois, track_ids=[(session_id, t) for t in track_ids],
+                    single_model=shedder.single_model)
+            faces = describe_faces(boxes, track_ids, results)
             
-            if face_roi.size > 0:
-                # Predict emotion
-                emotion, confidence, probs, individual, agreement = \
-                    emotion_recognizer.predict_emotion(face_roi)
-                
-                suggestion = wellbeing.get_suggestion(emotion)
-                
-                return jsonify({
-                    'emotion': emotion,
-                    'confidence': confidence * 100,
-                    'suggestion': suggestion,
-                    'agreement': 'High' if agreement > 0.7 else 'Moderate'
-                })
+            # Top-level fields describe the largest (closest) face
+            primary = faces[0]
+            response = {
+                'emotion': primary['emotion'],
+                'confidence': primary['confidence'],
+                'suggestion': wellbeing.get_suggestion(primary['emotion']),
+                'agreement': primary['agreement'],
+                'faces': faces
+            }
+        else:
+            response = {
+                'emotion': 'No face',
+                'confidence': 0,
+                'suggestion': 'Please look at the camera',
+                'faces': []
+            }
         
-        return jsonify({
-            'emotion': 'No face',
-            'confidence': 0,
-            'suggestion': 'Please look at the camera'
-        })
+        remember_response(session_id, response)
+        shedder.record(time.perf_counter() - start)
+        return frame_response(response)
         
     except Exception as e:
         print(f"Error: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
 
-@app.route('/process_video', methods=['POST'])
-def process_video():
-    """Process uploaded video file"""
+def analyze_video(source, job):
+    """
+    Analyze a video inside a background job
+    Args:
+        source: Path of a saved upload, or a StreamingVideoDecoder
+                for an upload that is still arriving
+    """
+    if isinstance(source, StreamingVideoDecoder):
+        frames = source.frames()
+    else:
+        frames = read_video_file(source)
+    
+    sampler = AdaptiveFrameSampler()
+    # Tracks must survive the longest gap between analyzed frames
+    tracker = FaceTracker(max_age=max(2.0, 2.0 / sampler.min_rate))
+    track_keyframes = {}
+    
     try:
-        if 'video' not in request.files:
-            return jsonify({'error': 'No video file'}), 400
-        
-        video_file = request.files['video']
-        
-        # Save temporarily
-        import tempfile
-        temp_dir = tempfile.mkdtemp()
-        temp_path = os.path.join(temp_dir, 'uploaded_video.mp4')
-        video_file.save(temp_path)
-        
-        def generate():
-            """Stream processing results"""
-            import cv2
+        for frame, progress, timestamp in frames:
+            job.check_cancelled()
             
-            cap = cv2.VideoCapture(temp_path)
-            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-            frame_count = 0
+            # Skip static frames; run inference on changes within budget
+            if not sampler.should_analyze(frame, timestamp):
+                continue
             
-            emotion_counts = {}
+            # Detect faces
+            with metrics.timer('fer_stage_seconds', stage='detect', source='video'):
+                boxes, face_rois = crop_faces(frame, face_detector.detect_faces(frame))
+            metrics.inc('fer_frames_total', source='video')
+            sampler.set_face_boxes(boxes, frame.shape)
             
-            while cap.isOpened():
-                ret, frame = cap.read()
-                if not ret:
-                    break
-                
-                frame_count += 1
-                
-                # Process every 10th frame for speed
-                if frame_count % 10 != 0:
-                    continue
-                
-                # Detect faces
-                faces = face_detector.detect_faces(frame)
-                
-                if len(faces) > 0:
-                    x1, y1, x2, y2 = faces[0]
-                    x1, y1 = max(0, x1), max(0, y1)
-                    x2, y2 = min(frame.shape[1], x2), min(frame.shape[0], y2)
-                    
-                    face_roi = frame[y1:y2, x1:x2]
-                    
-                    if face_roi.size > 0:
-                        # Predict emotion
-                        emotion, confidence, probs, individual, agreement = \
-                            emotion_recognizer.predict_emotion(face_roi)
-                        
-                        # Count emotions
-                        emotion_counts[emotion] = emotion_counts.get(emotion, 0) + 1
-                        
-                        suggestion = wellbeing.get_suggestion(emotion)
-                        
-                        # Send progress
-                        progress = int((frame_count / total_frames) * 100)
-                        yield f"data: {json.dumps({'emotion': emotion, 'confidence': confidence * 100, 'suggestion': suggestion, 'progress': progress})}\n\n"
-                
-            cap.release()
+            if not face_rois:
+                sampler.record(timestamp, None)
+                continue
             
-            # Send final result (most common emotion)
-            if emotion_counts:
-                most_common = max(emotion_counts, key=emotion_counts.get)
-                final_suggestion = wellbeing.get_suggestion(most_common)
-                yield f"data: {json.dumps({'emotion': most_common, 'confidence': 100, 'suggestion': final_suggestion, 'done': True})}\n\n"
+            track_ids = tracker.update(boxes, timestamp)
             
-            # Cleanup
-            import shutil
-            shutil.rmtree(temp_dir, ignore_errors=True)
-        
-        return Response(generate(), mimetype='text/event-stream')
-        
+            # Jobs run concurrently, so skip the recognizer's shared
+            # smoothing history; the summary votes over frames instead
+            metrics.inc('fer_faces_total', len(face_rois), source='video')
+            with metrics.timer('fer_stage_seconds', stage='predict', source='video'):
+                results = emotion_recognizer.predict_emotions(face_rois, use_smoothing=False)
+            for track_id, result in zip(track_ids, results):
+                track_keyframes.setdefault(track_id, []).append(
+                    (timestamp, np.asarray(result[2], dtype=np.float32)))
+            
+            # The overall timeline follows the largest face
+            largest = max(range(len(boxes)), key=lambda i:
+                          (boxes[i][2] - boxes[i][0]) * (boxes[i][3] - boxes[i][1]))
+            sampler.record(timestamp, results[largest][2])
+            
+            faces = describe_faces(boxes, track_ids, results)
+            primary = faces[0]
+            
+            # Record progress
+            job.emit({
+                'emotion': primary['emotion'],
+                'confidence': primary['confidence'],
+                'suggestion': wellbeing.get_suggestion(primary['emotion']),
+                'progress': progress,
+                'timestamp': timestamp,
+                'faces': faces
+            })
+        # The decoder ends quietly when a cancel aborts it
+        job.check_cancelled()
+    finally:
+        frames.close()
+        if isinstance(source, StreamingVideoDecoder):
+            source.abort()
+    
+    return summarize_video(sampler, track_keyframes)
+
+
+def count_emotions(frame_times, interpolated):
+    """Per-frame emotion counts and runs of the same emotion"""
+    emotion_counts = {}
+    segments = []
+    
+    for t, probs in zip(frame_times, interpolated):
+        emotion = None if probs is None else emotion_recognizer.emotions[int(np.argmax(probs))]
+        if emotion is not None:
+            emotion_counts[emotion] = emotion_counts.get(emotion, 0) + 1
+        if segments and segments[-1]['emotion'] == emotion:
+            segments[-1]['end'] = t
+        else:
+            segments.append({'emotion': emotion, 'start': t, 'end': t})
+    return emotion_counts, segments
+
+
+def summarize_video(sampler, track_keyframes):
+    """
+    Per-frame emotions interpolated from the analyzed frames
+    Counts cover every frame, so sparsely sampled static stretches
+    weigh as much as busy ones. The overall timeline follows the largest
+    face; each tracked face is summarised over the span it was seen.
+    """
+    emotion_counts, segments = count_emotions(sampler.frame_times, sampler.interpolate())
+    
+    tracks = {}
+    for track_id, keyframes in track_keyframes.items():
+        first, last = keyframes[0][0], keyframes[-1][0]
+        span = [t for t in sampler.frame_times if first <= t <= last]
+        counts, track_segments = count_emotions(span, interpolate_keyframes(keyframes, span))
+        tracks[str(track_id)] = {
+            'first_seen': first,
+            'last_seen': last,
+            'emotion_counts': counts,
+            'emotion': max(counts, key=counts.get),
+            'segments': track_segments
+        }
+    
+    summary = {
+        'emotion_counts': emotion_counts,
+        'segments': segments,
+        'tracks': tracks,
+        'sampling': sampler.stats()
+    }
+    if emotion_counts:
+        summary['emotion'] = max(emotion_counts, key=emotion_counts.get)
+    return summary
+
+
+video_jobs = VideoJobQueue(analyze_video,
+                           jobs_dir=os.getenv('FER_JOBS_DIR', 'jobs'))
+
+
+
+def remove_stale_uploads():
+    """Delete spooled uploads of jobs that did not survive the last restart"""
+    uploads_dir = os.path.join(video_jobs.jobs_dir, 'uploads')
+    if not os.path.isdir(uploads_dir):
+        return
+    for job_id in os.listdir(uploads_dir):
+        job = video_jobs.get(job_id)
+        if job is None or job.finished:
+            shutil.rmtree(os.path.join(uploads_dir, job_id), ignore_errors=True)
+
+
+remove_stale_uploads()
+
+
+@app.route('/process_video', methods=['POST'])
+def process_video():
+    """Queue uploaded video file for background analysis"""
+    if 'video' not in request.files:
+        return jsonify({'error': 'No video file'}), 400
+    
+    video_file = request.files['video']
+    
+    # Save temporarily; the job removes the directory when it ends
+    temp_dir = tempfile.mkdtemp()
+    try:
+        temp_path = os.path.join(temp_dir, 'uploaded_video.mp4')
+        video_file.save(temp_path)
+        job = video_jobs.submit(temp_path, cleanup_dir=temp_dir)
+    except Exception as e:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        print(f"Error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+    
+    return jsonify({
+        'job_id': job.job_id,
+        'status': job.status,
+        'status_url': f'/jobs/{job.job_id}',
+        'events_url': f'/jobs/{job.job_id}/events'
+    }), 202
+
+
+@app.route('/uploads', methods=['POST'])
+def start_upload():
+    """
+    Start a chunked upload; analysis begins as soon as the first
+    decodable frames arrive. Optional JSON body: {"size": total_bytes}
+    
+    Chunks are spooled under the jobs directory, so any server worker
+    can accept them while the owning worker decodes.
+    """
+    data = request.get_json(silent=True) or {}
+    
+    job_id = new_job_id()
+    work_dir = os.path.join(video_jobs.jobs_dir, 'uploads', job_id)
+    try:
+        create_upload(work_dir, data.get('size'))
+        decoder = StreamingVideoDecoder(work_dir)
+        job = video_jobs.submit(decoder, cleanup_dir=work_dir, job_id=job_id)
     except Exception as e:
+        shutil.rmtree(work_dir, ignore_errors=True)
         print(f"Error: {str(e)}")
         return jsonify({'error': str(e)}), 500
+    
+    job.add_cancel_callback(decoder.abort)
+    # Cancels written by other workers (.cancel file) while the upload is idle
+    decoder.cancel_check = job.is_cancelled
+    
+    return jsonify({
+        'job_id': job.job_id,
+        'upload_url': f'/uploads/{job.job_id}',
+        'status_url': f'/jobs/{job.job_id}',
+        'events_url': f'/jobs/{job.job_id}/events'
+    }), 201
+
+
+def upload_dir(job_id):
+    """Spool directory of an upload, or None for a malformed ID"""
+    if not is_valid_job_id(job_id):
+        return None
+    return os.path.join(video_jobs.jobs_dir, 'uploads', job_id)
+
+
+@app.route('/uploads/<job_id>', methods=['PUT'])
+def upload_chunk(job_id):
+    """
+    Append the next chunk (raw request body) to an upload
+    ?offset=N must equal the bytes received so far
+    """
+    work_dir = upload_dir(job_id)
+    if work_dir is None:
+        return jsonify({'error': 'Unknown or finished upload'}), 404
+    
+    try:
+        size = append_upload_chunk(work_dir, request.args.get('offset', type=int),
+                                   request.stream)
+    except FileNotFoundError:
+        return jsonify({'error': 'Unknown or finished upload'}), 404
+    except UploadOffsetError as e:
+        return jsonify({'error': 'Offset mismatch', 'offset': e.expected}), 409
+    
+    return jsonify({'offset': size})
+
+
+@app.route('/uploads/<job_id>/complete', methods=['POST'])
+def complete_upload(job_id):
+    """Signal that all chunks have been sent"""
+    work_dir = upload_dir(job_id)
+    if work_dir is None:
+        return jsonify({'error': 'Unknown or finished upload'}), 404
+    try:
+        size = finish_upload(work_dir)
+    except FileNotFoundError:
+        return jsonify({'error': 'Unknown or finished upload'}), 404
+    return jsonify({'job_id': job_id, 'offset': size})
+
+
+@app.route('/jobs', methods=['GET'])
+def list_jobs():
+    """List known video jobs"""
+    return jsonify(video_jobs.list_jobs())
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Poll a video job (add ?events=1 for all results so far)"""
+    job = video_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(job.to_dict(include_events=request.args.get('events') == '1'))
+
+
+@app.route('/jobs/<job_id>', methods=['DELETE'])
+@app.route('/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """Cancel a queued or running video job"""
+    job = video_jobs.cancel(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(job.to_dict())
+
+
+@app.route('/jobs/<job_id>/events')
+def job_events(job_id):
+    """
+    Stream job results as server-sent events
+    Resumable: EventSource reconnects with Last-Event-ID, or pass ?since=N
+    """
+    job = video_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    
+    since = request.headers.get('Last-Event-ID') or request.args.get('since') or 0
+    try:
+        since = max(0, int(since))
+    except ValueError:
+        since = 0
+    
+    def generate():
+        cursor = since
+        while True:
+            events, finished = job.wait_events(cursor)
+            for event in events:
+                cursor += 1
+                yield f"id: {cursor}\ndata: {json.dumps(event)}\n\n"
+            if finished and cursor >= len(job.events):
+                final = {'done': True, 'status': job.status, 'progress': job.progress}
+                if job.error:
+                    final['error'] = job.error
+                if job.summary and job.summary.get('emotion'):
+                    final['emotion'] = job.summary['emotion']
+                    final['confidence'] = 100
+                    final['suggestion'] = wellbeing.get_suggestion(job.summary['emotion'])
+                yield f"data: {json.dumps(final)}\n\n"
+                return
+            if not events:
+                # Keep-alive so proxies don't close an idle stream
+                yield ": ping\n\n"
+    
+    return Response(generate(), mimetype='text/event-stream')
 
 
 if __name__ == '__main__':
     import socket
     
+    # kill -USR2 <pid> starts/stops a profile (gunicorn.conf.py does this per worker)
+    sampling_profiler.install_signal_handler()
+    # gunicorn.conf.py starts this in each worker instead
+    model_warmup.start()
+    # Swap in retrained models without a restart
+    model_registry.registry.watch()
+    
     hostname = socket.gethostname()
     local_ip = socket.gethostbyname(hostname)
     
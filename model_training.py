@@ -1,12 +1,14 @@
 import tensorflow as tf
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import Dense, Dropout, Flatten, Conv2D, MaxPooling2D, BatchNormalization
-from tensorflow.keras.optimizers import Adam
 from tensorflow.keras.callbacks import ModelCheckpoint, EarlyStopping, ReduceLROnPlateau
-from tensorflow.keras.preprocessing.image import ImageDataGenerator
 import matplotlib.pyplot as plt
 import numpy as np
 import os
+import sys
+
+sys.path.append('src')
+
+from data_pipeline import image_dataset
+from fer_cnn import create_fer_model
 
 # Create models directory if it doesn't exist
 os.makedirs('models', exist_ok=True)
@@ -15,10 +17,9 @@ print("=" * 60)
 print("Facial Emotion Recognition - Model Training")
 print("=" * 60)
 
-# Data augmentation for training
-print("\n[1/6] Setting up data generators...")
-train_datagen = ImageDataGenerator(
-    rescale=1./255,
+# Data augmentation for training (applied per batch in the tf.data graph)
+print("\n[1/6] Setting up data pipelines...")
+train_augment = dict(
     rotation_range=20,
     width_shift_range=0.2,
     height_shift_range=0.2,
@@ -28,87 +29,33 @@ train_datagen = ImageDataGenerator(
     fill_mode='nearest'
 )
 
-test_datagen = ImageDataGenerator(rescale=1./255)
-
 # Load datasets
 print("[2/6] Loading training data...")
-train_generator = train_datagen.flow_from_directory(
+train_ds, train_info = image_dataset(
     'data/fer2013/train',
-    target_size=(48, 48),
+    image_size=(48, 48),
     batch_size=64,
     color_mode='grayscale',
-    class_mode='categorical',
-    shuffle=True
+    shuffle=True,
+    augment=train_augment
 )
 
 print("[3/6] Loading test data...")
-test_generator = test_datagen.flow_from_directory(
+test_ds, test_info = image_dataset(
     'data/fer2013/test',
-    target_size=(48, 48),
+    image_size=(48, 48),
     batch_size=64,
     color_mode='grayscale',
-    class_mode='categorical',
     shuffle=False
 )
 
-print(f"\nTraining samples: {train_generator.samples}")
-print(f"Test samples: {test_generator.samples}")
-print(f"Emotion classes: {list(train_generator.class_indices.keys())}")
+print(f"\nTraining samples: {train_info['samples']}")
+print(f"Test samples: {test_info['samples']}")
+print(f"Emotion classes: {train_info['class_names']}")
 
 # Define lightweight CNN architecture
 print("\n[4/6] Building model architecture...")
 
-def create_fer_model():
-    model = Sequential([
-        # First convolutional block
-        Conv2D(32, (3, 3), activation='relu', padding='same', input_shape=(48, 48, 1)),
-        BatchNormalization(),
-        Conv2D(32, (3, 3), activation='relu', padding='same'),
-        BatchNormalization(),
-        MaxPooling2D(pool_size=(2, 2)),
-        Dropout(0.25),
-        
-        # Second convolutional block
-        Conv2D(64, (3, 3), activation='relu', padding='same'),
-        BatchNormalization(),
-        Conv2D(64, (3, 3), activation='relu', padding='same'),
-        BatchNormalization(),
-        MaxPooling2D(pool_size=(2, 2)),
-        Dropout(0.25),
-        
-        # Third convolutional block
-        Conv2D(128, (3, 3), activation='relu', padding='same'),
-        BatchNormalization(),
-        Conv2D(128, (3, 3), activation='relu', padding='same'),
-        BatchNormalization(),
-        MaxPooling2D(pool_size=(2, 2)),
-        Dropout(0.25),
-        
-        # Fourth convolutional block
-        Conv2D(256, (3, 3), activation='relu', padding='same'),
-        BatchNormalization(),
-        MaxPooling2D(pool_size=(2, 2)),
-        Dropout(0.25),
-        
-        # Fully connected layers
-        Flatten(),
-        Dense(512, activation='relu'),
-        BatchNormalization(),
-        Dropout(0.5),
-        Dense(256, activation='relu'),
-        BatchNormalization(),
-        Dropout(0.5),
-        Dense(7, activation='softmax')  # 7 emotion classes
-    ])
-    
-    model.compile(
-        optimizer=Adam(learning_rate=0.001),
-        loss='categorical_crossentropy',
-        metrics=['accuracy']
-    )
-    
-    return model
-
 model = create_fer_model()
 model.summary()
 
@@ -143,8 +90,8 @@ print("This may take 30-60 minutes depending on your hardware...")
 print("-" * 60)
 
 history = model.fit(
-    train_generator,
-    validation_data=test_generator,
+    train_ds,
+    validation_data=test_ds,
     epochs=50,
     callbacks=[checkpoint, early_stop, reduce_lr],
     verbose=1
@@ -186,7 +133,7 @@ print("Training plots saved to 'models/training_history.png'")
 print("\n" + "=" * 60)
 print("Final Evaluation on Test Set")
 print("=" * 60)
-test_loss, test_accuracy = model.evaluate(test_generator)
+test_loss, test_accuracy = model.evaluate(test_ds)
 print(f"\nTest Loss: {test_loss:.4f}")
 print(f"Test Accuracy: {test_accuracy*100:.2f}%")
 
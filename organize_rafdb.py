@@ -1,11 +1,29 @@
 """
 Organize RAF-DB dataset that's already been renamed
-Copies from raf-db-raw to raf-db with proper structure
+Syncs raf-db-raw into raf-db with proper structure: files are hardlinked
+(or copied) in parallel, and files unchanged since the last run are
+skipped using data/raf-db/manifest.json.
+
+Usage:
+    python organize_rafdb.py [--copy] [--verify] [--workers N]
 """
 
 import os
-import shutil
-from pathlib import Path
+import sys
+import time
+import argparse
+
+sys.path.append('src')
+
+from dataset_sync import sync_files
+
+parser = argparse.ArgumentParser(description=__doc__,
+                                 formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument('--copy', action='store_true', help='Copy instead of hardlinking')
+parser.add_argument('--verify', action='store_true',
+                    help='Compare hashes even when size and mtime match')
+parser.add_argument('--workers', type=int, help='Copy threads (default 16)')
+args = parser.parse_args()
 
 print("=" * 70)
 print("Organizing RAF-DB Dataset")
@@ -59,8 +77,9 @@ for split in ['train', 'test']:
 print(f"\nCreating target directory: {target_dir}")
 os.makedirs(target_dir, exist_ok=True)
 
-# Copy and organize
-total_copied = 0
+# Plan: (source, destination) for every image, with folder names normalized
+pairs = []
+planned = set()
 
 for split in ['train', 'test']:
     print(f"\n{'='*70}")
@@ -71,8 +90,8 @@ for split in ['train', 'test']:
     split_target = os.path.join(target_dir, split)
     
     # Get all folders in source
-    source_folders = [f for f in os.listdir(split_source) 
-                     if os.path.isdir(os.path.join(split_source, f))]
+    source_folders = sorted(f for f in os.listdir(split_source)
+                            if os.path.isdir(os.path.join(split_source, f)))
     
     split_total = 0
     
@@ -90,31 +109,51 @@ for split in ['train', 'test']:
             print(f"  ⚠ Skipping unknown folder: {folder}")
             continue
         
-        # Create target folder
         target_folder = os.path.join(split_target, target_emotion)
-        os.makedirs(target_folder, exist_ok=True)
-        
-        # Copy images
         source_folder = os.path.join(split_source, folder)
-        image_files = [f for f in os.listdir(source_folder) 
-                      if f.lower().endswith(('.jpg', '.jpeg', '.png'))]
         
-        copied = 0
-        for img_file in image_files:
-            src = os.path.join(source_folder, img_file)
-            dst = os.path.join(target_folder, img_file)
-            
-            try:
-                shutil.copy2(src, dst)
-                copied += 1
-            except Exception as e:
-                print(f"    Error copying {img_file}: {str(e)}")
+        count = 0
+        with os.scandir(source_folder) as entries:
+            for entry in entries:
+                if not entry.is_file() or not entry.name.lower().endswith(('.jpg', '.jpeg', '.png')):
+                    continue
+                dst = os.path.join(target_folder, entry.name)
+                if dst in planned:
+                    # Two aliased folders with the same file name
+                    dst = os.path.join(target_folder, f"{folder_lower}_{entry.name}")
+                planned.add(dst)
+                pairs.append((entry.path, dst))
+                count += 1
         
-        split_total += copied
-        print(f"  {target_emotion:10s}: {copied:5d} images")
+        split_total += count
+        print(f"  {folder:10s} -> {target_emotion:10s}: {count:5d} images")
     
     print(f"\n  Total {split}: {split_total} images")
-    total_copied += split_total
+
+
+def show_progress(done, total):
+    if done % 1000 == 0 or done == total:
+        print(f"\r  Synced {done}/{total}", end='', flush=True)
+
+
+print(f"\nSyncing {len(pairs)} files ({'copy' if args.copy else 'hardlink'} mode)...")
+start_time = time.time()
+stats = sync_files(pairs, target_dir, workers=args.workers, link=not args.copy,
+                   verify=args.verify, progress=show_progress)
+elapsed = time.time() - start_time
+print()
+
+print(f"  Unchanged: {stats['skipped']}")
+print(f"  Linked:    {stats['linked']}")
+print(f"  Copied:    {stats['copied']}")
+print(f"  Removed:   {stats['removed']} (no longer in source)")
+if stats['failed']:
+    print(f"  ❌ Failed:  {stats['failed']}")
+    for error in stats['errors'][:10]:
+        print(f"    {error}")
+print(f"  Time:      {elapsed:.1f}s")
+
+total_copied = stats['linked'] + stats['copied']
 
 print("\n" + "=" * 70)
 print("Organization Complete!")
@@ -147,6 +186,6 @@ for split in ['train', 'test']:
     print(f"  {'Total':10s}: {split_total:5d} images")
 
 print("\n" + "=" * 70)
-print(f"✓ Total images copied: {total_copied}")
+print(f"✓ Images linked/copied this run: {total_copied} ({stats['skipped']} unchanged)")
 print(f"✓ Dataset ready at: {target_dir}")
 print("\nNext step: python finetune_rafdb.py")
\ No newline at end of file
@@ -0,0 +1,64 @@
+"""
+Pack the image datasets into memory-mapped arrays
+Decodes every split once into data/cache (see src/dataset_cache.py).
+Training and evaluation then read batches from the cache instead of
+decoding JPEGs each epoch. Unchanged splits are skipped, so this is
+cheap to re-run after adding images.
+
+Usage:
+    python pack_datasets.py [--datasets data/fer2013 data/raf-db]
+                            [--variants 48x48_grayscale 96x96_rgb] [--force]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.append('src')
+
+from dataset_cache import VARIANTS, pack_split, default_cache_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--datasets', nargs='+', default=['data/fer2013', 'data/raf-db'])
+    parser.add_argument('--splits', nargs='+', default=['train', 'test'])
+    parser.add_argument('--variants', nargs='+', choices=sorted(VARIANTS),
+                        default=sorted(VARIANTS))
+    parser.add_argument('--cache-dir', default=default_cache_dir())
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 4)
+    parser.add_argument('--force', action='store_true', help='Rebuild unchanged splits')
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print(f"Packing datasets into {args.cache_dir}")
+    print("=" * 70)
+
+    for dataset in args.datasets:
+        for split in args.splits:
+            directory = os.path.join(dataset, split)
+            if not os.path.isdir(directory):
+                print(f"  ⚠ Skipping missing split: {directory}")
+                continue
+            for variant in args.variants:
+                image_size, color_mode = VARIANTS[variant]
+                start = time.time()
+                manifest, rebuilt = pack_split(directory, image_size, color_mode,
+                                               cache_dir=args.cache_dir,
+                                               workers=args.workers, force=args.force)
+                if rebuilt:
+                    size = manifest['samples'] * image_size[0] * image_size[1] * \
+                        (1 if color_mode == 'grayscale' else 3) / (1024 * 1024)
+                    print(f"  ✓ {directory} {variant}: {manifest['samples']} images, "
+                          f"{size:.1f} MB in {time.time() - start:.1f}s")
+                else:
+                    print(f"  ✓ Up to date: {directory} {variant}")
+
+    print("\n✓ Done. Training scripts use the cache automatically "
+          "(FER_DATA_SOURCE=files to bypass it)")
+
+
+if __name__ == '__main__':
+    main()
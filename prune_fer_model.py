@@ -0,0 +1,228 @@
+"""
+Compress the FER2013 CNN: channel pruning + weight clustering
+1. Channel pruning to a target sparsity, reached gradually over several
+   steps (polynomial schedule) with a short fine-tune after each cut
+2. Final fine-tune of the slim model
+3. Weight clustering fine-tune (needs tensorflow-model-optimization)
+4. Export .h5 and .tflite, then report size, CPU latency and accuracy on
+   data/fer2013/test for the original and compressed models
+
+Outputs:
+    models/fer_model_pruned.h5 / .tflite
+    models/fer_model_pruned_clustered.h5 / .tflite
+    models/fer_model_pruned.json (report)
+
+Usage:
+    python prune_fer_model.py [--sparsity 0.5] [--steps 4] [--clusters 16]
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.append('src')
+
+import tensorflow as tf
+from tensorflow.keras.callbacks import ModelCheckpoint, EarlyStopping, ReduceLROnPlateau
+
+from data_pipeline import image_dataset
+from model_pruning import (model_widths, sparsity_schedule, pruned_widths,
+                           prune_channels, cluster_model, strip_clustering)
+
+# Same augmentation as model_training.py
+TRAIN_AUGMENT = dict(
+    rotation_range=20,
+    width_shift_range=0.2,
+    height_shift_range=0.2,
+    horizontal_flip=True,
+    zoom_range=0.2,
+    shear_range=0.2,
+    fill_mode='nearest'
+)
+
+
+def to_tflite(model):
+    """Dynamic-range quantized flatbuffer (as convert_to_tflite.py)"""
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    return converter.convert()
+
+
+def tflite_interpreter(tflite_model, batch=1):
+    interpreter = tf.lite.Interpreter(model_content=tflite_model, num_threads=1)
+    index = interpreter.get_input_details()[0]['index']
+    interpreter.resize_tensor_input(index, (batch, 48, 48, 1))
+    interpreter.allocate_tensors()
+    return interpreter
+
+
+def tflite_accuracy(tflite_model, test_ds):
+    interpreter = tflite_interpreter(tflite_model)
+    input_index = interpreter.get_input_details()[0]['index']
+    output_index = interpreter.get_output_details()[0]['index']
+    correct = total = 0
+    for images, labels in test_ds:
+        images, labels = images.numpy(), np.argmax(labels.numpy(), axis=1)
+        for image, label in zip(images, labels):
+            interpreter.set_tensor(input_index, image[None])
+            interpreter.invoke()
+            correct += int(np.argmax(interpreter.get_tensor(output_index)) == label)
+            total += 1
+    return correct / total
+
+
+def tflite_latency_ms(tflite_model, runs=300):
+    """Median single-image latency, one CPU thread"""
+    interpreter = tflite_interpreter(tflite_model)
+    input_index = interpreter.get_input_details()[0]['index']
+    image = np.random.rand(1, 48, 48, 1).astype(np.float32)
+    times = []
+    for run in range(runs + 20):
+        start = time.perf_counter()
+        interpreter.set_tensor(input_index, image)
+        interpreter.invoke()
+        if run >= 20:
+            times.append(time.perf_counter() - start)
+    return 1000 * float(np.median(times))
+
+
+def measure(name, model, h5_path, tflite_model, test_ds):
+    _, accuracy = model.evaluate(test_ds, verbose=0)
+    return {
+        'model': name,
+        'parameters': model.count_params(),
+        'h5_mb': os.path.getsize(h5_path) / (1024 * 1024),
+        'tflite_mb': len(tflite_model) / (1024 * 1024),
+        'tflite_gzip_mb': len(gzip.compress(tflite_model)) / (1024 * 1024),
+        'latency_ms': tflite_latency_ms(tflite_model),
+        'accuracy': accuracy,
+        'tflite_accuracy': tflite_accuracy(tflite_model, test_ds)
+    }
+
+
+def save_tflite(tflite_model, h5_path):
+    tflite_path = os.path.splitext(h5_path)[0] + '.tflite'
+    with open(tflite_path, 'wb') as f:
+        f.write(tflite_model)
+    return tflite_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', default='models/fer_model_best.h5')
+    parser.add_argument('--sparsity', type=float, default=0.5,
+                        help='Fraction of conv filters / dense units to remove')
+    parser.add_argument('--steps', type=int, default=4, help='Pruning steps')
+    parser.add_argument('--step-epochs', type=int, default=2,
+                        help='Fine-tune epochs after each pruning step')
+    parser.add_argument('--finetune-epochs', type=int, default=15)
+    parser.add_argument('--clusters', type=int, default=16,
+                        help='Weight clusters per layer (0 to skip clustering)')
+    parser.add_argument('--cluster-epochs', type=int, default=3)
+    parser.add_argument('--output', default='models/fer_model_pruned.h5')
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("FER2013 CNN Compression: Channel Pruning + Weight Clustering")
+    print("=" * 70)
+
+    if not os.path.exists(args.model):
+        print(f"ERROR: {args.model} not found. Run: python model_training.py")
+        sys.exit(1)
+
+    print("\n[1/5] Loading data and model...")
+    train_ds, train_info = image_dataset('data/fer2013/train', image_size=(48, 48),
+                                         batch_size=64, color_mode='grayscale',
+                                         shuffle=True, augment=TRAIN_AUGMENT)
+    test_ds, test_info = image_dataset('data/fer2013/test', image_size=(48, 48),
+                                       batch_size=64, color_mode='grayscale',
+                                       shuffle=False)
+    original = tf.keras.models.load_model(args.model)
+    original_widths = model_widths(original)
+    print(f"  Training samples: {train_info['samples']}, test samples: {test_info['samples']}")
+    print(f"  Original widths: {original_widths}")
+
+    print(f"\n[2/5] Channel pruning to {args.sparsity:.0%} in {args.steps} steps...")
+    model = original
+    for step, sparsity in enumerate(sparsity_schedule(args.sparsity, args.steps), 1):
+        widths = pruned_widths(original_widths, sparsity)
+        model = prune_channels(model, widths)
+        _, accuracy = model.evaluate(test_ds, verbose=0)
+        print(f"  Step {step}: sparsity {sparsity:.0%}, widths {widths}, "
+              f"params {model.count_params():,}, accuracy before fine-tune {accuracy*100:.2f}%")
+        model.fit(train_ds, validation_data=test_ds, epochs=args.step_epochs, verbose=2)
+
+    print("\n[3/5] Fine-tuning the pruned model...")
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    model.fit(
+        train_ds,
+        validation_data=test_ds,
+        epochs=args.finetune_epochs,
+        callbacks=[
+            ModelCheckpoint(args.output, save_best_only=True, monitor='val_accuracy',
+                            mode='max', verbose=1),
+            EarlyStopping(monitor='val_accuracy', mode='max', patience=5,
+                          restore_best_weights=True, verbose=1),
+            ReduceLROnPlateau(monitor='val_loss', factor=0.5, patience=2,
+                              min_lr=1e-6, verbose=1)
+        ],
+        verbose=1
+    )
+    model = tf.keras.models.load_model(args.output)
+    print(f"✓ Pruned model saved to {args.output}")
+
+    print(f"\n[4/5] Weight clustering ({args.clusters} clusters per layer)...")
+    clustered = None
+    clustered_path = os.path.splitext(args.output)[0] + '_clustered.h5'
+    if args.clusters > 0:
+        clustered = cluster_model(model, args.clusters)
+        if clustered is None:
+            print("  ⚠ tensorflow-model-optimization not installed, skipping clustering")
+            print("    Install with: pip install tensorflow-model-optimization")
+        else:
+            clustered.fit(train_ds, validation_data=test_ds,
+                          epochs=args.cluster_epochs, verbose=1)
+            clustered = strip_clustering(clustered)
+            clustered.save(clustered_path)
+            print(f"✓ Clustered model saved to {clustered_path}")
+
+    print("\n[5/5] Exporting TFLite and measuring (CPU, 1 thread)...")
+    candidates = [('original', original, args.model), ('pruned', model, args.output)]
+    if clustered is not None:
+        candidates.append(('pruned+clustered', clustered, clustered_path))
+
+    rows = []
+    for name, candidate, h5_path in candidates:
+        tflite_model = to_tflite(candidate)
+        if name != 'original':
+            print(f"  ✓ {save_tflite(tflite_model, h5_path)}")
+        rows.append(measure(name, candidate, h5_path, tflite_model, test_ds))
+
+    print("\n" + "=" * 70)
+    print(f"  {'Model':<18} {'Params':>10} {'.h5 MB':>7} {'.tflite':>8} {'gzip':>6} "
+          f"{'ms':>6} {'Acc':>7} {'TFLite':>7}")
+    for row in rows:
+        print(f"  {row['model']:<18} {row['parameters']:>10,} {row['h5_mb']:>7.2f} "
+              f"{row['tflite_mb']:>8.2f} {row['tflite_gzip_mb']:>6.2f} "
+              f"{row['latency_ms']:>6.2f} {row['accuracy']*100:>6.2f}% "
+              f"{row['tflite_accuracy']*100:>6.2f}%")
+    base = rows[0]
+    for row in rows[1:]:
+        print(f"  {row['model']}: {base['tflite_gzip_mb'] / row['tflite_gzip_mb']:.1f}x smaller "
+              f"(gzip), {base['latency_ms'] / row['latency_ms']:.1f}x faster, "
+              f"accuracy {(row['accuracy'] - base['accuracy'])*100:+.2f} points")
+
+    report_path = os.path.splitext(args.output)[0] + '.json'
+    with open(report_path, 'w') as f:
+        json.dump({'sparsity': args.sparsity, 'steps': args.steps, 'clusters': args.clusters,
+                   'widths': list(model_widths(model)), 'results': rows}, f, indent=2)
+    print(f"\n✓ Report saved to {report_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -9,6 +9,8 @@ sys.path.append('src')
 from face_detector import FaceDetector
 from emotion_recognizer import EmotionRecognizer
 from wellbeing_advisor import WellbeingAdvisor
+import metrics
+import model_warmup
 
 class FERApplication:
     """Real-time Facial Emotion Recognition Application"""
@@ -27,6 +29,7 @@ class FERApplication:
         print("\nInitializing components...")
         self.face_detector = FaceDetector(method='haar')
         self.emotion_recognizer = EmotionRecognizer()
+        model_warmup.register('emotion_recognizer', self.emotion_recognizer)
         self.wellbeing = WellbeingAdvisor()
         
         # Camera setup
@@ -150,8 +153,19 @@ class FERApplication:
         
         return frame
     
+    def print_timings(self):
+        """Mean time per pipeline stage (FER_METRICS=0 disables)"""
+        timings = metrics.summary()
+        if not timings:
+            return
+        print("\nTime per stage:")
+        for name, (count, mean_ms) in timings.items():
+            print(f"  {name:<60} {mean_ms:>8.2f} ms  (n={count})")
+    
     def run(self):
         """Main application loop"""
+        # Load the model while the camera opens
+        model_warmup.start()
         if not self.start_camera():
             return
         
@@ -164,7 +178,8 @@ class FERApplication:
         
         try:
             while True:
-                ret, frame = self.cap.read()
+                with metrics.timer('fer_stage_seconds', stage='capture'):
+                    ret, frame = self.cap.read()
                 if not ret:
                     print("❌ Failed to grab frame")
                     break
@@ -173,7 +188,9 @@ class FERApplication:
                 frame = cv2.flip(frame, 1)
                 
                 # Detect faces
-                faces = self.face_detector.detect_faces(frame)
+                with metrics.timer('fer_stage_seconds', stage='detect'):
+                    faces = self.face_detector.detect_faces(frame)
+                metrics.inc('fer_frames_total')
                 
                 # Process each detected face
                 for (x1, y1, x2, y2) in faces:
@@ -186,8 +203,10 @@ class FERApplication:
                     
                     if face_roi.size > 0 and face_roi.shape[0] > 0 and face_roi.shape[1] > 0:
                         # Predict emotion
-                        emotion, confidence, probs = \
-                            self.emotion_recognizer.predict_emotion(face_roi)
+                        metrics.inc('fer_faces_total')
+                        with metrics.timer('fer_stage_seconds', stage='predict'):
+                            emotion, confidence, probs = \
+                                self.emotion_recognizer.predict_emotion(face_roi)
                         
                         current_emotion = emotion
                         current_confidence = confidence
@@ -213,13 +232,15 @@ class FERApplication:
                 self.calculate_fps()
                 
                 # Draw UI
-                frame = self.draw_ui(frame, current_emotion, current_confidence, current_probs)
+                with metrics.timer('fer_stage_seconds', stage='draw'):
+                    frame = self.draw_ui(frame, current_emotion, current_confidence, current_probs)
                 
                 # Display frame
-                cv2.imshow('Facial Emotion Recognition - Mental Health Monitor', frame)
-                
-                # Handle key presses
-                key = cv2.waitKey(1) & 0xFF
+                with metrics.timer('fer_stage_seconds', stage='display'):
+                    cv2.imshow('Facial Emotion Recognition - Mental Health Monitor', frame)
+                    
+                    # Handle key presses
+                    key = cv2.waitKey(1) & 0xFF
                 
                 if key == ord('q'):
                     print("\n👋 Quitting application...")
@@ -266,6 +287,7 @@ class FERApplication:
             if self.cap is not None:
                 self.cap.release()
             cv2.destroyAllWindows()
+            self.print_timings()
             print("\n✓ Application closed successfully")
 
 
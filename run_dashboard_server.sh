@@ -13,8 +13,8 @@ fi
 # Navigate to project directory
 cd /home/pi/IOT_Project
 
-# Install Flask if not already installed
-pip3 install flask >/dev/null 2>&1
+# Install Flask and gunicorn if not already installed
+pip3 install flask gunicorn >/dev/null 2>&1
 
 echo "==================================="
 echo "Starting Dashboard Server"
@@ -24,5 +24,5 @@ echo "Server will be available at:"
 echo "  http://$(hostname -I | awk '{print $1}'):5000"
 echo "==================================="
 
-# Run the dashboard server
-python3 dashboard_server.py
+# Run the dashboard server (gunicorn: several requests at once)
+exec gunicorn -c gunicorn.conf.py dashboard_server:app
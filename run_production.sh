@@ -0,0 +1,33 @@
+#!/bin/bash
+
+# Production server (gunicorn) for the FER web apps
+# Usage: ./run_production.sh [mobile|mid_review|dashboard]
+# Settings: see gunicorn.conf.py (FER_WORKERS, FER_THREADS, FER_BIND, FER_SSL)
+
+APP="${1:-mobile}"
+
+case "$APP" in
+    mobile)
+        MODULE="mobile_native_camera:app"
+        # Phone cameras need HTTPS
+        export FER_SSL="${FER_SSL:-1}"
+        ;;
+    mid_review)
+        MODULE="mid_review_mobile_app:app"
+        # Owns the server-side camera and its emotion state: one process only
+        export FER_WORKERS=1
+        ;;
+    dashboard)
+        MODULE="dashboard_server:app"
+        ;;
+    *)
+        echo "Unknown app: $APP (expected mobile, mid_review or dashboard)"
+        exit 1
+        ;;
+esac
+
+echo "==================================="
+echo "Starting $MODULE with gunicorn"
+echo "==================================="
+
+exec gunicorn -c gunicorn.conf.py "$MODULE"
@@ -0,0 +1,15 @@
+"""
+Access check for the /admin endpoints
+With FER_ADMIN_TOKEN set a request needs "Authorization: Bearer <token>";
+without it only local requests are allowed.
+"""
+
+import os
+import hmac
+
+
+def authorized(request):
+    token = os.getenv('FER_ADMIN_TOKEN')
+    if token:
+        return hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}')
+    return request.remote_addr in ('127.0.0.1', '::1')
@@ -0,0 +1,90 @@
+"""
+Confidence-gated cascade for the two-model ensembles
+The small FER2013 CNN runs on every face; the heavy 96x96 model only runs
+for faces where the CNN is uncertain. Uncertainty is either
+    margin:  1 - (top-1 probability - top-2 probability)
+    entropy: entropy of the probabilities / log(7)
+both in [0, 1]. The threshold is tuned offline (calibrate_cascade.py) to
+keep accuracy within a tolerance of the full ensemble.
+"""
+
+import os
+import json
+import numpy as np
+
+CONFIG_PATH = os.getenv('FER_CASCADE_CONFIG', 'models/cascade.json')
+CRITERIA = ('margin', 'entropy')
+
+# Used until calibrate_cascade.py has written CONFIG_PATH
+DEFAULT_CONFIG = {'criterion': 'margin', 'threshold': 0.5}
+
+
+def uncertainty(probs, criterion='margin'):
+    """
+    Args:
+        probs: (N, C) probabilities
+        criterion: 'margin' or 'entropy'
+    Returns:
+        (N,) uncertainty in [0, 1] (higher: more likely to need the heavy model)
+    """
+    probs = np.asarray(probs, dtype=np.float64)
+    if criterion == 'margin':
+        top2 = np.sort(probs, axis=1)[:, -2:]
+        return 1.0 - (top2[:, 1] - top2[:, 0])
+    if criterion == 'entropy':
+        entropy = -np.sum(probs * np.log(np.clip(probs, 1e-12, 1.0)), axis=1)
+        return entropy / np.log(probs.shape[1])
+    raise ValueError(f"Unknown cascade criterion: {criterion}")
+
+
+def load_config(path=CONFIG_PATH):
+    """Calibrated {'criterion', 'threshold', ...} or DEFAULT_CONFIG"""
+    if not os.path.exists(path):
+        print(f"  ⚠ {path} not found, cascade uses the default threshold "
+              f"(run python calibrate_cascade.py)")
+        return dict(DEFAULT_CONFIG)
+    with open(path) as f:
+        return json.load(f)
+
+
+def calibrate(cheap_probs, ensemble_probs, labels, criterion='margin', tolerance=0.005):
+    """
+    Largest threshold (most faces skipping the heavy model) whose cascade
+    accuracy is at least ensemble accuracy - tolerance
+    Args:
+        cheap_probs: (N, C) FER2013 CNN probabilities
+        ensemble_probs: (N, C) weighted ensemble probabilities
+        labels: (N,) true classes
+    Returns:
+        Dict with threshold, accuracy, ensemble/cheap accuracy and skip fraction
+    """
+    labels = np.asarray(labels)
+    scores = uncertainty(cheap_probs, criterion)
+    order = np.argsort(scores, kind='stable')
+    scores = scores[order]
+    cheap_correct = (np.argmax(cheap_probs, axis=1) == labels)[order]
+    ensemble_correct = (np.argmax(ensemble_probs, axis=1) == labels)[order]
+    n = len(labels)
+
+    # Accuracy when the k least uncertain faces use the CNN alone (k = 0..n)
+    cheap_prefix = np.concatenate([[0], np.cumsum(cheap_correct)])
+    ensemble_prefix = np.concatenate([[0], np.cumsum(ensemble_correct)])
+    accuracy = (cheap_prefix + ensemble_prefix[-1] - ensemble_prefix) / n
+
+    # Only cut between distinct scores: "skip if score <= threshold"
+    valid = np.ones(n + 1, dtype=bool)
+    valid[1:n] = scores[1:] > scores[:-1]
+    target = ensemble_prefix[-1] / n - tolerance
+    candidates = np.flatnonzero(valid & (accuracy >= target))
+    k = int(candidates.max()) if len(candidates) else 0
+
+    return {
+        'criterion': criterion,
+        'threshold': float(scores[k - 1]) if k > 0 else -1.0,
+        'tolerance': tolerance,
+        'accuracy': float(accuracy[k]),
+        'ensemble_accuracy': float(ensemble_prefix[-1] / n),
+        'cheap_accuracy': float(cheap_prefix[-1] / n),
+        'skip_fraction': k / n,
+        'samples': n
+    }
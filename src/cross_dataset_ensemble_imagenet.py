@@ -5,7 +5,9 @@ Combines FER2013-only + ImageNet-pretrained models
 
 import numpy as np
 import cv2
-import tensorflow as tf
+from model_registry import registry, model_path
+from face_preprocessor import FacePreprocessor
+import metrics
 from collections import deque
 
 class CrossDatasetEnsemble:
@@ -15,7 +17,14 @@ class CrossDatasetEnsemble:
     Model 2: ImageNet pre-trained + FER2013 fine-tuned (RGB, 96x96)
     """
     
-    def __init__(self):
+    MODEL_NAMES = ['fer2013', 'mobilenet']
+    MODEL_PATHS = [model_path(name) for name in MODEL_NAMES]
+    
+    def __init__(self, backend=None):
+        """
+        Args:
+            backend: 'auto', 'keras' or 'tflite' (default: $FER_BACKEND or 'auto')
+        """
         print("Initializing Cross-Dataset Ensemble...")
         
         self.emotions = ['Angry', 'Disgust', 'Fear', 'Happy', 
@@ -23,16 +32,14 @@ class CrossDatasetEnsemble:
         
         # Load FER2013 model (grayscale)
         print("  [1/2] Loading FER2013 model (from scratch)...")
-        self.fer_model = tf.keras.models.load_model('models/fer_model_best.h5')
+        self.fer_model = registry.get(self.MODEL_NAMES[0], backend)
         print("      OK FER2013 model loaded")
         print("        Input: 48x48 grayscale")
         print("        Training: FER2013 only (35K images)")
         
         # Load MobileNet model (RGB)
         print("  [2/2] Loading MobileNet model (ImageNet base)...")
-        self.mobilenet_model = tf.keras.models.load_model(
-            'models/pretrained/mobilenetv3_finetuned.h5'
-        )
+        self.mobilenet_model = registry.get(self.MODEL_NAMES[1], backend)
         print("      OK MobileNet model loaded")
         print("        Input: 96x96 RGB")
         print("        Base: ImageNet (14M images)")
@@ -48,7 +55,11 @@ class CrossDatasetEnsemble:
             'imagenet': 0.6      # Pre-trained model (often better)
         }
         
+        # Both model inputs from one resize, into reused batch buffers
+        self.preprocessor = FacePreprocessor((48, 'grayscale'), (96, 'rgb'))
+        
         self.emotion_history = deque(maxlen=10)
+        self.track_histories = {}
         
         self.emotion_colors = {
             'Angry': (0, 0, 255), 'Disgust': (0, 128, 0),
@@ -77,18 +88,47 @@ class CrossDatasetEnsemble:
         normalized = resized.astype('float32') / 255.0
         return np.expand_dims(normalized, axis=0)
     
-    def predict_emotion(self, face_img, use_smoothing=True):
+    def predict_emotion(self, face_img, use_smoothing=True, single_model=False):
         """
         Predict using cross-dataset ensemble
         Returns: (emotion, confidence, probs, individual_preds, agreement)
         """
+        return self.predict_emotions([face_img], use_smoothing=use_smoothing,
+                                     single_model=single_model)[0]
+    
+    def predict_emotions(self, face_imgs, track_ids=None, use_smoothing=True,
+                         single_model=False):
+        """
+        Batched prediction: one forward pass per model for all faces
+        Args:
+            face_imgs: List of face regions (BGR)
+            track_ids: Optional track ID per face; smoothing history is kept
+                       per track instead of shared
+            single_model: Only run the FER2013 CNN (the cheapest model),
+                          used when shedding load
+        Returns:
+            List of (emotion, confidence, probs, individual_preds, agreement);
+            agreement is None with single_model
+        """
+        if len(face_imgs) == 0:
+            return []
+        
+        with metrics.timer('fer_model_seconds', recognizer='cross_dataset', stage='preprocess'):
+            if single_model:
+                fer_batch, = self.preprocessor(face_imgs, outputs=[0])
+            else:
+                fer_batch, mobilenet_batch = self.preprocessor(face_imgs)
+        
         # Predict with FER2013 model
-        fer_input = self.preprocess_fer(face_img)
-        fer_probs = self.fer_model.predict(fer_input, verbose=0)[0]
+        with metrics.timer('fer_model_seconds', recognizer='cross_dataset', stage='fer2013'):
+            fer_probs = np.asarray(self.fer_model.predict_on_batch(fer_batch))
         
         # Predict with MobileNet model
-        mobilenet_input = self.preprocess_mobilenet(face_img)
-        mobilenet_probs = self.mobilenet_model.predict(mobilenet_input, verbose=0)[0]
+        if single_model:
+            mobilenet_probs = fer_probs
+        else:
+            with metrics.timer('fer_model_seconds', recognizer='cross_dataset', stage='mobilenet'):
+                mobilenet_probs = np.asarray(self.mobilenet_model.predict_on_batch(mobilenet_batch))
         
         # Ensemble prediction (weighted average)
         ensemble_probs = (
@@ -96,27 +136,43 @@ class CrossDatasetEnsemble:
             self.weights['imagenet'] * mobilenet_probs
         )
         
-        # Get final emotion
-        emotion_idx = np.argmax(ensemble_probs)
-        confidence = ensemble_probs[emotion_idx]
-        emotion = self.emotions[emotion_idx]
-        
-        # Calculate agreement
-        fer_pred = self.emotions[np.argmax(fer_probs)]
-        mobilenet_pred = self.emotions[np.argmax(mobilenet_probs)]
-        agreement = 1.0 if fer_pred == mobilenet_pred else 0.5
+        results = []
+        for i in range(len(face_imgs)):
+            # Get final emotion
+            emotion_idx = np.argmax(ensemble_probs[i])
+            confidence = ensemble_probs[i][emotion_idx]
+            emotion = self.emotions[emotion_idx]
+            
+            # Calculate agreement (None when only the FER2013 CNN ran)
+            agreement = None
+            if not single_model:
+                fer_pred = self.emotions[np.argmax(fer_probs[i])]
+                mobilenet_pred = self.emotions[np.argmax(mobilenet_probs[i])]
+                agreement = 1.0 if fer_pred == mobilenet_pred else 0.5
+            
+            # Temporal smoothing
+            if use_smoothing:
+                history = self._history_for(None if track_ids is None else track_ids[i])
+                history.append(emotion)
+                if len(history) >= 5:
+                    emotion = max(set(history), key=list(history).count)
+                    confidence = list(history).count(emotion) / len(history)
+            
+            individual_preds = [fer_probs[i]] if single_model else [fer_probs[i], mobilenet_probs[i]]
+            results.append((emotion, confidence, ensemble_probs[i], individual_preds, agreement))
         
-        # Temporal smoothing
-        if use_smoothing:
-            self.emotion_history.append(emotion)
-            if len(self.emotion_history) >= 5:
-                emotion = max(set(self.emotion_history), 
-                            key=list(self.emotion_history).count)
-                confidence = list(self.emotion_history).count(emotion) / len(self.emotion_history)
-        
-        individual_preds = [fer_probs, mobilenet_probs]
-        
-        return emotion, confidence, ensemble_probs, individual_preds, agreement
+        return results
+    
+    def _history_for(self, track_id):
+        if track_id is None:
+            return self.emotion_history
+        if track_id not in self.track_histories:
+            self.track_histories[track_id] = deque(maxlen=10)
+        return self.track_histories[track_id]
+    
+    def drop_tracks(self, track_ids):
+        for track_id in track_ids:
+            self.track_histories.pop(track_id, None)
     
     def get_emotion_color(self, emotion):
         return self.emotion_colors.get(emotion, (255, 255, 255))
@@ -131,6 +187,7 @@ class CrossDatasetEnsemble:
     
     def reset_history(self):
         self.emotion_history.clear()
+        self.track_histories.clear()
     
     def get_ensemble_info(self):
         return {
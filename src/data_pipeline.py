@@ -0,0 +1,302 @@
+"""
+tf.data input pipeline for the emotion datasets
+Replaces ImageDataGenerator.flow_from_directory in the training scripts:
+JPEGs are decoded in parallel, decoded images are cached, and the
+augmentation (rotation, shift, zoom, shear, flip, brightness) runs on
+whole batches inside the graph instead of per image in SciPy.
+
+Augmentation settings use the ImageDataGenerator argument names, so a
+script's existing settings can be passed through unchanged.
+
+When pack_datasets.py has packed a split at the requested size, batches
+are gathered from its memory-mapped array instead of decoding JPEGs.
+Splits exported by export_tfrecords.py are read from interleaved shards.
+
+For data-parallel training, shard=(num_shards, index) keeps only one
+worker's share of the split before anything is decoded or cached.
+"""
+
+import os
+import math
+import numpy as np
+import tensorflow as tf
+
+from dataset_cache import list_image_files, load_packed, stat_fingerprint
+from tfrecords import read_manifest as read_tfrecord_manifest, parse_example, default_tfrecord_dir
+
+AUTOTUNE = tf.data.AUTOTUNE
+
+
+def _decode_image(image_bytes, image_size, channels):
+    image = tf.io.decode_image(image_bytes, channels=channels, expand_animations=False)
+    # Same interpolation as flow_from_directory
+    image = tf.image.resize(image, image_size, method='nearest')
+    image = tf.cast(image, tf.uint8)
+    image.set_shape(tuple(image_size) + (channels,))
+    return image
+
+
+def _decode_fn(image_size, channels):
+    def decode(path, label):
+        return _decode_image(tf.io.read_file(path), image_size, channels), label
+    return decode
+
+
+def _uniform(batch_size, limit):
+    return tf.random.uniform([batch_size], -limit, limit)
+
+
+def augment_batch(images, rotation_range=0, width_shift_range=0.0,
+                  height_shift_range=0.0, zoom_range=0.0, shear_range=0.0,
+                  horizontal_flip=False, brightness_range=None,
+                  fill_mode='nearest'):
+    """
+    Random affine transform + flip + brightness for a batch (0-255 floats)
+    Args:
+        images: float32 tensor (N, H, W, C)
+        rotation_range: Max rotation in degrees
+        width_shift_range, height_shift_range: Max shift as a fraction of size
+        zoom_range: Zoom factors drawn from [1 - zoom_range, 1 + zoom_range]
+        shear_range: Max shear angle in degrees
+        horizontal_flip: Flip half the images
+        brightness_range: [low, high] brightness factors, or None
+        fill_mode: 'nearest', 'constant', 'reflect' or 'wrap'
+    """
+    shape = tf.shape(images)
+    n = shape[0]
+    height = tf.cast(shape[1], tf.float32)
+    width = tf.cast(shape[2], tf.float32)
+
+    if rotation_range or width_shift_range or height_shift_range or zoom_range or shear_range:
+        theta = _uniform(n, rotation_range * math.pi / 180)
+        shear = _uniform(n, shear_range * math.pi / 180)
+        zx = 1.0 + _uniform(n, zoom_range)
+        zy = 1.0 + _uniform(n, zoom_range)
+        tx = _uniform(n, width_shift_range) * width
+        ty = _uniform(n, height_shift_range) * height
+
+        # Output -> input mapping: rotation @ shear @ zoom about the centre,
+        # then shift (the order ImageDataGenerator composes them in)
+        a0 = tf.cos(theta) * zx
+        a1 = -tf.sin(theta + shear) * zy
+        b0 = tf.sin(theta) * zx
+        b1 = tf.cos(theta + shear) * zy
+        cx, cy = (width - 1) / 2, (height - 1) / 2
+        a2 = cx - a0 * cx - a1 * cy + tx
+        b2 = cy - b0 * cx - b1 * cy + ty
+        zeros = tf.zeros_like(a0)
+        transforms = tf.stack([a0, a1, a2, b0, b1, b2, zeros, zeros], axis=1)
+
+        images = tf.raw_ops.ImageProjectiveTransformV3(
+            images=images, transforms=transforms, output_shape=shape[1:3],
+            fill_value=0.0, interpolation='BILINEAR', fill_mode=fill_mode.upper())
+
+    if horizontal_flip:
+        flip = tf.random.uniform([n]) < 0.5
+        images = tf.where(flip[:, None, None, None], tf.reverse(images, axis=[2]), images)
+
+    if brightness_range is not None:
+        low, high = brightness_range
+        factor = tf.random.uniform([n], low, high)
+        images = tf.clip_by_value(images * factor[:, None, None, None], 0.0, 255.0)
+
+    return images
+
+
+def image_dataset(directory, image_size, color_mode='grayscale', batch_size=32,
+                  shuffle=True, augment=None, cache=True, shuffle_buffer=10000,
+                  seed=None, source=None, shard=None):
+    """
+    Batched tf.data.Dataset of (images / 255, one-hot labels) from a class folder
+    Args:
+        directory: e.g. 'data/fer2013/train'
+        image_size: (height, width)
+        color_mode: 'grayscale' or 'rgb'
+        batch_size: Images per batch
+        shuffle: Reshuffle every epoch (off for evaluation)
+        augment: ImageDataGenerator-style settings for augment_batch(), or None
+        cache: True (memory), a file path prefix, or False
+        shuffle_buffer: Shuffle buffer size in images
+        seed: Shuffle seed (use tf.random.set_seed() for augmentation)
+        source: 'packed' (memory-mapped cache, must be up to date),
+                'tfrecord' (exported shards), 'files' (decode JPEGs) or 'auto'
+                (first up-to-date one of packed, tfrecord, files)
+                (default: $FER_DATA_SOURCE or 'auto')
+        shard: (num_shards, index) to read every num_shards-th image only
+    Returns:
+        (dataset, info) where info has 'samples', 'class_names' and
+        'class_indices' like a DirectoryIterator ('samples' is the whole
+        split, also when sharded)
+    """
+    if source is None:
+        source = os.getenv('FER_DATA_SOURCE', 'auto')
+
+    if source in ('auto', 'packed'):
+        packed = load_packed(directory, image_size, color_mode)
+        if packed is not None:
+            print(f"  Using packed cache for {directory}")
+            return packed_dataset(*packed, batch_size=batch_size, shuffle=shuffle,
+                                  augment=augment, seed=seed, shard=shard)
+        if source == 'packed':
+            raise FileNotFoundError(
+                f"No up-to-date packed cache for {directory}. Run: python pack_datasets.py")
+
+    if source in ('auto', 'tfrecord'):
+        manifest = read_tfrecord_manifest(directory)
+        if manifest is not None and source == 'auto':
+            paths, _, _ = list_image_files(directory)
+            if stat_fingerprint(directory, paths) != manifest['stat_fingerprint']:
+                manifest = None
+        if manifest is not None:
+            print(f"  Using TFRecord shards for {directory}")
+            return tfrecord_dataset(manifest, image_size, color_mode, batch_size=batch_size,
+                                    shuffle=shuffle, augment=augment, cache=cache,
+                                    shuffle_buffer=shuffle_buffer, seed=seed, shard=shard)
+        if source == 'tfrecord':
+            raise FileNotFoundError(
+                f"No TFRecord export of {directory}. Run: python export_tfrecords.py")
+
+    paths, labels, class_names = list_image_files(directory)
+    channels = 1 if color_mode == 'grayscale' else 3
+
+    ds = tf.data.Dataset.from_tensor_slices((paths, labels))
+    if shard is not None:
+        ds = ds.shard(*shard)
+    if shuffle:
+        # Paths are sorted by class: a full shuffle of the file names (cheap)
+        # keeps the cache and the shuffle buffer below from seeing one class
+        # at a time
+        ds = ds.shuffle(len(paths), seed=seed, reshuffle_each_iteration=True)
+    ds = ds.map(_decode_fn(image_size, channels), num_parallel_calls=AUTOTUNE)
+
+    info = {
+        'samples': len(paths),
+        'class_names': class_names,
+        'class_indices': {name: i for i, name in enumerate(class_names)}
+    }
+    return batch_dataset(ds, len(class_names), batch_size, shuffle=shuffle,
+                         augment=augment, cache=cache, shuffle_buffer=shuffle_buffer,
+                         seed=seed), info
+
+
+def tfrecord_dataset(manifest, image_size, color_mode='grayscale', batch_size=32,
+                     shuffle=True, augment=None, cache=True, shuffle_buffer=10000,
+                     seed=None, tfrecord_dir=None, shard=None):
+    """
+    Batched dataset read from TFRecord shards (see tfrecords.export_split)
+    Shards are read in parallel and interleaved; the shard order is
+    reshuffled every epoch when shuffling. With shard=(num_shards, index)
+    each worker reads whole files if there are enough, otherwise every
+    num_shards-th record of the unshuffled stream.
+    Returns:
+        (dataset, info) as image_dataset()
+    """
+    tfrecord_dir = tfrecord_dir or default_tfrecord_dir()
+    channels = 1 if color_mode == 'grayscale' else 3
+    shard_paths = [os.path.join(tfrecord_dir, name) for name in manifest['shards']]
+    compression = manifest.get('compression') or ''
+    record_shard = shard
+    if shard is not None and len(shard_paths) >= shard[0]:
+        shard_paths = shard_paths[shard[1]::shard[0]]
+        record_shard = None
+
+    # Record sharding needs the same record order in every worker, so the
+    # file order and interleave stay fixed; batch_dataset() still shuffles
+    # records afterwards
+    ordered = not shuffle or record_shard is not None
+    files = tf.data.Dataset.from_tensor_slices(shard_paths)
+    if not ordered:
+        files = files.shuffle(len(shard_paths), seed=seed, reshuffle_each_iteration=True)
+    ds = files.interleave(
+        lambda path: tf.data.TFRecordDataset(path, compression_type=compression),
+        cycle_length=len(shard_paths), num_parallel_calls=AUTOTUNE,
+        deterministic=ordered)
+    if record_shard is not None:
+        ds = ds.shard(*record_shard)
+
+    def decode(serialized):
+        image_bytes, label = parse_example(serialized)
+        return _decode_image(image_bytes, image_size, channels), label
+
+    ds = ds.map(decode, num_parallel_calls=AUTOTUNE, deterministic=not shuffle)
+
+    class_names = manifest['class_names']
+    info = {
+        'samples': manifest['samples'],
+        'class_names': class_names,
+        'class_indices': {name: i for i, name in enumerate(class_names)}
+    }
+    return batch_dataset(ds, len(class_names), batch_size, shuffle=shuffle,
+                         augment=augment, cache=cache, shuffle_buffer=shuffle_buffer,
+                         seed=seed), info
+
+
+def batch_dataset(ds, num_classes, batch_size=32, shuffle=True, augment=None,
+                  cache=True, shuffle_buffer=10000, seed=None):
+    """
+    Cache, shuffle, batch, augment and prefetch a dataset of (uint8 image, label)
+    Shared by every dataset source so they train identically.
+    """
+    # Cache decoded uint8 images: decoding happens once, augmentation every epoch
+    if cache:
+        ds = ds.cache('' if cache is True else cache)
+
+    if shuffle:
+        ds = ds.shuffle(shuffle_buffer, seed=seed, reshuffle_each_iteration=True)
+
+    ds = ds.batch(batch_size)
+
+    # Order doesn't matter when shuffling; let parallel batches finish out of order
+    ds = ds.map(_prepare_fn(num_classes, augment), num_parallel_calls=AUTOTUNE,
+                deterministic=not shuffle)
+    return ds.prefetch(AUTOTUNE)
+
+
+def packed_dataset(images, labels, manifest, batch_size=32, shuffle=True,
+                   augment=None, seed=None, shard=None):
+    """
+    Batched dataset gathered from a memory-mapped split (see dataset_cache)
+    Only the index order is shuffled; each batch is read straight from the
+    mapped array, so nothing is decoded or held in a shuffle buffer.
+    Returns:
+        (dataset, info) as image_dataset()
+    """
+    num_classes = len(manifest['class_names'])
+    image_shape = tuple(images.shape[1:])
+
+    def gather(indices):
+        # Sorted rows read the mapping front to back
+        indices = np.sort(indices)
+        return np.asarray(images[indices]), labels[indices]
+
+    def load_batch(indices):
+        batch, batch_labels = tf.numpy_function(gather, [indices], [tf.uint8, tf.int32])
+        batch.set_shape((None,) + image_shape)
+        batch_labels.set_shape((None,))
+        return batch, batch_labels
+
+    ds = tf.data.Dataset.range(len(labels))
+    if shard is not None:
+        ds = ds.shard(*shard)
+    if shuffle:
+        ds = ds.shuffle(len(labels), seed=seed, reshuffle_each_iteration=True)
+    ds = ds.batch(batch_size)
+    ds = ds.map(load_batch, num_parallel_calls=AUTOTUNE, deterministic=not shuffle)
+    ds = ds.map(_prepare_fn(num_classes, augment), num_parallel_calls=AUTOTUNE,
+                deterministic=not shuffle)
+
+    info = {
+        'samples': len(labels),
+        'class_names': manifest['class_names'],
+        'class_indices': {name: i for i, name in enumerate(manifest['class_names'])}
+    }
+    return ds.prefetch(AUTOTUNE), info
+
+
+def _prepare_fn(num_classes, augment):
+    def prepare(images, labels):
+        images = tf.cast(images, tf.float32)
+        if augment:
+            images = augment_batch(images, **augment)
+        return images / 255.0, tf.one_hot(labels, num_classes)
+    return prepare
@@ -0,0 +1,214 @@
+"""
+Pre-decoded dataset cache
+Decodes a folder-per-class split (e.g. data/fer2013/train) once into a
+contiguous uint8 .npy array that training and evaluation memory-map,
+so epochs no longer open and decode tens of thousands of small JPEGs.
+
+Each packed variant has three files in the cache directory:
+    <key>.images.npy   (N, H, W, C) uint8
+    <key>.labels.npy   (N,) int32
+    <key>.json         manifest (classes, sizes, fingerprints)
+
+The manifest stores a cheap stat fingerprint (paths, sizes, mtimes) and
+a content hash of the image bytes. A split is only re-decoded when the
+content hash changes; touching files just refreshes the fingerprint.
+"""
+
+import os
+import json
+import time
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import cv2
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+
+# Input formats of the two model families
+VARIANTS = {
+    '48x48_grayscale': ((48, 48), 'grayscale'),
+    '96x96_rgb': ((96, 96), 'rgb'),
+}
+
+
+def default_cache_dir():
+    return os.getenv('FER_CACHE_DIR', 'data/cache')
+
+
+def list_image_files(directory):
+    """
+    Image files of a folder-per-class dataset, ordered like flow_from_directory
+    Returns:
+        (paths, labels, class_names)
+    """
+    class_names = sorted(name for name in os.listdir(directory)
+                         if os.path.isdir(os.path.join(directory, name)))
+    paths, labels = [], []
+    for label, class_name in enumerate(class_names):
+        class_dir = os.path.join(directory, class_name)
+        for filename in sorted(os.listdir(class_dir)):
+            if filename.lower().endswith(IMAGE_EXTENSIONS):
+                paths.append(os.path.join(class_dir, filename))
+                labels.append(label)
+    return paths, np.array(labels, dtype=np.int32), class_names
+
+
+def cache_key(directory, image_size, color_mode):
+    """'data/fer2013/train', (48, 48), 'grayscale' -> 'fer2013_train_48x48_grayscale'"""
+    parts = os.path.normpath(directory).split(os.sep)
+    if parts[0] == 'data':
+        parts = parts[1:]
+    return '_'.join(parts + [f"{image_size[0]}x{image_size[1]}", color_mode])
+
+
+def stat_fingerprint(directory, paths):
+    """Hash of relative paths, sizes and mtimes (no file contents read)"""
+    digest = hashlib.sha1()
+    for path in paths:
+        st = os.stat(path)
+        digest.update(f"{os.path.relpath(path, directory)}\0{st.st_size}\0{st.st_mtime_ns}\n".encode())
+    return digest.hexdigest()
+
+
+def _file_digest(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).digest()
+
+
+def content_hash(directory, paths, workers=8):
+    """Hash of relative paths and image bytes"""
+    digest = hashlib.sha1()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for path, file_digest in zip(paths, pool.map(_file_digest, paths)):
+            digest.update(os.path.relpath(path, directory).encode() + b'\0' + file_digest)
+    return digest.hexdigest()
+
+
+def _decode(path, image_size, color_mode):
+    if color_mode == 'grayscale':
+        img = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+    else:
+        img = cv2.imread(path, cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError(f"Cannot decode {path}")
+    if img.shape[:2] != tuple(image_size):
+        # Nearest, as flow_from_directory resizes
+        img = cv2.resize(img, (image_size[1], image_size[0]), interpolation=cv2.INTER_NEAREST)
+    if color_mode == 'grayscale':
+        return img[:, :, np.newaxis]
+    # Keras loaders produce RGB
+    return cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+
+
+def _paths(cache_dir, key):
+    base = os.path.join(cache_dir, key)
+    return base + '.images.npy', base + '.labels.npy', base + '.json'
+
+
+def read_manifest(directory, image_size, color_mode, cache_dir=None):
+    _, _, manifest_path = _paths(cache_dir or default_cache_dir(),
+                                 cache_key(directory, image_size, color_mode))
+    try:
+        with open(manifest_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def pack_split(directory, image_size, color_mode, cache_dir=None, workers=8, force=False):
+    """
+    Decode a split into the cache unless an up-to-date copy exists
+    Args:
+        directory: Class-folder split, e.g. 'data/fer2013/train'
+        image_size: (height, width)
+        color_mode: 'grayscale' or 'rgb'
+        cache_dir: Output directory (default: $FER_CACHE_DIR or data/cache)
+        workers: Decode threads
+        force: Rebuild even if unchanged
+    Returns:
+        (manifest, rebuilt)
+    """
+    cache_dir = cache_dir or default_cache_dir()
+    os.makedirs(cache_dir, exist_ok=True)
+    key = cache_key(directory, image_size, color_mode)
+    images_path, labels_path, manifest_path = _paths(cache_dir, key)
+
+    paths, labels, class_names = list_image_files(directory)
+    fingerprint = stat_fingerprint(directory, paths)
+
+    manifest = read_manifest(directory, image_size, color_mode, cache_dir)
+    if manifest is not None and not force and os.path.exists(images_path):
+        if manifest['stat_fingerprint'] == fingerprint:
+            return manifest, False
+        # Files touched or copied: only rebuild if the bytes changed
+        digest = content_hash(directory, paths, workers)
+        if manifest['content_hash'] == digest:
+            manifest['stat_fingerprint'] = fingerprint
+            _write_json(manifest_path, manifest)
+            return manifest, False
+    else:
+        digest = content_hash(directory, paths, workers)
+
+    channels = 1 if color_mode == 'grayscale' else 3
+    shape = (len(paths),) + tuple(image_size) + (channels,)
+
+    # Write under temporary names so readers never see a partial cache
+    tmp_images = images_path + '.tmp'
+    images = np.lib.format.open_memmap(tmp_images, mode='w+', dtype=np.uint8, shape=shape)
+
+    def decode_into(index):
+        images[index] = _decode(paths[index], image_size, color_mode)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(decode_into, range(len(paths))))
+    images.flush()
+    del images
+    os.replace(tmp_images, images_path)
+
+    with open(labels_path + '.tmp', 'wb') as f:
+        np.save(f, labels)
+    os.replace(labels_path + '.tmp', labels_path)
+
+    manifest = {
+        'directory': directory,
+        'image_size': list(image_size),
+        'color_mode': color_mode,
+        'class_names': class_names,
+        'samples': len(paths),
+        'shape': list(shape),
+        'stat_fingerprint': fingerprint,
+        'content_hash': digest,
+        'created': time.time()
+    }
+    _write_json(manifest_path, manifest)
+    return manifest, True
+
+
+def load_packed(directory, image_size, color_mode, cache_dir=None, check=True):
+    """
+    Memory-map a packed split
+    Args:
+        check: Return None if the folder changed since packing (stat fingerprint)
+    Returns:
+        (images, labels, manifest) with images a read-only memmap, or None
+        when there is no usable cache
+    """
+    cache_dir = cache_dir or default_cache_dir()
+    images_path, labels_path, _ = _paths(cache_dir, cache_key(directory, image_size, color_mode))
+    manifest = read_manifest(directory, image_size, color_mode, cache_dir)
+    if manifest is None or not os.path.exists(images_path):
+        return None
+    if check and os.path.isdir(directory):
+        paths, _, _ = list_image_files(directory)
+        if stat_fingerprint(directory, paths) != manifest['stat_fingerprint']:
+            return None
+
+    images = np.load(images_path, mmap_mode='r')
+    labels = np.load(labels_path)
+    return images, labels, manifest
+
+
+def _write_json(path, data):
+    with open(path + '.tmp', 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(path + '.tmp', path)
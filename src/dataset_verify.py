@@ -0,0 +1,187 @@
+"""
+Dataset verification with a cached index
+Scans a folder-per-class dataset (<root>/<split>/<class>/<image>),
+decodes every image in a process pool and reports per-class counts,
+image-size histograms, corrupt files and duplicate images. Results are
+cached per file (keyed on size and mtime) in <root>/.verify_index.json,
+so later runs only decode files that changed.
+"""
+
+import os
+import json
+import time
+import hashlib
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import cv2
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+
+INDEX_NAME = '.verify_index.json'
+
+
+def scan_dataset(root, splits=('train', 'test')):
+    """
+    List images with os.scandir
+    Returns:
+        {relative path: (size, mtime_ns)}
+    """
+    files = {}
+    for split in splits:
+        split_path = os.path.join(root, split)
+        if not os.path.isdir(split_path):
+            continue
+        with os.scandir(split_path) as class_dirs:
+            for class_dir in class_dirs:
+                if not class_dir.is_dir():
+                    continue
+                with os.scandir(class_dir.path) as entries:
+                    for entry in entries:
+                        if entry.is_file() and entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                            st = entry.stat()
+                            rel = os.path.join(split, class_dir.name, entry.name)
+                            files[rel] = (st.st_size, st.st_mtime_ns)
+    return files
+
+
+def check_image(path):
+    """
+    Decode-check one image (runs in a worker process)
+    Returns:
+        Dict with sha1 and either width/height/channels or an error
+    """
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError as e:
+        return {'sha1': None, 'error': str(e)}
+
+    result = {'sha1': hashlib.sha1(data).hexdigest()}
+    img = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_UNCHANGED)
+    if img is None or img.size == 0:
+        result['error'] = 'cannot decode'
+    else:
+        result['height'], result['width'] = img.shape[:2]
+        result['channels'] = 1 if img.ndim == 2 else img.shape[2]
+    return result
+
+
+def _load_index(root):
+    try:
+        with open(os.path.join(root, INDEX_NAME)) as f:
+            return json.load(f).get('files', {})
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_index(root, files):
+    path = os.path.join(root, INDEX_NAME)
+    with open(path + '.tmp', 'w') as f:
+        json.dump({'updated': time.time(), 'files': files}, f)
+    os.replace(path + '.tmp', path)
+
+
+def verify_dataset(root, splits=('train', 'test'), workers=None, full=False):
+    """
+    Check every image of a dataset, reusing cached results for unchanged files
+    Args:
+        root: Dataset folder, e.g. 'data/fer2013'
+        splits: Split folders to scan
+        workers: Decode processes (default: CPU count)
+        full: Ignore the cache and re-check everything
+    Returns:
+        Report dict (see print_report)
+    """
+    start = time.time()
+    files = scan_dataset(root, splits)
+    index = {} if full else _load_index(root)
+
+    results = {}
+    to_check = []
+    for rel, (size, mtime_ns) in files.items():
+        cached = index.get(rel)
+        if cached and cached['size'] == size and cached['mtime_ns'] == mtime_ns:
+            results[rel] = cached
+        else:
+            to_check.append(rel)
+
+    if to_check:
+        paths = [os.path.join(root, rel) for rel in to_check]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for rel, result in zip(to_check, pool.map(check_image, paths, chunksize=64)):
+                size, mtime_ns = files[rel]
+                result.update(size=size, mtime_ns=mtime_ns)
+                results[rel] = result
+
+    _save_index(root, results)
+    report = summarize(results)
+    report.update(root=root, checked=len(to_check), cached=len(files) - len(to_check),
+                  seconds=time.time() - start)
+    return report
+
+
+def summarize(results):
+    """Counts, size histograms, corrupt files and duplicates from per-file results"""
+    counts = defaultdict(Counter)
+    sizes = defaultdict(Counter)
+    corrupt = []
+    by_hash = defaultdict(list)
+
+    for rel, result in sorted(results.items()):
+        split, class_name = rel.split(os.sep)[:2]
+        if result.get('sha1'):
+            by_hash[result['sha1']].append(rel)
+        if 'error' in result:
+            corrupt.append((rel, result['error']))
+            continue
+        counts[split][class_name] += 1
+        sizes[split][f"{result['width']}x{result['height']}x{result['channels']}"] += 1
+
+    duplicates = [group for group in by_hash.values() if len(group) > 1]
+    # Same image in train and test inflates test accuracy
+    leaks = [group for group in duplicates
+             if len({rel.split(os.sep)[0] for rel in group}) > 1]
+
+    return {
+        'counts': {split: dict(c) for split, c in counts.items()},
+        'sizes': {split: dict(c) for split, c in sizes.items()},
+        'corrupt': corrupt,
+        'duplicates': duplicates,
+        'split_leaks': leaks,
+        'total': len(results)
+    }
+
+
+def print_report(report, expected_classes=None, max_listed=10):
+    """Print a report; returns True when no corrupt images were found"""
+    for split, counts in sorted(report['counts'].items()):
+        print(f"\n{split.upper()} SET:")
+        total = 0
+        for class_name in (expected_classes or sorted(counts)):
+            count = counts.get(class_name, 0)
+            total += count
+            status = "✓" if count > 0 else "❌"
+            print(f"  {status} {class_name:10s}: {count:5d} images")
+        for class_name in sorted(set(counts) - set(expected_classes or counts)):
+            print(f"  ⚠ {class_name:10s}: {counts[class_name]:5d} images (unexpected class)")
+        print(f"  Total: {total} images")
+
+        print("  Image sizes (WxHxC):")
+        for size, count in sorted(report['sizes'][split].items(), key=lambda x: -x[1])[:5]:
+            print(f"    {size:12s} {count:6d}")
+
+    print(f"\nCorrupt/undecodable: {len(report['corrupt'])}")
+    for rel, error in report['corrupt'][:max_listed]:
+        print(f"  ❌ {rel}: {error}")
+
+    extra = sum(len(group) - 1 for group in report['duplicates'])
+    print(f"Duplicate images: {extra} extra copies in {len(report['duplicates'])} groups")
+    for group in report['duplicates'][:max_listed]:
+        print(f"  ⚠ {', '.join(group)}")
+    if report['split_leaks']:
+        print(f"  ⚠ {len(report['split_leaks'])} groups appear in more than one split")
+
+    print(f"\nChecked {report['checked']} files, {report['cached']} unchanged "
+          f"(cached) in {report['seconds']:.1f}s")
+    return not report['corrupt']
@@ -0,0 +1,136 @@
+import numpy as np
+import cv2
+from model_registry import registry, model_path
+from face_preprocessor import FacePreprocessor
+import metrics
+from collections import deque
+
+class DistilledStudent:
+    '''
+    Single compact CNN distilled from ThreeDatasetEnsemble
+    (see distill_ensemble.py). Drop-in replacement for the ensemble:
+    same predict_emotion()/predict_emotions() results, one forward pass.
+    '''
+
+    MODEL_PATHS = [model_path('student')]
+
+    def __init__(self, backend=None, model_path=None):
+        '''
+        Args:
+            backend: 'auto', 'keras' or 'tflite' (default: $FER_BACKEND or 'auto')
+            model_path: Student .h5 (default: MODEL_PATHS[0])
+        '''
+        print("Initializing Distilled Student...")
+
+        self.emotions = ['Angry', 'Disgust', 'Fear', 'Happy',
+                        'Neutral', 'Sad', 'Surprise']
+
+        self.model = registry.get(model_path or 'student', backend)
+        # Read from the model on first use (keeps TF out of a pre-fork master)
+        self._input_size = None
+        self._preprocessor = None
+        print("  OK: Student loaded")
+
+        self.emotion_history = deque(maxlen=10)
+        self.track_histories = {}
+
+        self.emotion_colors = {
+            'Angry': (0, 0, 255), 'Disgust': (0, 128, 0),
+            'Fear': (128, 0, 128), 'Happy': (0, 255, 0),
+            'Neutral': (128, 128, 128), 'Sad': (255, 0, 0),
+            'Surprise': (0, 255, 255)
+        }
+
+    @property
+    def input_size(self):
+        if self._input_size is None:
+            self._input_size = self.model.input_shape[1]
+        return self._input_size
+
+    @property
+    def preprocessor(self):
+        """Batched FacePreprocessor for the student's input size (built on first use)"""
+        if self._preprocessor is None:
+            self._preprocessor = FacePreprocessor((self.input_size, 'grayscale'))
+        return self._preprocessor
+
+    def preprocess(self, face_img):
+        if len(face_img.shape) == 3:
+            gray = cv2.cvtColor(face_img, cv2.COLOR_BGR2GRAY)
+        else:
+            gray = face_img
+        resized = cv2.resize(gray, (self.input_size, self.input_size))
+        normalized = resized.astype('float32') / 255.0
+        return np.expand_dims(np.expand_dims(normalized, axis=-1), axis=0)
+
+    def predict_emotion(self, face_img, use_smoothing=True, single_model=False):
+        return self.predict_emotions([face_img], use_smoothing=use_smoothing)[0]
+
+    def predict_emotions(self, face_imgs, track_ids=None, use_smoothing=True,
+                         single_model=False):
+        '''
+        Batched prediction: one forward pass for all faces
+        (single_model is accepted for interface parity; there is one model)
+        Returns:
+            List of (emotion, confidence, probs, individual_preds, agreement)
+            like the ensembles; agreement is None (one model, nothing compared)
+        '''
+        if len(face_imgs) == 0:
+            return []
+
+        with metrics.timer('fer_model_seconds', recognizer='student', stage='preprocess'):
+            batch, = self.preprocessor(face_imgs)
+        with metrics.timer('fer_model_seconds', recognizer='student', stage='student'):
+            probs = np.asarray(self.model.predict_on_batch(batch))
+
+        results = []
+        for i in range(len(face_imgs)):
+            emotion_idx = np.argmax(probs[i])
+            confidence = probs[i][emotion_idx]
+            emotion = self.emotions[emotion_idx]
+
+            # Temporal smoothing
+            if use_smoothing:
+                history = self._history_for(None if track_ids is None else track_ids[i])
+                history.append(emotion)
+                if len(history) >= 5:
+                    emotion = max(set(history), key=list(history).count)
+                    confidence = list(history).count(emotion) / len(history)
+
+            results.append((emotion, confidence, probs[i], [probs[i]], None))
+
+        return results
+
+    def _history_for(self, track_id):
+        if track_id is None:
+            return self.emotion_history
+        if track_id not in self.track_histories:
+            self.track_histories[track_id] = deque(maxlen=10)
+        return self.track_histories[track_id]
+
+    def drop_tracks(self, track_ids):
+        for track_id in track_ids:
+            self.track_histories.pop(track_id, None)
+
+    def get_emotion_color(self, emotion):
+        return self.emotion_colors.get(emotion, (255, 255, 255))
+
+    def get_dominant_emotion(self, window=None):
+        if not self.emotion_history:
+            return None
+        history = list(self.emotion_history)
+        if window:
+            history = history[-window:]
+        return max(set(history), key=history.count)
+
+    def reset_history(self):
+        self.emotion_history.clear()
+        self.track_histories.clear()
+
+    def get_ensemble_info(self):
+        return {
+            'models': ['Distilled student (from FER2013 + Three-Dataset ensemble)'],
+            'datasets': ['Teacher: FER2013 35K + ImageNet 14M + RAF-DB 30K'],
+            'weights': {'student': 1.0},
+            'type': 'Knowledge-distilled single model'
+        }
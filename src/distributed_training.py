@@ -0,0 +1,225 @@
+"""
+Helpers for data-parallel training with MultiWorkerMirroredStrategy
+Each worker is a separate process (on this or another machine) described
+by the TF_CONFIG environment variable. launch_local_workers() starts N
+workers on localhost, splitting the CPU cores between them.
+
+Workers append their per-epoch throughput to
+models/distributed/throughput_worker<i>.jsonl; summarize_run() combines
+them after a run.
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import subprocess
+import tensorflow as tf
+
+LOG_DIR = 'models/distributed'
+SCALING_PATH = os.path.join(LOG_DIR, 'scaling.json')
+
+
+def worker_info():
+    """
+    (index, num_workers) from TF_CONFIG, (0, 1) without it
+    """
+    config = json.loads(os.getenv('TF_CONFIG', '{}'))
+    workers = config.get('cluster', {}).get('worker', [])
+    if not workers:
+        return 0, 1
+    return config['task']['index'], len(workers)
+
+
+def configure_threads(num_workers):
+    """
+    Give each local worker its share of the cores
+    Must run before TensorFlow executes anything.
+    Override with FER_THREADS_PER_WORKER.
+    """
+    threads = int(os.getenv('FER_THREADS_PER_WORKER',
+                            max(1, (os.cpu_count() or 1) // num_workers)))
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(2)
+    return threads
+
+
+def _free_ports(count):
+    sockets = []
+    for _ in range(count):
+        sock = socket.socket()
+        sock.bind(('localhost', 0))
+        sockets.append(sock)
+    ports = [sock.getsockname()[1] for sock in sockets]
+    for sock in sockets:
+        sock.close()
+    return ports
+
+
+def launch_local_workers(script_args, num_workers):
+    """
+    Run num_workers copies of a training script on localhost
+    Args:
+        script_args: Command line of one worker, e.g. ['train_distributed.py', ...]
+        num_workers: Number of processes
+    Returns:
+        Exit code (non-zero if any worker failed; the others are then stopped)
+    """
+    ports = _free_ports(num_workers)
+    cluster = {'worker': [f'localhost:{port}' for port in ports]}
+    os.makedirs(LOG_DIR, exist_ok=True)
+
+    processes = []
+    for index in range(num_workers):
+        env = dict(os.environ)
+        env['TF_CONFIG'] = json.dumps({'cluster': cluster,
+                                       'task': {'type': 'worker', 'index': index}})
+        # Keep the chief's output on the console, the others in log files
+        output = None if index == 0 else open(
+            os.path.join(LOG_DIR, f'worker{index}.log'), 'w')
+        processes.append(subprocess.Popen([sys.executable] + script_args,
+                                          env=env, stdout=output, stderr=output))
+        print(f"  Started worker {index} (pid {processes[-1].pid}) on {cluster['worker'][index]}")
+
+    # A worker that dies leaves the others blocked in a collective: stop them all
+    exit_code = 0
+    while any(p.poll() is None for p in processes):
+        for index, process in enumerate(processes):
+            if process.poll() not in (None, 0) and exit_code == 0:
+                exit_code = process.returncode
+                print(f"  ✗ Worker {index} exited with code {exit_code}, stopping the others")
+                for other in processes:
+                    if other.poll() is None:
+                        other.terminate()
+        time.sleep(0.5)
+    if exit_code == 0:
+        exit_code = next((p.returncode for p in processes if p.returncode), 0)
+    return exit_code
+
+
+def throughput_log_path(worker_index):
+    return os.path.join(LOG_DIR, f'throughput_worker{worker_index}.jsonl')
+
+
+class ThroughputLogger(tf.keras.callbacks.Callback):
+    """
+    Per-worker epoch time and images/second
+    Images/s covers the training steps only (first step begin to last step
+    end); validation time is recorded separately.
+    """
+
+    def __init__(self, worker_index, batch_size):
+        """
+        Args:
+            worker_index: This worker's TF_CONFIG index
+            batch_size: Images per step on this worker
+        """
+        super().__init__()
+        self.worker_index = worker_index
+        self.batch_size = batch_size
+        self.log_path = throughput_log_path(worker_index)
+        os.makedirs(LOG_DIR, exist_ok=True)
+        # One log per run
+        open(self.log_path, 'w').close()
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self.steps = 0
+        self.start = time.perf_counter()
+        self.train_start = self.train_end = None
+        self.validation_seconds = 0.0
+
+    def on_train_batch_begin(self, batch, logs=None):
+        if self.train_start is None:
+            self.train_start = time.perf_counter()
+
+    def on_train_batch_end(self, batch, logs=None):
+        self.steps += 1
+        self.train_end = time.perf_counter()
+
+    def on_test_begin(self, logs=None):
+        self.validation_start = time.perf_counter()
+
+    def on_test_end(self, logs=None):
+        self.validation_seconds += time.perf_counter() - self.validation_start
+
+    def on_epoch_end(self, epoch, logs=None):
+        seconds = time.perf_counter() - self.start
+        train_seconds = (self.train_end - self.train_start) if self.steps else 0.0
+        images = self.steps * self.batch_size
+        record = {'worker': self.worker_index, 'epoch': epoch, 'seconds': seconds,
+                  'train_seconds': train_seconds,
+                  'validation_seconds': self.validation_seconds,
+                  'images': images,
+                  'images_per_sec': images / train_seconds if train_seconds else 0.0}
+        print(f"\n[worker {self.worker_index}] epoch {epoch + 1}: {seconds:.1f}s "
+              f"(train {train_seconds:.1f}s, validation {self.validation_seconds:.1f}s), "
+              f"{record['images_per_sec']:.0f} images/s")
+        with open(self.log_path, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+
+
+def summarize_run(num_workers):
+    """
+    Combine the workers' throughput logs, record the run in
+    models/distributed/scaling.json and print it next to earlier
+    runs with other worker counts
+    """
+    epochs = {}
+    for index in range(num_workers):
+        try:
+            with open(throughput_log_path(index)) as f:
+                for line in f:
+                    record = json.loads(line)
+                    epochs.setdefault(record['epoch'], []).append(record)
+        except OSError:
+            print(f"  ⚠ No throughput log for worker {index}")
+
+    # An epoch ends when the slowest worker is done
+    complete = [records for _, records in sorted(epochs.items()) if len(records) == num_workers]
+    if not complete:
+        return
+    epoch_seconds = [max(r['seconds'] for r in records) for records in complete]
+    # A step waits for the slowest worker too
+    train_seconds = [max(r['train_seconds'] for r in records) for records in complete]
+    validation_seconds = [max(r['validation_seconds'] for r in records) for records in complete]
+    images_per_sec = [sum(r['images_per_sec'] for r in records) for records in complete]
+    # Skip the first epoch (graph building, cache filling) when possible
+    steady = slice(1, None) if len(complete) > 1 else slice(None)
+    run = {
+        'workers': num_workers,
+        'epoch_seconds': sum(epoch_seconds[steady]) / len(epoch_seconds[steady]),
+        'train_seconds': sum(train_seconds[steady]) / len(train_seconds[steady]),
+        'validation_seconds': sum(validation_seconds[steady]) / len(validation_seconds[steady]),
+        'images_per_sec': sum(images_per_sec[steady]) / len(images_per_sec[steady]),
+        'per_worker_images_per_sec': [
+            sum(r['images_per_sec'] for records in complete for r in records
+                if r['worker'] == index) / len(complete)
+            for index in range(num_workers)],
+        'time': time.time()
+    }
+
+    try:
+        with open(SCALING_PATH) as f:
+            runs = json.load(f)
+    except (OSError, ValueError):
+        runs = []
+    runs.append(run)
+    with open(SCALING_PATH, 'w') as f:
+        json.dump(runs, f, indent=2)
+
+    latest = {}
+    for previous in runs:
+        latest[previous['workers']] = previous
+    # Speedup compares training time (runs logged before it was recorded: epoch time)
+    def train_time(previous):
+        return previous.get('train_seconds', previous['epoch_seconds'])
+
+    print(f"\n  {'Workers':>7} {'Train (s)':>10} {'Val (s)':>8} {'Images/s':>10} {'Speedup':>8}")
+    base = latest[min(latest)]
+    for workers, previous in sorted(latest.items()):
+        validation = previous.get('validation_seconds')
+        validation = f"{validation:.1f}" if validation is not None else '-'
+        print(f"  {workers:>7} {train_time(previous):>10.1f} {validation:>8} "
+              f"{previous['images_per_sec']:>10.0f} "
+              f"{train_time(base) / train_time(previous):>7.2f}x")
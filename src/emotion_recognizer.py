@@ -1,19 +1,21 @@
 import numpy as np
 import cv2
-import tensorflow as tf
+from model_registry import registry
+import metrics
 from collections import deque
 
 class EmotionRecognizer:
     """Emotion recognition from facial images"""
     
-    def __init__(self, model_path='models/fer_model_best.h5'):
+    def __init__(self, model_path='fer2013'):
         """
         Initialize emotion recognizer
         Args:
-            model_path: Path to trained model file
+            model_path: Registered model name or path of a trained model file
         """
         print(f"Loading emotion recognition model from {model_path}...")
-        self.model = tf.keras.models.load_model(model_path)
+        # Loaded on first use ($FER_BACKEND), hot-swappable (see model_registry)
+        self.model = registry.get(model_path)
         print("✓ Model loaded successfully")
         
         # Emotion labels (must match training order)
@@ -70,10 +72,12 @@ class EmotionRecognizer:
             (emotion, confidence, all_probabilities)
         """
         # Preprocess
-        processed = self.preprocess_face(face_img)
+        with metrics.timer('fer_model_seconds', recognizer='fer2013', stage='preprocess'):
+            processed = self.preprocess_face(face_img)
         
         # Predict
-        predictions = self.model.predict(processed, verbose=0)
+        with metrics.timer('fer_model_seconds', recognizer='fer2013', stage='fer2013'):
+            predictions = self.model.predict(processed, verbose=0)
         probabilities = predictions[0]
         
         # Get emotion with highest probability
@@ -31,14 +31,22 @@ class FaceDetector:
                 cascade_path = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
                 self.detector = cv2.CascadeClassifier(cascade_path)
     
-    def detect_faces(self, frame):
+    def detect_faces(self, frame, scale=1.0):
         """
         Detect faces in frame
         Args:
             frame: Input image/frame
+            scale: Run detection on a frame resized by this factor (< 1 is
+                   faster but misses small faces); boxes are in full-frame
+                   coordinates either way
         Returns:
             List of bounding boxes [(x1, y1, x2, y2), ...]
         """
+        if scale != 1.0:
+            small = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            return [tuple(int(round(v / scale)) for v in box)
+                    for box in self.detect_faces(small)]
+        
         if self.method == 'haar':
             return self._detect_haar(frame)
         else:
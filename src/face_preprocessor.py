@@ -0,0 +1,115 @@
+"""
+Batched face preprocessing into reusable buffers
+Each crop is resized once (to the largest model input) and every model
+input is derived from that small image: one colour conversion per
+output, an area downscale where sizes differ, and uint8 -> float32
+conversion fused with the / 255 scaling in a single ufunc that writes
+straight into the model's batch buffer.
+
+Buffers are kept per thread and only grow, so once the largest face count
+has been seen a frame allocates no new arrays. Returned batches are views
+into those buffers: they stay valid until the same thread preprocesses the
+next frame.
+"""
+
+import threading
+import numpy as np
+import cv2
+
+SCALE = np.float32(1.0 / 255.0)
+
+
+class FacePreprocessor:
+    """Model inputs for a list of face crops, e.g. FacePreprocessor((48, 'grayscale'), (96, 'rgb'))"""
+
+    def __init__(self, *specs):
+        """
+        Args:
+            specs: (size, color_mode) per model input; color_mode is
+                   'grayscale' (N, size, size, 1) or 'rgb' (N, size, size, 3)
+        """
+        self.specs = [(int(size), color_mode) for size, color_mode in specs]
+        self.base = max(size for size, _ in self.specs)
+        self._local = threading.local()
+
+    def _buffers(self, count):
+        local = self._local
+        if getattr(local, 'capacity', 0) < count:
+            capacity = max(count, 2 * getattr(local, 'capacity', 0), 4)
+            local.capacity = capacity
+            local.batches = [np.empty((capacity, size, size, 1 if mode == 'grayscale' else 3),
+                                      dtype=np.float32) for size, mode in self.specs]
+        if not hasattr(local, 'scratch'):
+            base = self.base
+            local.scratch = {
+                'bgr': np.empty((base, base, 3), dtype=np.uint8),
+                'gray': np.empty((base, base), dtype=np.uint8),
+                'rgb': np.empty((base, base, 3), dtype=np.uint8),
+                # Per-size uint8 images for inputs smaller than the base size
+                'small_gray': {size: np.empty((size, size), dtype=np.uint8)
+                               for size, mode in self.specs if mode == 'grayscale'},
+                'small_rgb': {size: np.empty((size, size, 3), dtype=np.uint8)
+                              for size, mode in self.specs if mode == 'rgb'},
+            }
+        return local.batches, local.scratch
+
+    def __call__(self, face_imgs, outputs=None):
+        """
+        Args:
+            face_imgs: List of BGR (or grayscale) face crops
+            outputs: Indices of the specs to compute (default: all)
+        Returns:
+            One float32 batch per requested spec, values in [0, 1]
+        """
+        count = len(face_imgs)
+        batches, scratch = self._buffers(count)
+        if outputs is None:
+            outputs = range(len(self.specs))
+        base = self.base
+        for i, face in enumerate(face_imgs):
+            if face.ndim == 2:
+                cv2.resize(face, (base, base), dst=scratch['gray'])
+                gray_ready, rgb_ready = True, False
+            else:
+                cv2.resize(face, (base, base), dst=scratch['bgr'])
+                gray_ready = rgb_ready = False
+
+            for index in outputs:
+                batch = batches[index]
+                size, mode = self.specs[index]
+                if mode == 'grayscale':
+                    if not gray_ready:
+                        cv2.cvtColor(scratch['bgr'], cv2.COLOR_BGR2GRAY, dst=scratch['gray'])
+                        gray_ready = True
+                    image = scratch['gray']
+                    if size != base:
+                        image = cv2.resize(image, (size, size), dst=scratch['small_gray'][size],
+                                           interpolation=cv2.INTER_AREA)
+                    np.multiply(image, SCALE, out=batch[i, :, :, 0], casting='unsafe')
+                else:
+                    if not rgb_ready:
+                        if face.ndim == 2:
+                            cv2.cvtColor(scratch['gray'], cv2.COLOR_GRAY2RGB, dst=scratch['rgb'])
+                        else:
+                            cv2.cvtColor(scratch['bgr'], cv2.COLOR_BGR2RGB, dst=scratch['rgb'])
+                        rgb_ready = True
+                    image = scratch['rgb']
+                    if size != base:
+                        image = cv2.resize(image, (size, size), dst=scratch['small_rgb'][size],
+                                           interpolation=cv2.INTER_AREA)
+                    np.multiply(image, SCALE, out=batch[i], casting='unsafe')
+        return [batches[index][:count] for index in outputs]
+
+    @staticmethod
+    def compact(batch, keep):
+        """
+        Move the rows selected by a boolean mask to the front, in place
+        Returns:
+            View of the kept rows
+        """
+        count = 0
+        for i in np.flatnonzero(keep):
+            if i != count:
+                batch[count] = batch[i]
+            count += 1
+        return batch[:count]
@@ -0,0 +1,95 @@
+"""
+IoU face tracker for multi-face sessions
+Each update() matches the detected boxes to the live tracks greedily, best
+overlap first; a box with too little overlap still continues a track whose
+centre is close relative to the face size. Unmatched boxes start a new
+track with the next integer ID (IDs are never reused within a tracker).
+Tracks not matched for `max_age` seconds are dropped and listed in
+`expired`, so callers can discard per-track state such as smoothing history.
+"""
+
+import time
+
+
+def box_iou(a, b):
+    """Intersection over union of two (x1, y1, x2, y2) boxes"""
+    ix1, iy1 = max(a[0], b[0]), max(a[1], b[1])
+    ix2, iy2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0, ix2 - ix1) * max(0, iy2 - iy1)
+    if inter == 0:
+        return 0.0
+    area_a = (a[2] - a[0]) * (a[3] - a[1])
+    area_b = (b[2] - b[0]) * (b[3] - b[1])
+    return inter / float(area_a + area_b - inter)
+
+
+class FaceTracker:
+    """Assigns stable IDs to faces across frames of one session"""
+
+    def __init__(self, iou_threshold=0.3, max_age=2.0):
+        """
+        Initialize tracker
+        Args:
+            iou_threshold: Minimum overlap to continue a track
+            max_age: Seconds a track survives without being matched
+        """
+        self.iou_threshold = iou_threshold
+        self.max_age = max_age
+        self.tracks = {}  # track_id -> (box, last_seen)
+        self.next_id = 1
+        self.expired = []
+        self.last_update = time.time()
+
+    def _matches(self, track_box, box):
+        """Overlap, or centres close relative to face size (faces move between samples)"""
+        iou = box_iou(track_box, box)
+        if iou >= self.iou_threshold:
+            return iou
+        tcx, tcy = (track_box[0] + track_box[2]) / 2, (track_box[1] + track_box[3]) / 2
+        cx, cy = (box[0] + box[2]) / 2, (box[1] + box[3]) / 2
+        size = max(track_box[2] - track_box[0], box[2] - box[0], 1)
+        if abs(tcx - cx) + abs(tcy - cy) < 0.5 * size:
+            # Rank below any real overlap match
+            return self.iou_threshold * 0.5
+        return 0.0
+
+    def update(self, boxes, timestamp=None):
+        """
+        Match detections to existing tracks
+        Args:
+            boxes: List of (x1, y1, x2, y2)
+            timestamp: Seconds (default: wall clock); use video time for files
+        Returns:
+            List of track IDs aligned with boxes
+        """
+        now = time.time() if timestamp is None else timestamp
+        self.last_update = time.time()
+
+        # Greedy assignment, best overlap first
+        candidates = []
+        for i, box in enumerate(boxes):
+            for track_id, (track_box, _) in self.tracks.items():
+                score = self._matches(track_box, box)
+                if score > 0:
+                    candidates.append((score, i, track_id))
+        candidates.sort(reverse=True)
+
+        ids = [None] * len(boxes)
+        used = set()
+        for score, i, track_id in candidates:
+            if ids[i] is None and track_id not in used:
+                ids[i] = track_id
+                used.add(track_id)
+
+        for i, box in enumerate(boxes):
+            if ids[i] is None:
+                ids[i] = self.next_id
+                self.next_id += 1
+            self.tracks[ids[i]] = (tuple(int(v) for v in box), now)
+
+        self.expired = [track_id for track_id, (_, last_seen) in self.tracks.items()
+                        if now - last_seen > self.max_age]
+        for track_id in self.expired:
+            del self.tracks[track_id]
+
+        return ids
@@ -0,0 +1,136 @@
+"""
+Backbone feature cache for frozen-backbone training phases
+While the backbone is frozen (and run with training=False) its output for
+a given input never changes, so it only needs computing once. Features
+are pooled, stored as float16 in a memory-mapped .npy of shape
+(views, N, D) and the head is then trained directly on them. View 0 is
+the unaugmented image, views 1.. are augmented with fixed seeds; each
+epoch draws one random view per image.
+
+Caches are keyed on the backbone weights, the dataset folder contents
+and the augmentation settings, so a stale cache is never reused.
+"""
+
+import os
+import json
+import hashlib
+import numpy as np
+import tensorflow as tf
+
+from data_pipeline import image_dataset, AUTOTUNE
+from dataset_cache import list_image_files, stat_fingerprint
+
+
+def default_feature_dir():
+    return os.path.join(os.getenv('FER_CACHE_DIR', 'data/cache'), 'features')
+
+
+def weights_fingerprint(model):
+    digest = hashlib.sha1()
+    for weight in model.get_weights():
+        digest.update(np.ascontiguousarray(weight).tobytes())
+    return digest.hexdigest()
+
+
+def _cache_key(backbone, directory, image_size, views, augment, seed):
+    paths, _, _ = list_image_files(directory)
+    description = json.dumps({
+        'backbone': backbone.name,
+        'weights': weights_fingerprint(backbone),
+        'directory': directory,
+        'files': stat_fingerprint(directory, paths),
+        'image_size': list(image_size),
+        'views': views,
+        'augment': augment,
+        'seed': seed
+    }, sort_keys=True)
+    return hashlib.sha1(description.encode()).hexdigest()[:16]
+
+
+def cached_features(backbone, directory, image_size, views=1, augment=None,
+                    batch_size=64, seed=0, cache_dir=None):
+    """
+    Pooled backbone features for every image, computed once and memory-mapped
+    Args:
+        backbone: Frozen feature extractor (e.g. MobileNetV3 without top)
+        directory: Class-folder split, e.g. 'data/fer2013/train'
+        image_size: (height, width) fed to the backbone (RGB)
+        views: 1 unaugmented view + (views - 1) augmented ones
+        augment: ImageDataGenerator-style settings for the augmented views
+        seed: Base seed; view v uses seed + v
+    Returns:
+        (features, labels) with features a float16 memmap (views, N, D)
+    """
+    cache_dir = cache_dir or default_feature_dir()
+    os.makedirs(cache_dir, exist_ok=True)
+    key = _cache_key(backbone, directory, image_size, views, augment, seed)
+    features_path = os.path.join(cache_dir, f"{key}.features.npy")
+    labels_path = os.path.join(cache_dir, f"{key}.labels.npy")
+
+    if os.path.exists(features_path) and os.path.exists(labels_path):
+        print(f"  ✓ Using cached features for {directory} ({key})")
+        return np.load(features_path, mmap_mode='r'), np.load(labels_path)
+
+    @tf.function
+    def embed(images):
+        output = backbone(images, training=False)
+        if len(output.shape) == 4:
+            output = tf.reduce_mean(output, axis=[1, 2])
+        return tf.cast(output, tf.float16)
+
+    features = None
+    labels = []
+    tmp_path = features_path + '.tmp'
+    for view in range(views):
+        # Fixed seed per view so the cache is reproducible
+        tf.random.set_seed(seed + view)
+        ds, info = image_dataset(directory, image_size, color_mode='rgb',
+                                 batch_size=batch_size, shuffle=False, cache=False,
+                                 augment=augment if view > 0 else None)
+        offset = 0
+        for images, one_hot in ds:
+            batch_features = embed(images).numpy()
+            if features is None:
+                shape = (views, info['samples'], batch_features.shape[1])
+                features = np.lib.format.open_memmap(tmp_path, mode='w+',
+                                                     dtype=np.float16, shape=shape)
+            features[view, offset:offset + len(batch_features)] = batch_features
+            if view == 0:
+                labels.append(np.argmax(one_hot.numpy(), axis=1).astype(np.int32))
+            offset += len(batch_features)
+        print(f"  Extracted view {view + 1}/{views} of {directory} ({offset} images)")
+
+    features.flush()
+    del features
+    os.replace(tmp_path, features_path)
+    np.save(labels_path, np.concatenate(labels))
+    return np.load(features_path, mmap_mode='r'), np.load(labels_path)
+
+
+def feature_dataset(features, labels, num_classes, batch_size=32, shuffle=True, seed=None):
+    """
+    Batched (features, one-hot labels) drawn from a feature cache
+    Training (shuffle=True) picks a random view per image each epoch;
+    evaluation uses view 0 (unaugmented).
+    """
+    views, n, dim = features.shape
+
+    def gather(indices):
+        indices = np.sort(indices)
+        if shuffle and views > 1:
+            chosen = np.random.randint(0, views, size=len(indices))
+        else:
+            chosen = np.zeros(len(indices), dtype=np.int64)
+        return features[chosen, indices].astype(np.float32), labels[indices]
+
+    def load_batch(indices):
+        batch, batch_labels = tf.numpy_function(gather, [indices], [tf.float32, tf.int32])
+        batch.set_shape((None, dim))
+        return batch, tf.one_hot(batch_labels, num_classes)
+
+    ds = tf.data.Dataset.range(n)
+    if shuffle:
+        ds = ds.shuffle(n, seed=seed, reshuffle_each_iteration=True)
+    ds = ds.batch(batch_size)
+    ds = ds.map(load_batch, num_parallel_calls=AUTOTUNE, deterministic=not shuffle)
+    return ds.prefetch(AUTOTUNE)
@@ -0,0 +1,73 @@
+"""
+FER2013 CNN architecture (model_training.py)
+Layer widths are a parameter so channel-pruned variants
+(prune_fer_model.py) can be rebuilt with the same structure.
+"""
+
+from tensorflow.keras.models import Sequential
+from tensorflow.keras.layers import Dense, Dropout, Flatten, Conv2D, MaxPooling2D, BatchNormalization
+from tensorflow.keras.optimizers import Adam
+
+# Output units of the prunable layers, in order:
+# 7 convolutions (4 blocks) then the two hidden dense layers
+DEFAULT_WIDTHS = (32, 32, 64, 64, 128, 128, 256, 512, 256)
+
+
+def create_fer_model(widths=DEFAULT_WIDTHS, learning_rate=0.001):
+    """
+    Args:
+        widths: Units of the 7 conv and 2 hidden dense layers
+        learning_rate: Adam learning rate
+    Returns:
+        Compiled Sequential model (48x48x1 -> 7 softmax)
+    """
+    c1, c2, c3, c4, c5, c6, c7, d1, d2 = widths
+    model = Sequential([
+        # First convolutional block
+        Conv2D(c1, (3, 3), activation='relu', padding='same', input_shape=(48, 48, 1)),
+        BatchNormalization(),
+        Conv2D(c2, (3, 3), activation='relu', padding='same'),
+        BatchNormalization(),
+        MaxPooling2D(pool_size=(2, 2)),
+        Dropout(0.25),
+
+        # Second convolutional block
+        Conv2D(c3, (3, 3), activation='relu', padding='same'),
+        BatchNormalization(),
+        Conv2D(c4, (3, 3), activation='relu', padding='same'),
+        BatchNormalization(),
+        MaxPooling2D(pool_size=(2, 2)),
+        Dropout(0.25),
+
+        # Third convolutional block
+        Conv2D(c5, (3, 3), activation='relu', padding='same'),
+        BatchNormalization(),
+        Conv2D(c6, (3, 3), activation='relu', padding='same'),
+        BatchNormalization(),
+        MaxPooling2D(pool_size=(2, 2)),
+        Dropout(0.25),
+
+        # Fourth convolutional block
+        Conv2D(c7, (3, 3), activation='relu', padding='same'),
+        BatchNormalization(),
+        MaxPooling2D(pool_size=(2, 2)),
+        Dropout(0.25),
+
+        # Fully connected layers
+        Flatten(),
+        Dense(d1, activation='relu'),
+        BatchNormalization(),
+        Dropout(0.5),
+        Dense(d2, activation='relu'),
+        BatchNormalization(),
+        Dropout(0.5),
+        Dense(7, activation='softmax')  # 7 emotion classes
+    ])
+
+    model.compile(
+        optimizer=Adam(learning_rate=learning_rate),
+        loss='categorical_crossentropy',
+        metrics=['accuracy']
+    )
+
+    return model
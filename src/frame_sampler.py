@@ -0,0 +1,177 @@
+"""
+Adaptive frame sampling for video analysis
+Decides per frame whether to run face detection + emotion inference,
+using cheap motion metrics on a downscaled grayscale thumbnail, and
+interpolates results for the frames that were skipped.
+"""
+
+import os
+import numpy as np
+import cv2
+
+
+class AdaptiveFrameSampler:
+    """
+    Motion-triggered sampler with an inference budget
+
+    A frame is analyzed when it differs enough from the last analyzed
+    frame (whole frame or any of the last known face regions) and the budget
+    allows it. Budget is a token bucket refilled at `max_rate`
+    inferences per second of video. Static scenes are still sampled at
+    least every 1/min_rate seconds.
+    """
+
+    def __init__(self, max_rate=None, min_rate=None, motion_threshold=None,
+                 thumb_size=(64, 48)):
+        """
+        Args:
+            max_rate: Max inferences per second of video ($FER_SAMPLER_MAX_RATE, 3)
+            min_rate: Min inferences per second of video ($FER_SAMPLER_MIN_RATE, 0.5)
+            motion_threshold: Mean absolute thumbnail difference (0-1) that
+                              counts as a change ($FER_SAMPLER_MOTION, 0.04)
+            thumb_size: (width, height) of the motion thumbnail
+        """
+        if max_rate is None:
+            max_rate = float(os.getenv('FER_SAMPLER_MAX_RATE', '3'))
+        if min_rate is None:
+            min_rate = float(os.getenv('FER_SAMPLER_MIN_RATE', '0.5'))
+        if motion_threshold is None:
+            motion_threshold = float(os.getenv('FER_SAMPLER_MOTION', '0.04'))
+
+        self.max_rate = max_rate
+        self.min_rate = min(min_rate, max_rate)
+        self.motion_threshold = motion_threshold
+        self.thumb_size = thumb_size
+
+        # Allow a short burst (one second of budget) after a quiet stretch
+        self.burst = max(1.0, max_rate)
+        self.tokens = self.burst
+
+        self.last_time = None
+        self.last_analyzed_time = None
+        self.last_thumb = None
+        self.face_regions = []
+
+        self.frame_times = []
+        self.keyframes = []  # (timestamp, probs or None when no face)
+
+    def _thumbnail(self, frame):
+        # Shrink before the colour conversion so it runs on a few pixels only
+        small = cv2.resize(frame, self.thumb_size, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return small.astype(np.int16)
+
+    def motion_score(self, thumb):
+        """Change since the last analyzed frame (0-1), face regions weighted"""
+        if self.last_thumb is None:
+            return 1.0
+        diff = np.abs(thumb - self.last_thumb)
+        score = diff.mean() / 255.0
+        for (x1, y1, x2, y2) in self.face_regions:
+            face_diff = diff[y1:y2, x1:x2]
+            if face_diff.size > 0:
+                score = max(score, face_diff.mean() / 255.0)
+        return score
+
+    def should_analyze(self, frame, timestamp):
+        """
+        Decide whether to run detection + inference on this frame
+        Args:
+            frame: BGR frame
+            timestamp: Position in the video (seconds)
+        """
+        self.frame_times.append(timestamp)
+
+        if self.last_time is not None:
+            elapsed = max(0.0, timestamp - self.last_time)
+            self.tokens = min(self.burst, self.tokens + elapsed * self.max_rate)
+        self.last_time = timestamp
+
+        if self.tokens < 1.0:
+            return False
+
+        thumb = self._thumbnail(frame)
+        due = (self.last_analyzed_time is None or
+               timestamp - self.last_analyzed_time >= 1.0 / self.min_rate)
+        if not due and self.motion_score(thumb) < self.motion_threshold:
+            return False
+
+        self.tokens -= 1.0
+        self.last_thumb = thumb
+        self.last_analyzed_time = timestamp
+        return True
+
+    def set_face_boxes(self, boxes, frame_shape):
+        """Focus motion detection on the faces found in the analyzed frame"""
+        h, w = frame_shape[:2]
+        tw, th = self.thumb_size
+        self.face_regions = []
+        for (x1, y1, x2, y2) in boxes:
+            self.face_regions.append((int(x1 * tw / w), int(y1 * th / h),
+                                      max(int(x1 * tw / w) + 1, int(x2 * tw / w)),
+                                      max(int(y1 * th / h) + 1, int(y2 * th / h))))
+
+    def record(self, timestamp, probs):
+        """Store the result of an analyzed frame (probs=None: no face)"""
+        self.keyframes.append(
+            (timestamp, None if probs is None else np.asarray(probs, dtype=np.float32)))
+
+    def interpolate(self, frame_times=None):
+        """
+        Per-frame probabilities for every frame seen
+        Returns:
+            List aligned with frame_times of probability arrays or None
+        """
+        if frame_times is None:
+            frame_times = self.frame_times
+        return interpolate_keyframes(self.keyframes, frame_times)
+
+    def stats(self, fixed_stride=10):
+        """
+        Inferences used versus dense and fixed-stride sampling
+        Args:
+            fixed_stride: Stride of the fixed sampler to compare against
+        """
+        frames = len(self.frame_times)
+        analyzed = len(self.keyframes)
+        duration = (self.frame_times[-1] - self.frame_times[0]) if frames > 1 else 0.0
+        return {
+            'frames': frames,
+            'analyzed': analyzed,
+            'analyzed_fraction': analyzed / frames if frames else 0.0,
+            'inferences_per_second': analyzed / duration if duration > 0 else float(analyzed),
+            'fixed_stride': fixed_stride,
+            'fixed_stride_inferences': frames // fixed_stride,
+            'max_rate': self.max_rate,
+            'min_rate': self.min_rate,
+            'motion_threshold': self.motion_threshold
+        }
+
+
+def interpolate_keyframes(keyframes, frame_times):
+    """
+    Probabilities at each frame time from sparse (timestamp, probs) keyframes
+    Linear between neighbouring keyframes with a face; nearest keyframe
+    when either neighbour had no face (probs=None).
+    """
+    if not keyframes:
+        return [None] * len(frame_times)
+
+    key_times = [t for t, _ in keyframes]
+    results = []
+    k = 0
+    for t in frame_times:
+        while k + 1 < len(key_times) and key_times[k + 1] <= t:
+            k += 1
+        t0, p0 = keyframes[k]
+        if t <= t0 or k + 1 == len(key_times):
+            results.append(p0)
+            continue
+        t1, p1 = keyframes[k + 1]
+        if p0 is None or p1 is None:
+            results.append(p0 if t - t0 <= t1 - t else p1)
+        else:
+            alpha = (t - t0) / (t1 - t0)
+            results.append((1 - alpha) * p0 + alpha * p1)
+    return results
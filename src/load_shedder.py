@@ -0,0 +1,123 @@
+"""
+Latency budget controller for the real-time endpoints
+Tracks the latency of recently analyzed frames against a budget and
+steps through cheaper ways of answering while the server is behind:
+
+    0 full          detection + every model of the ensemble
+    1 single_model  FER2013 CNN only
+    2 small_detect  + face detection on a half-size frame
+    3 skip_frames   + analyze every 2nd frame, others reuse the last result
+    4 reuse_last    + analyze every 4th frame
+
+One step is taken at a time, at most every `cooldown` analyzed frames,
+and the level only drops back once latency is well under the budget, so
+the controller doesn't oscillate between two levels.
+"""
+
+import os
+import threading
+import metrics
+
+LEVELS = ('full', 'single_model', 'small_detect', 'skip_frames', 'reuse_last')
+DETECT_SCALE = (1.0, 1.0, 0.5, 0.5, 0.5)
+FRAME_STRIDE = (1, 1, 1, 2, 4)
+
+
+class LoadShedder:
+    """Degradation level from an exponential moving average of frame latency"""
+
+    def __init__(self, source, budget_ms=None, smoothing=0.2, cooldown=10,
+                 recover_ratio=0.6):
+        """
+        Args:
+            source: Metrics label ('camera', 'stream', ...)
+            budget_ms: Target per-frame latency ($FER_LATENCY_BUDGET_MS, 100;
+                       0 disables shedding)
+            smoothing: Weight of the newest sample in the moving average
+            cooldown: Analyzed frames between two level changes
+            recover_ratio: Step back up once latency < budget * recover_ratio
+        """
+        if budget_ms is None:
+            budget_ms = float(os.getenv('FER_LATENCY_BUDGET_MS', '100'))
+        self.source = source
+        self.budget = budget_ms / 1000.0
+        self.smoothing = smoothing
+        self.cooldown = cooldown
+        self.recover_ratio = recover_ratio
+
+        self.level = 0
+        self.latency = None
+        self._since_change = 0
+        self._frames = {}
+        self._lock = threading.Lock()
+        metrics.set_gauge('fer_degradation_level', 0, source=source)
+
+    @property
+    def enabled(self):
+        return self.budget > 0
+
+    @property
+    def mode(self):
+        return LEVELS[self.level]
+
+    @property
+    def single_model(self):
+        return self.level >= 1
+
+    @property
+    def detect_scale(self):
+        return DETECT_SCALE[self.level]
+
+    def should_analyze(self, key=None):
+        """
+        Whether this frame gets detection + inference at the current level
+        Args:
+            key: Stream the frame belongs to (e.g. session ID); every
+                 stream's first frame is always analyzed
+        """
+        stride = FRAME_STRIDE[self.level]
+        with self._lock:
+            count = self._frames.get(key, 0)
+            self._frames[key] = count + 1
+        if count % stride == 0:
+            return True
+        metrics.inc('fer_shed_frames_total', source=self.source, level=self.mode)
+        return False
+
+    def forget(self, key):
+        """Drop the frame counter of a stream that has ended"""
+        with self._lock:
+            self._frames.pop(key, None)
+
+    def record(self, seconds):
+        """Report the latency of an analyzed frame; may change the level"""
+        if not self.enabled:
+            return
+        with self._lock:
+            if self.latency is None:
+                self.latency = seconds
+            else:
+                self.latency += self.smoothing * (seconds - self.latency)
+            self._since_change += 1
+            if self._since_change < self.cooldown:
+                return
+            if self.latency > self.budget and self.level < len(LEVELS) - 1:
+                self._set_level(self.level + 1)
+            elif self.latency < self.budget * self.recover_ratio and self.level > 0:
+                self._set_level(self.level - 1)
+
+    def _set_level(self, level):
+        print(f"Load shedding ({self.source}): {LEVELS[self.level]} -> {LEVELS[level]} "
+              f"({1000 * self.latency:.0f} ms vs {1000 * self.budget:.0f} ms budget)")
+        self.level = level
+        self._since_change = 0
+        metrics.set_gauge('fer_degradation_level', level, source=self.source)
+
+    def status(self):
+        """For API responses"""
+        return {
+            'level': self.level,
+            'mode': self.mode,
+            'latency_ms': None if self.latency is None else round(1000 * self.latency, 1),
+            'budget_ms': 1000 * self.budget
+        }
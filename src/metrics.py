@@ -0,0 +1,320 @@
+"""
+Lightweight hot-path instrumentation with Prometheus text output
+Latency histograms, counters and gauges kept in process memory:
+
+    with metrics.timer('fer_stage_seconds', stage='detect'):
+        boxes = face_detector.detect_faces(frame)
+    metrics.inc('fer_faces_total', len(boxes))
+
+With FER_METRICS=0 timer() returns one shared no-op object and the other
+calls return immediately, so instrumented loops cost next to nothing.
+
+Under a pre-forking server every worker has its own counters. When
+FER_METRICS_DIR is set (gunicorn.conf.py does), each process writes a
+snapshot there every few seconds and /metrics merges the snapshots of
+all live processes, so any worker can answer a scrape.
+"""
+
+import os
+import json
+import time
+import bisect
+import threading
+
+ENABLED = os.getenv('FER_METRICS', '1') == '1'
+
+# Upper bounds in seconds (plus +Inf)
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+FLUSH_INTERVAL = float(os.getenv('FER_METRICS_FLUSH_INTERVAL', '5'))
+
+HELP = {
+    'fer_stage_seconds': 'Time spent in each stage of the frame pipeline',
+    'fer_model_seconds': 'Recognizer preprocessing and inference time',
+    'fer_http_request_seconds': 'Time until a response is returned',
+    'fer_frames_total': 'Frames processed',
+    'fer_faces_total': 'Faces passed to the recognizer',
+    'fer_http_requests_total': 'HTTP requests by endpoint and status',
+    'fer_degradation_level': 'Load-shedding level (0 = full quality; max over workers)',
+    'fer_shed_frames_total': 'Frames answered with a previous result to shed load',
+    'fer_prediction_cache_total': 'Face crops answered from the prediction cache (hit) or the models',
+    'fer_prediction_cache_saved_seconds_total': 'Estimated inference time saved by cache hits',
+    'fer_cascade_faces_total': 'Faces by cascade path (fer2013_only skipped the heavy model)',
+    'fer_model_swaps_total': 'Model hot-swaps by model and result',
+}
+
+_lock = threading.Lock()
+# (name, sorted label items) -> [count per bucket..., +Inf count, sum]
+_histograms = {}
+# (name, sorted label items) -> value
+_counters = {}
+_gauges = {}
+_flusher_pid = None
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def observe(name, seconds, **labels):
+    """Record one duration in a histogram"""
+    if not ENABLED:
+        return
+    key = _key(name, labels)
+    index = bisect.bisect_left(BUCKETS, seconds)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = [0] * (len(BUCKETS) + 1) + [0.0]
+        histogram[index] += 1
+        histogram[-1] += seconds
+    _ensure_flusher()
+
+
+def inc(name, amount=1, **labels):
+    """Increase a counter"""
+    if not ENABLED:
+        return
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+    _ensure_flusher()
+
+
+def set_gauge(name, value, **labels):
+    """Set a gauge (merged over processes by taking the maximum)"""
+    if not ENABLED:
+        return
+    key = _key(name, labels)
+    with _lock:
+        _gauges[key] = value
+    _ensure_flusher()
+
+
+class _Timer:
+    __slots__ = ('name', 'labels', 'start')
+
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name, time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def timer(name, **labels):
+    """Context manager recording its duration in a histogram"""
+    if not ENABLED:
+        return _NULL_TIMER
+    return _Timer(name, labels)
+
+
+# ---------------------------------------------------------------------------
+# Sharing between worker processes
+
+def _metrics_dir():
+    return os.getenv('FER_METRICS_DIR')
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        pass
+    return True
+
+
+def _snapshot():
+    with _lock:
+        return {
+            'histograms': [[name, labels, values] for (name, labels), values in _histograms.items()],
+            'counters': [[name, labels, value] for (name, labels), value in _counters.items()],
+            'gauges': [[name, labels, value] for (name, labels), value in _gauges.items()]
+        }
+
+
+def flush():
+    """Write this process's snapshot to FER_METRICS_DIR (if set)"""
+    metrics_dir = _metrics_dir()
+    if not metrics_dir:
+        return
+    os.makedirs(metrics_dir, exist_ok=True)
+    path = os.path.join(metrics_dir, f"{os.getpid()}.json")
+    with open(path + '.tmp', 'w') as f:
+        json.dump(_snapshot(), f)
+    os.replace(path + '.tmp', path)
+
+
+def _flush_loop():
+    while True:
+        time.sleep(FLUSH_INTERVAL)
+        try:
+            flush()
+        except OSError:
+            pass
+
+
+def _ensure_flusher():
+    """Start the snapshot thread once per process (also after a fork)"""
+    global _flusher_pid
+    if _flusher_pid == os.getpid() or not _metrics_dir() or os.name != 'posix':
+        return
+    with _lock:
+        if _flusher_pid == os.getpid():
+            return
+        _flusher_pid = os.getpid()
+    threading.Thread(target=_flush_loop, name='metrics-flush', daemon=True).start()
+
+
+def reset_dir():
+    """Remove snapshots of a previous server run (call from the master)"""
+    metrics_dir = _metrics_dir()
+    if not metrics_dir or not os.path.isdir(metrics_dir):
+        return
+    for name in os.listdir(metrics_dir):
+        if name.endswith('.json') or name.endswith('.tmp'):
+            os.remove(os.path.join(metrics_dir, name))
+
+
+def _collect():
+    """This process's values merged with the other live processes' snapshots"""
+    histograms = {}
+    counters = {}
+    gauges = {}
+
+    def merge(snapshot):
+        for name, labels, values in snapshot['histograms']:
+            key = (name, tuple(tuple(item) for item in labels))
+            if key in histograms:
+                histograms[key] = [a + b for a, b in zip(histograms[key], values)]
+            else:
+                histograms[key] = list(values)
+        for name, labels, value in snapshot['counters']:
+            key = (name, tuple(tuple(item) for item in labels))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, value in snapshot.get('gauges', []):
+            key = (name, tuple(tuple(item) for item in labels))
+            gauges[key] = max(gauges.get(key, value), value)
+
+    merge(_snapshot())
+    metrics_dir = _metrics_dir()
+    if metrics_dir and os.path.isdir(metrics_dir):
+        for filename in os.listdir(metrics_dir):
+            pid = filename[:-len('.json')]
+            if not filename.endswith('.json') or not pid.isdigit() or int(pid) == os.getpid():
+                continue
+            if not _pid_alive(int(pid)):
+                continue
+            try:
+                with open(os.path.join(metrics_dir, filename)) as f:
+                    merge(json.load(f))
+            except (OSError, ValueError):
+                continue
+    return histograms, counters, gauges
+
+
+# ---------------------------------------------------------------------------
+# Output
+
+def _format_labels(labels, extra=()):
+    items = list(labels) + list(extra)
+    if not items:
+        return ''
+    escaped = [(k, str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+               for k, v in items]
+    return '{' + ','.join(f'{k}="{v}"' for k, v in escaped) + '}'
+
+
+def render():
+    """All metrics in the Prometheus text exposition format"""
+    histograms, counters, gauges = _collect()
+    lines = []
+    typed = set()
+
+    def header(name, kind):
+        if name not in typed:
+            typed.add(name)
+            lines.append(f"# HELP {name} {HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} {kind}")
+
+    for (name, labels), values in sorted(histograms.items()):
+        header(name, 'histogram')
+        cumulative = 0
+        for bound, count in zip(BUCKETS + ('+Inf',), values[:-1]):
+            cumulative += count
+            lines.append(f"{name}_bucket{_format_labels(labels, [('le', bound)])} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {values[-1]}")
+        lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+
+    for (name, labels), value in sorted(counters.items()):
+        header(name, 'counter')
+        lines.append(f"{name}{_format_labels(labels)} {value}")
+
+    for (name, labels), value in sorted(gauges.items()):
+        header(name, 'gauge')
+        lines.append(f"{name}{_format_labels(labels)} {value}")
+
+    return '\n'.join(lines) + '\n'
+
+
+def summary():
+    """
+    Per-histogram count and mean in milliseconds (for console reports)
+    Returns:
+        {'name{labels}': (count, mean_ms)}
+    """
+    histograms, _, _ = _collect()
+    result = {}
+    for (name, labels), values in sorted(histograms.items()):
+        count = sum(values[:-1])
+        if count:
+            result[name + _format_labels(labels)] = (count, 1000 * values[-1] / count)
+    return result
+
+
+def register_flask(app):
+    """
+    Add GET /metrics and request timing to a Flask app
+    Request time is measured until the response object is returned
+    (for streamed responses: time to the first byte).
+    """
+    from flask import Response, request, g
+
+    @app.before_request
+    def _start_request_timer():
+        g.metrics_start = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        start = getattr(g, 'metrics_start', None)
+        if start is not None and request.endpoint != 'metrics':
+            endpoint = request.endpoint or 'unknown'
+            observe('fer_http_request_seconds', time.perf_counter() - start, endpoint=endpoint)
+            inc('fer_http_requests_total', endpoint=endpoint, status=str(response.status_code))
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        return Response(render(), mimetype='text/plain; version=0.0.4')
+
+    return app
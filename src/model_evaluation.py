@@ -0,0 +1,182 @@
+"""
+Offline accuracy evaluation of every model variant on the same test sets
+Each variant (Keras .h5, TFLite flatbuffer or the TF.js web model) is run
+over a packed test split (see dataset_cache) in large batches; the
+ensembles are derived from their members' probabilities with the apps'
+weights. Images get the training preprocessing (nearest resize, / 255).
+
+Metrics are plain numpy: confusion matrix, per-class precision, recall
+and F1, expected calibration error and images/s.
+"""
+
+import os
+import time
+import subprocess
+import numpy as np
+
+from dataset_cache import default_cache_dir, pack_split, load_packed
+
+NUM_CLASSES = 7
+
+# name -> (kind, path, input size (None: read from the model), color mode)
+VARIANTS = {
+    'fer_model_best.h5': ('keras', 'models/fer_model_best.h5', 48, 'grayscale'),
+    'mobilenetv3_finetuned.h5': ('keras', 'models/pretrained/mobilenetv3_finetuned.h5', 96, 'rgb'),
+    'final_cross_dataset.h5': ('keras', 'models/pretrained/final_cross_dataset.h5', 96, 'rgb'),
+    'student_distilled.h5': ('keras', 'models/student_distilled.h5', None, 'grayscale'),
+    'fer_model_pruned.h5': ('keras', 'models/fer_model_pruned.h5', 48, 'grayscale'),
+    # Dynamic-range quantized (convert_to_tflite.py / prune_fer_model.py)
+    'fer_model.tflite': ('tflite', 'models/fer_model.tflite', 48, 'grayscale'),
+    'fer_model_pruned.tflite': ('tflite', 'models/fer_model_pruned.tflite', 48, 'grayscale'),
+    # Float exports used by the production server (export_tflite_models.py)
+    'tflite/fer_model_best.tflite': ('tflite', 'models/tflite/fer_model_best.tflite', 48, 'grayscale'),
+    'tflite/mobilenetv3_finetuned.tflite': (
+        'tflite', 'models/tflite/pretrained/mobilenetv3_finetuned.tflite', 96, 'rgb'),
+    'tflite/final_cross_dataset.tflite': (
+        'tflite', 'models/tflite/pretrained/final_cross_dataset.tflite', 96, 'rgb'),
+    'tflite/student_distilled.tflite': ('tflite', 'models/tflite/student_distilled.tflite',
+                                        None, 'grayscale'),
+    # Web app ensemble (96x96 RGB input)
+    'tfjs_ensemble': ('tfjs', 'webapp/model/model.json', 96, 'rgb'),
+}
+
+# Ensembles computed from member probabilities: name -> {member: weight}
+ENSEMBLES = {
+    'CrossDatasetEnsemble': {'fer_model_best.h5': 0.4, 'mobilenetv3_finetuned.h5': 0.6},
+    'ThreeDatasetEnsemble': {'fer_model_best.h5': 0.3, 'final_cross_dataset.h5': 0.7},
+    'CrossDatasetEnsemble (tflite)': {'tflite/fer_model_best.tflite': 0.4,
+                                      'tflite/mobilenetv3_finetuned.tflite': 0.6},
+    'ThreeDatasetEnsemble (tflite)': {'tflite/fer_model_best.tflite': 0.3,
+                                      'tflite/final_cross_dataset.tflite': 0.7},
+}
+
+
+def available_variants():
+    return [name for name, (_, path, _, _) in VARIANTS.items() if os.path.exists(path)]
+
+
+def _tfjs_saved_model(model_json):
+    """Convert the TF.js graph model to a SavedModel once (cached by mtime)"""
+    stamp = int(os.path.getmtime(model_json))
+    output_dir = os.path.join(default_cache_dir(), 'tfjs_saved_model', str(stamp))
+    if not os.path.exists(os.path.join(output_dir, 'saved_model.pb')):
+        subprocess.run(['tensorflowjs_converter', '--input_format=tfjs_graph_model',
+                        '--output_format=tf_saved_model', model_json, output_dir],
+                       check=True)
+    return output_dir
+
+
+def _load_predict(kind, path, threads):
+    """
+    Returns:
+        (predict(batch) -> (N, 7) probabilities, input size)
+    """
+    if kind == 'tflite':
+        from tflite_model import TFLiteModel
+        model = TFLiteModel(path, num_threads=threads)
+        return model.predict_on_batch, model.input_shape[1]
+
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(2)
+
+    if kind == 'keras':
+        model = tf.keras.models.load_model(path)
+        return (lambda batch: np.asarray(model.predict_on_batch(batch))), model.input_shape[1]
+
+    serving = tf.saved_model.load(_tfjs_saved_model(path)).signatures['serving_default']
+
+    def predict(batch):
+        outputs = serving(tf.constant(batch))
+        probs = np.asarray(next(iter(outputs.values())))
+        # Same guard as webapp/app.js: softmax if the output isn't normalized
+        if np.any(np.abs(probs.sum(axis=1) - 1) > 0.01):
+            exp = np.exp(probs - probs.max(axis=1, keepdims=True))
+            probs = exp / exp.sum(axis=1, keepdims=True)
+        return probs
+    return predict, 96
+
+
+def evaluate_variant(name, directory, batch_size=512, threads=1):
+    """
+    Run one variant over a split (meant for a worker process)
+    Returns:
+        Dict with 'probs' (N, 7), 'labels', 'seconds' (inference only)
+        and 'load_seconds'
+    """
+    kind, path, size, color_mode = VARIANTS[name]
+    start = time.perf_counter()
+    predict, model_size = _load_predict(kind, path, threads)
+    load_seconds = time.perf_counter() - start
+    size = size or model_size
+
+    pack_split(directory, (size, size), color_mode)
+    images, labels, _ = load_packed(directory, (size, size), color_mode, check=False)
+
+    probs = np.zeros((len(labels), NUM_CLASSES), dtype=np.float32)
+    predict(images[:1].astype(np.float32) / 255.0)  # warm-up
+    start = time.perf_counter()
+    for offset in range(0, len(labels), batch_size):
+        batch = images[offset:offset + batch_size].astype(np.float32) / 255.0
+        probs[offset:offset + len(batch)] = predict(batch)
+    seconds = time.perf_counter() - start
+    return {'probs': probs, 'labels': np.asarray(labels), 'seconds': seconds,
+            'load_seconds': load_seconds}
+
+
+def confusion_matrix(labels, predictions, num_classes=NUM_CLASSES):
+    """Rows: true class, columns: predicted class"""
+    matrix = np.zeros((num_classes, num_classes), dtype=np.int64)
+    np.add.at(matrix, (labels, predictions), 1)
+    return matrix
+
+
+def per_class_scores(matrix):
+    """Precision, recall and F1 per class from a confusion matrix"""
+    true_positive = np.diag(matrix).astype(np.float64)
+    predicted = matrix.sum(axis=0)
+    actual = matrix.sum(axis=1)
+    precision = np.divide(true_positive, predicted, out=np.zeros_like(true_positive),
+                          where=predicted > 0)
+    recall = np.divide(true_positive, actual, out=np.zeros_like(true_positive),
+                       where=actual > 0)
+    f1 = np.divide(2 * precision * recall, precision + recall,
+                   out=np.zeros_like(true_positive), where=(precision + recall) > 0)
+    return precision, recall, f1
+
+
+def expected_calibration_error(probs, labels, bins=15):
+    """
+    Mean |accuracy - confidence| over equal-width confidence bins,
+    weighted by the fraction of samples in each bin
+    """
+    confidence = probs.max(axis=1)
+    correct = probs.argmax(axis=1) == labels
+    edges = np.linspace(0, 1, bins + 1)
+    indices = np.clip(np.digitize(confidence, edges[1:-1]), 0, bins - 1)
+    error = 0.0
+    for b in range(bins):
+        mask = indices == b
+        if mask.any():
+            error += mask.mean() * abs(correct[mask].mean() - confidence[mask].mean())
+    return float(error)
+
+
+def score(probs, labels, class_names, seconds=None):
+    """All metrics for one variant on one split"""
+    predictions = probs.argmax(axis=1)
+    matrix = confusion_matrix(labels, predictions)
+    precision, recall, f1 = per_class_scores(matrix)
+    result = {
+        'samples': int(len(labels)),
+        'accuracy': float(np.mean(predictions == labels)),
+        'macro_f1': float(f1.mean()),
+        'ece': expected_calibration_error(probs, labels),
+        'nll': float(-np.mean(np.log(probs[np.arange(len(labels)), labels] + 1e-7))),
+        'per_class': {name: {'precision': float(p), 'recall': float(r), 'f1': float(f)}
+                      for name, p, r, f in zip(class_names, precision, recall, f1)},
+        'confusion_matrix': matrix.tolist()
+    }
+    if seconds:
+        result['images_per_sec'] = len(labels) / seconds
+    return result
@@ -0,0 +1,137 @@
+"""
+Structured (channel) pruning and weight clustering for the FER2013 CNN
+Channel pruning removes whole conv filters / dense units, ranked by the
+L1 norm of their weights scaled by the |gamma| of the BatchNormalization
+that follows. The slimmer model is rebuilt with create_fer_model(widths)
+and the surviving weights are copied over, so it is an ordinary dense
+model: smaller .h5/.tflite files and fewer FLOPs on any CPU, no sparse
+kernels needed.
+
+Weight clustering (tensorflow_model_optimization, optional) then shares
+a few centroid values per layer, which makes the exported files compress
+much better.
+"""
+
+import numpy as np
+import tensorflow as tf
+
+from fer_cnn import create_fer_model
+
+
+def prunable_layers(model):
+    """Conv2D and hidden Dense layers (the output layer is never pruned)"""
+    layers = [layer for layer in model.layers
+              if isinstance(layer, (tf.keras.layers.Conv2D, tf.keras.layers.Dense))]
+    return layers[:-1]
+
+
+def model_widths(model):
+    return tuple(layer.get_weights()[0].shape[-1] for layer in prunable_layers(model))
+
+
+def unit_importance(model):
+    """
+    Importance score of every output unit of the prunable layers
+    Returns:
+        List of 1-D arrays, one per prunable layer
+    """
+    prunable = prunable_layers(model)
+    scores = []
+    for index, layer in enumerate(model.layers):
+        if not any(layer is candidate for candidate in prunable):
+            continue
+        kernel = layer.get_weights()[0]
+        score = np.abs(kernel).reshape(-1, kernel.shape[-1]).sum(axis=0)
+        following = model.layers[index + 1] if index + 1 < len(model.layers) else None
+        if isinstance(following, tf.keras.layers.BatchNormalization):
+            score = score * np.abs(following.get_weights()[0])
+        scores.append(score)
+    return scores
+
+
+def sparsity_schedule(target, steps, power=3):
+    """
+    Channel sparsity after each pruning step (polynomial decay,
+    as in tfmot's PolynomialDecay): large cuts first, small ones last
+    """
+    return [target * (1 - (1 - step / steps) ** power) for step in range(1, steps + 1)]
+
+
+def pruned_widths(widths, sparsity, multiple=8):
+    """Widths after removing a fraction of units, rounded to SIMD-friendly multiples"""
+    result = []
+    for width in widths:
+        kept = int(round(width * (1 - sparsity) / multiple)) * multiple
+        result.append(min(width, max(multiple, kept)))
+    return tuple(result)
+
+
+def prune_channels(model, widths, learning_rate=1e-4):
+    """
+    Rebuild the model with fewer units per layer, keeping the most important ones
+    Args:
+        model: FER2013 CNN (create_fer_model structure)
+        widths: Target widths (each <= the current width)
+        learning_rate: For the returned, compiled model
+    Returns:
+        New compiled model with the surviving weights copied in
+    """
+    slim = create_fer_model(widths, learning_rate=learning_rate)
+    scores = iter(unit_importance(model))
+    targets = iter(widths)
+    kept_inputs = None
+
+    for old, new in zip(model.layers, slim.layers):
+        weights = old.get_weights()
+        if isinstance(old, tf.keras.layers.Flatten):
+            # Flatten orders features as (row, col, channel)
+            height, width, channels = old.input.shape[1:]
+            positions = np.arange(height * width)[:, None] * channels
+            kept_inputs = (positions + kept_inputs[None, :]).ravel()
+        elif isinstance(old, tf.keras.layers.BatchNormalization):
+            new.set_weights([w[kept_inputs] for w in weights])
+        elif isinstance(old, (tf.keras.layers.Conv2D, tf.keras.layers.Dense)):
+            kernel, bias = weights
+            if kept_inputs is not None:
+                kernel = kernel[..., kept_inputs, :]
+            if old is model.layers[-1]:
+                new.set_weights([kernel, bias])
+                continue
+            keep = np.sort(np.argsort(next(scores))[::-1][:next(targets)])
+            new.set_weights([kernel[..., keep], bias[keep]])
+            kept_inputs = keep
+    return slim
+
+
+def cluster_model(model, number_of_clusters=16, learning_rate=1e-5):
+    """
+    Wrap the model for clustering-aware fine-tuning
+    Returns:
+        Compiled clustered model, or None if tensorflow_model_optimization
+        is not installed (pip install tensorflow-model-optimization)
+    """
+    try:
+        import tensorflow_model_optimization as tfmot
+    except ImportError:
+        return None
+
+    clustering = tfmot.clustering.keras
+    clustered = clustering.cluster_weights(
+        model,
+        number_of_clusters=number_of_clusters,
+        cluster_centroids_init=clustering.CentroidInitialization.KMEANS_PLUS_PLUS
+    )
+    clustered.compile(
+        optimizer=tf.keras.optimizers.Adam(learning_rate=learning_rate),
+        loss='categorical_crossentropy',
+        metrics=['accuracy']
+    )
+    return clustered
+
+
+def strip_clustering(model):
+    """Remove the clustering wrappers, leaving plain layers with shared values"""
+    import tensorflow_model_optimization as tfmot
+    stripped = tfmot.clustering.keras.strip_clustering(model)
+    stripped.compile(optimizer='adam', loss='categorical_crossentropy', metrics=['accuracy'])
+    return stripped
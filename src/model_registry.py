@@ -0,0 +1,309 @@
+"""
+Model registry: named models, file metadata and hot-swap
+Recognizers ask for a model by name instead of a hardcoded path:
+
+    self.fer_model = registry.get('fer2013', backend)
+
+and get a SwappableModel. It forwards predict_on_batch() to the model
+loaded now; swap() loads and warms up a new version, then replaces the
+reference in one assignment. Requests already running finish on the
+version they started with and new ones use the new one, so no request
+is dropped or blocked.
+
+watch() polls the model files: when a file has been replaced (e.g.
+export_tflite_models.py after retraining) and stayed unchanged for one
+poll, the model is swapped in place. A version whose input shape differs
+is rejected, because the recognizers' preprocessing is fixed.
+
+TFLite flatbuffers are opened by path, which the interpreter
+memory-maps: every process serving a version shares its pages, and a file
+replaced with os.replace() stays mapped until the last interpreter drops it.
+
+Metadata (describe(), discover()) includes format, size, SHA-256, input
+shape, colour mode and class order. The class order comes from an
+optional <model>.meta.json ({"classes": [...]}), else the FER2013 order.
+"""
+
+import os
+import glob
+import json
+import time
+import hashlib
+import threading
+import numpy as np
+
+from tflite_model import resolve_model_path, open_model
+import metrics
+
+EMOTIONS = ['Angry', 'Disgust', 'Fear', 'Happy', 'Neutral', 'Sad', 'Surprise']
+
+# Name -> Keras model (override with FER_MODEL_<NAME>, e.g. FER_MODEL_FER2013)
+MODELS = {
+    'fer2013': 'models/fer_model_best.h5',
+    'mobilenet': 'models/pretrained/mobilenetv3_finetuned.h5',
+    'three_dataset': 'models/pretrained/final_cross_dataset.h5',
+    'student': 'models/student_distilled.h5',
+}
+
+POLL_INTERVAL = float(os.getenv('FER_MODEL_POLL_INTERVAL', '30'))
+
+_hash_cache = {}
+
+
+def model_path(name):
+    """Configured file for a registered name"""
+    return os.getenv(f'FER_MODEL_{name.upper()}', MODELS[name])
+
+
+def _stat(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def file_sha256(path):
+    """SHA-256 of a file (cached while its mtime and size are unchanged)"""
+    key = (path, _stat(path))
+    if key not in _hash_cache:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        _hash_cache[key] = digest.hexdigest()
+    return _hash_cache[key]
+
+
+def _h5_input_shape(path):
+    """Input shape from the Keras config stored in the .h5 (needs h5py, not TF)"""
+    try:
+        import h5py
+        with h5py.File(path, 'r') as f:
+            config = json.loads(f.attrs['model_config'])
+    except Exception:
+        return None
+    for layer in config['config']['layers']:
+        layer_config = layer.get('config', {})
+        shape = layer_config.get('batch_input_shape') or layer_config.get('batch_shape')
+        if shape:
+            return tuple(shape)
+    return None
+
+
+def _input_shape(path, model=None):
+    if model is not None:
+        return tuple(model.input_shape)
+    if path.endswith('.tflite'):
+        try:
+            return tuple(open_model(path).input_shape)
+        except Exception:
+            return None
+    return _h5_input_shape(path)
+
+
+def _classes(path):
+    meta_path = os.path.splitext(path)[0] + '.meta.json'
+    if os.path.exists(meta_path):
+        with open(meta_path) as f:
+            return json.load(f).get('classes', EMOTIONS)
+    return EMOTIONS
+
+
+def describe(path, model=None):
+    """Metadata of one model file"""
+    shape = _input_shape(path, model)
+    channels = shape[-1] if shape else None
+    return {
+        'path': path,
+        'format': 'tflite' if path.endswith('.tflite') else 'keras',
+        'size_mb': round(os.path.getsize(path) / (1024 * 1024), 2),
+        'modified': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(os.path.getmtime(path))),
+        'sha256': file_sha256(path),
+        'input_shape': list(shape) if shape else None,
+        'color_mode': {1: 'grayscale', 3: 'rgb'}.get(channels),
+        'classes': _classes(path)
+    }
+
+
+def discover(model_dir='models'):
+    """Metadata of every .h5 and .tflite file under model_dir"""
+    paths = sorted(glob.glob(os.path.join(model_dir, '**', '*.h5'), recursive=True) +
+                   glob.glob(os.path.join(model_dir, '**', '*.tflite'), recursive=True))
+    return [describe(path) for path in paths]
+
+
+class SwappableModel:
+    """Model reference that can be replaced under live traffic"""
+
+    def __init__(self, name, source, backend=None):
+        """
+        Args:
+            name: Registry name (metrics label)
+            source: .h5 (resolved with the backend) or .tflite path
+            backend: See tflite_model.resolve_model_path
+        """
+        self.name = name
+        self.source = source
+        self.backend = backend
+        self.path = resolve_model_path(source, backend)
+        self.stat = _stat(self.path)
+        self.loaded_at = time.time()
+        self.swaps = 0
+        self.rejected = None  # (path, stat) of a version that failed to load
+        self._model = open_model(self.path)
+        self._swap_lock = threading.Lock()
+
+    def predict_on_batch(self, batch):
+        # One read of the reference: a concurrent swap can't mix versions
+        return self._model.predict_on_batch(batch)
+
+    def predict(self, batch, verbose=0):
+        return self._model.predict_on_batch(batch)
+
+    @property
+    def input_shape(self):
+        return self._model.input_shape
+
+    def changed(self):
+        """The file to load now differs from the loaded one"""
+        path = resolve_model_path(self.source, self.backend)
+        current = (path, _stat(path))
+        return current != (self.path, self.stat) and current != self.rejected
+
+    def swap(self, source=None):
+        """
+        Load, check and warm up a new version, then switch to it
+        Args:
+            source: New .h5/.tflite path (default: reload the current source)
+        Returns:
+            Path of the model now in use
+        """
+        with self._swap_lock:
+            source = source or self.source
+            path = resolve_model_path(source, self.backend)
+            stat = _stat(path)
+            try:
+                model = open_model(path)
+                shape = tuple(model.input_shape)
+                if shape[1:] != tuple(self.input_shape)[1:]:
+                    raise ValueError(f"input shape {shape} does not match "
+                                     f"{tuple(self.input_shape)}")
+                # Warm up before any request can reach the new version
+                model.predict_on_batch(np.zeros((1,) + shape[1:], dtype=np.float32))
+            except Exception:
+                self.rejected = (path, stat)
+                metrics.inc('fer_model_swaps_total', model=self.name, result='failed')
+                raise
+            self._model = model
+            self.source, self.path, self.stat = source, path, stat
+            self.loaded_at = time.time()
+            self.swaps += 1
+            metrics.inc('fer_model_swaps_total', model=self.name, result='ok')
+            print(f"✓ Model {self.name} swapped to {path}")
+            return path
+
+    def info(self):
+        return dict(describe(self.path, self._model) if os.path.exists(self.path) else {},
+                    name=self.name, source=self.source, swaps=self.swaps,
+                    loaded_at=time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.loaded_at)))
+
+
+class ModelRegistry:
+    """One SwappableModel per (name, backend) in this process"""
+
+    def __init__(self):
+        self.models = {}
+        self._lock = threading.Lock()
+        self._watcher_pid = None
+
+    def get(self, name, backend=None):
+        """
+        Args:
+            name: Registered name (see MODELS) or a model file path
+            backend: See tflite_model.resolve_model_path
+        """
+        with self._lock:
+            key = (name, backend)
+            if key not in self.models:
+                source = model_path(name) if name in MODELS else name
+                self.models[key] = SwappableModel(name, source, backend)
+            return self.models[key]
+
+    def check(self, pending):
+        """One poll: swap models whose file changed and has settled"""
+        for key, model in list(self.models.items()):
+            if not model.changed():
+                pending.pop(key, None)
+                continue
+            path = resolve_model_path(model.source, model.backend)
+            stat = _stat(path)
+            # Wait until the file stops changing (a checkpoint may be half written)
+            if stat is None or pending.get(key) != (path, stat):
+                pending[key] = (path, stat)
+                continue
+            pending.pop(key, None)
+            try:
+                model.swap()
+            except Exception as e:
+                # Keep serving the current version; retried when the file changes again
+                print(f"✗ Model {model.name}: keeping the current version ({e})")
+
+    def watch(self, interval=POLL_INTERVAL):
+        """Poll the model files in a background thread (once per process)"""
+        with self._lock:
+            if self._watcher_pid == os.getpid():
+                return
+            self._watcher_pid = os.getpid()
+
+        def loop():
+            pending = {}
+            while True:
+                time.sleep(interval)
+                self.check(pending)
+
+        threading.Thread(target=loop, name='model-registry', daemon=True).start()
+
+    def status(self):
+        return [model.info() for model in self.models.values()]
+
+
+registry = ModelRegistry()
+
+
+def register_flask(app):
+    """
+    Add the model admin endpoints to a Flask app
+        GET  /admin/models                      loaded versions and model files
+        POST /admin/models/<name>?path=<file>   hot-swap (default: reload the file)
+    Under gunicorn a POST swaps the worker that answers; replacing the file
+    on disk swaps every worker (watch()).
+    """
+    from flask import request, jsonify
+    from admin_auth import authorized
+
+    @app.route('/admin/models', methods=['GET'])
+    def admin_models():
+        if not authorized(request):
+            return jsonify({'error': 'Forbidden'}), 403
+        return jsonify({'loaded': registry.status(), 'available': discover()})
+
+    @app.route('/admin/models/<name>', methods=['POST'])
+    def admin_swap_model(name):
+        if not authorized(request):
+            return jsonify({'error': 'Forbidden'}), 403
+        targets = [model for (model_name, _), model in registry.models.items()
+                   if model_name == name]
+        if not targets:
+            return jsonify({'error': f'Model {name} is not loaded'}), 404
+        path = request.args.get('path')
+        if path and not os.path.exists(path):
+            return jsonify({'error': f'{path} not found'}), 400
+        try:
+            for model in targets:
+                model.swap(path)
+        except Exception as e:
+            return jsonify({'error': str(e)}), 409
+        return jsonify([model.info() for model in targets])
+
+    return app
@@ -0,0 +1,100 @@
+"""
+Background model warm-up and readiness reporting
+Models are loaded lazily (see tflite_model.load_model), so an app can
+start serving at once. The apps register their recognizers here, and
+start() loads them and runs one dummy inference per model on a
+background thread. Until that has finished, GET /health answers 503.
+
+    model_warmup.register('emotion_recognizer', emotion_recognizer)
+    model_warmup.register_flask(app)
+    model_warmup.start()        # per process, after any fork
+
+Under gunicorn, start() runs in each worker (post_worker_init), never in
+the pre-fork master.
+"""
+
+import os
+import time
+import threading
+import numpy as np
+
+_targets = []  # (name, recognizer)
+_lock = threading.Lock()
+_started_pid = None
+
+state = {'status': 'starting', 'seconds': None, 'error': None, 'models': {}}
+
+
+def register(name, recognizer):
+    """Warm up a recognizer's models (anything with predict_on_batch) on start()"""
+    _targets.append((name, recognizer))
+
+
+def _models(recognizer):
+    # CachedRecognizer wraps the real recognizer
+    recognizer = getattr(recognizer, 'recognizer', recognizer)
+    return {attr: value for attr, value in vars(recognizer).items()
+            if hasattr(value, 'predict_on_batch')}
+
+
+def load_models(recognizer):
+    """
+    Load a recognizer's models by running one dummy batch through each
+    Returns:
+        {attribute: seconds}
+    """
+    seconds = {}
+    for attr, model in _models(recognizer).items():
+        start = time.perf_counter()
+        model.predict_on_batch(np.zeros((1,) + tuple(model.input_shape[1:]), dtype=np.float32))
+        seconds[attr] = time.perf_counter() - start
+    return seconds
+
+
+def warm_up():
+    """Load every registered model and run one dummy batch through it"""
+    start = time.perf_counter()
+    try:
+        for name, recognizer in _targets:
+            for attr, seconds in load_models(recognizer).items():
+                state['models'][f'{name}.{attr}'] = round(seconds, 3)
+            # Preprocessing buffers and the rest of the path
+            if hasattr(recognizer, 'predict_emotions'):
+                recognizer.predict_emotions([np.zeros((96, 96, 3), dtype=np.uint8)],
+                                            use_smoothing=False)
+    except Exception as e:
+        state.update(status='failed', error=str(e))
+        print(f"✗ Model warm-up failed: {e}")
+        return
+    state.update(status='ready', seconds=round(time.perf_counter() - start, 3))
+    print(f"✓ Models warmed up in {state['seconds']:.1f}s")
+
+
+def start():
+    """Start warming up in the background (once per process)"""
+    global _started_pid
+    with _lock:
+        if _started_pid == os.getpid():
+            return
+        _started_pid = os.getpid()
+    state.update(status='starting', seconds=None, error=None, models={})
+    threading.Thread(target=warm_up, name='model-warmup', daemon=True).start()
+
+
+def ready():
+    return state['status'] == 'ready'
+
+
+def register_flask(app):
+    """
+    Add GET /health: 200 once the models are warm, 503 while starting or
+    after a failed warm-up
+    """
+    from flask import jsonify
+
+    @app.route('/health')
+    def health():
+        body = dict(state, pid=os.getpid())
+        return jsonify(body), 200 if ready() else 503
+
+    return app
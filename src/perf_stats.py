@@ -0,0 +1,63 @@
+"""
+Small helpers for measuring latency and memory
+Used by the benchmark scripts: per-stage timers with percentile
+summaries and the process's peak resident memory.
+"""
+
+import sys
+import time
+from contextlib import contextmanager
+import numpy as np
+
+try:
+    import resource
+except ImportError:
+    # Windows
+    resource = None
+
+
+def latency_summary(seconds):
+    """
+    Args:
+        seconds: Sequence of durations in seconds
+    Returns:
+        Dict with count, mean and p50/p95/p99 in milliseconds
+    """
+    if len(seconds) == 0:
+        return {'count': 0}
+    ms = 1000 * np.asarray(seconds, dtype=np.float64)
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {'count': int(len(ms)), 'mean_ms': float(ms.mean()),
+            'p50_ms': float(p50), 'p95_ms': float(p95), 'p99_ms': float(p99)}
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (None if unavailable)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    if sys.platform == 'darwin':
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+class StageTimer:
+    """Collects durations per named stage"""
+
+    def __init__(self):
+        self.samples = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name, seconds):
+        self.samples.setdefault(name, []).append(seconds)
+
+    def summary(self):
+        return {name: latency_summary(samples) for name, samples in self.samples.items()}
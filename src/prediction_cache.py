@@ -0,0 +1,167 @@
+"""
+Result cache for near-identical face crops
+In a static scene consecutive crops of the same face barely change, so
+their predictions can be reused. Crops are keyed by a 64-bit perceptual
+hash (DCT of the 48x48 grayscale face, low frequencies vs. their median);
+a lookup matches any entry within `max_distance` differing bits that is
+younger than `ttl` seconds.
+
+    emotion_recognizer = cached_recognizer(ThreeDatasetEnsemble())
+
+The wrapper caches the recognizer's unsmoothed results and applies the
+usual per-track smoothing itself, so smoothing behaves as before.
+"""
+
+import os
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+import cv2
+import metrics
+
+HASH_INPUT = 48  # same size as the FER2013 CNN input
+DCT_SIZE = 32
+
+
+def face_hash(face_img):
+    """64-bit perceptual hash of a BGR or grayscale face crop"""
+    gray = cv2.cvtColor(face_img, cv2.COLOR_BGR2GRAY) if face_img.ndim == 3 else face_img
+    small = cv2.resize(gray, (HASH_INPUT, HASH_INPUT), interpolation=cv2.INTER_AREA)
+    small = cv2.resize(small, (DCT_SIZE, DCT_SIZE), interpolation=cv2.INTER_AREA)
+    low = cv2.dct(small.astype(np.float32))[:8, :8].flatten()
+    bits = low > np.median(low[1:])
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+class PredictionCache:
+    """LRU of face hash -> (time, result, single_model)"""
+
+    def __init__(self, max_entries=None, ttl=None, max_distance=None):
+        """
+        Args:
+            max_entries: Cache size ($FER_CACHE_SIZE, 256)
+            ttl: Seconds an entry may be reused ($FER_CACHE_TTL, 1.0)
+            max_distance: Max differing hash bits for a match ($FER_CACHE_DISTANCE, 4)
+        """
+        self.max_entries = max_entries or int(os.getenv('FER_CACHE_SIZE', '256'))
+        self.ttl = ttl if ttl is not None else float(os.getenv('FER_CACHE_TTL', '1.0'))
+        self.max_distance = (max_distance if max_distance is not None
+                             else int(os.getenv('FER_CACHE_DISTANCE', '4')))
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        # Moving average of inference time per face, the estimate for a hit
+        self.face_seconds = None
+
+    def get(self, key, single_model=False):
+        """Cached result for a hash (a full-ensemble entry also serves single_model)"""
+        now = time.time()
+        with self.lock:
+            best, best_distance = None, self.max_distance + 1
+            for other, (created, result, single) in self.entries.items():
+                if now - created > self.ttl or (single and not single_model):
+                    continue
+                distance = hamming(key, other)
+                if distance < best_distance:
+                    best, best_distance = other, distance
+                    if distance == 0:
+                        break
+            if best is None:
+                return None
+            self.entries.move_to_end(best)
+            return self.entries[best][1]
+
+    def put(self, key, result, single_model=False):
+        with self.lock:
+            self.entries[key] = (time.time(), result, single_model)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def record(self, hits, misses, miss_seconds):
+        """Update hit/miss counts and the latency-saved estimate"""
+        with self.lock:
+            if misses:
+                per_face = miss_seconds / misses
+                self.face_seconds = (per_face if self.face_seconds is None
+                                     else 0.9 * self.face_seconds + 0.1 * per_face)
+            saved = hits * (self.face_seconds or 0.0)
+            self.hits += hits
+            self.misses += misses
+            self.saved_seconds += saved
+        metrics.inc('fer_prediction_cache_total', hits, result='hit')
+        metrics.inc('fer_prediction_cache_total', misses, result='miss')
+        metrics.inc('fer_prediction_cache_saved_seconds_total', saved)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'entries': len(self.entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else None,
+            'saved_seconds': self.saved_seconds
+        }
+
+
+class CachedRecognizer:
+    """Wraps an ensemble or DistilledStudent; other attributes pass through"""
+
+    def __init__(self, recognizer, cache=None):
+        self.recognizer = recognizer
+        self.cache = cache or PredictionCache()
+
+    def __getattr__(self, name):
+        return getattr(self.recognizer, name)
+
+    def predict_emotion(self, face_img, use_smoothing=True, single_model=False):
+        return self.predict_emotions([face_img], use_smoothing=use_smoothing,
+                                     single_model=single_model)[0]
+
+    def predict_emotions(self, face_imgs, track_ids=None, use_smoothing=True,
+                         single_model=False):
+        """Same results as the wrapped recognizer's predict_emotions()"""
+        if len(face_imgs) == 0:
+            return []
+
+        keys = [face_hash(f) for f in face_imgs]
+        results = [self.cache.get(key, single_model) for key in keys]
+        missing = [i for i, result in enumerate(results) if result is None]
+
+        start = time.perf_counter()
+        if missing:
+            fresh = self.recognizer.predict_emotions([face_imgs[i] for i in missing],
+                                                     use_smoothing=False,
+                                                     single_model=single_model)
+            for i, result in zip(missing, fresh):
+                results[i] = result
+                self.cache.put(keys[i], result, single_model)
+        self.cache.record(len(face_imgs) - len(missing), len(missing),
+                          time.perf_counter() - start)
+
+        if not use_smoothing:
+            return results
+        smoothed = []
+        for i, (emotion, confidence, probs, individual, agreement) in enumerate(results):
+            # Same temporal smoothing as the recognizers
+            history = self.recognizer._history_for(None if track_ids is None else track_ids[i])
+            history.append(emotion)
+            if len(history) >= 5:
+                emotion = max(set(history), key=list(history).count)
+                confidence = list(history).count(emotion) / len(history)
+            smoothed.append((emotion, confidence, probs, individual, agreement))
+        return smoothed
+
+
+def cached_recognizer(recognizer):
+    """Wrap with a PredictionCache unless FER_PREDICTION_CACHE=0"""
+    if os.getenv('FER_PREDICTION_CACHE', '1') != '1':
+        return recognizer
+    return CachedRecognizer(recognizer)
@@ -0,0 +1,218 @@
+"""
+On-demand sampling profiler for the running servers
+Samples the Python stack of every thread (sys._current_frames) at a fixed
+interval for N seconds and writes the counts in the collapsed-stack format
+read by flamegraph.pl, speedscope and inferno:
+
+    thread;outer_function (file.py:12);inner_function (file.py:40) 17
+
+If TensorFlow is already loaded in the process (Keras backend) the same
+window is also recorded with tf.profiler, giving op-level timings that
+TensorBoard's profile plugin can show. The TFLite interpreter has no
+Python-level op profiler, so with FER_BACKEND=tflite only the stack
+samples are written.
+
+Start a profile with POST /admin/profile (see register_flask) or by
+sending SIGUSR2 to the process (see install_signal_handler).
+"""
+
+import os
+import sys
+import time
+import signal
+import threading
+from collections import Counter
+from datetime import datetime
+from admin_auth import authorized
+
+PROFILE_DIR = os.getenv('FER_PROFILE_DIR', os.path.join(os.getenv('FER_JOBS_DIR', 'jobs'), 'profiles'))
+DEFAULT_SECONDS = float(os.getenv('FER_PROFILE_SECONDS', '30'))
+DEFAULT_INTERVAL = float(os.getenv('FER_PROFILE_INTERVAL', '0.01'))
+MAX_SECONDS = 600
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def sample_stacks(skip_thread=None):
+    """
+    One sample of every thread's stack
+    Returns:
+        List of collapsed stacks (root first, thread name as the first frame)
+    """
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    stacks = []
+    for ident, frame in sys._current_frames().items():
+        if ident == skip_thread:
+            continue
+        labels = []
+        while frame is not None:
+            labels.append(_frame_label(frame))
+            frame = frame.f_back
+        labels.append(names.get(ident, f'thread-{ident}').replace(';', ':').replace(' ', '_'))
+        stacks.append(';'.join(reversed(labels)))
+    return stacks
+
+
+class SamplingProfiler:
+    """Runs at most one timed profile at a time in a background thread"""
+
+    def __init__(self, output_dir=PROFILE_DIR):
+        self.output_dir = output_dir
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = None
+        self._current = None
+        self.last = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, seconds=DEFAULT_SECONDS, interval=DEFAULT_INTERVAL):
+        """
+        Args:
+            seconds: Profile length (stopped early by stop())
+            interval: Seconds between stack samples
+        Returns:
+            Status dict of the new profile
+        """
+        seconds = min(max(float(seconds), 0.1), MAX_SECONDS)
+        interval = max(float(interval), 0.001)
+        with self._lock:
+            if self.running:
+                raise RuntimeError('A profile is already running')
+            os.makedirs(self.output_dir, exist_ok=True)
+            prefix = os.path.join(self.output_dir,
+                                  f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{os.getpid()}")
+            self._current = {
+                'pid': os.getpid(),
+                'seconds': seconds,
+                'interval': interval,
+                'started': time.time(),
+                'stacks_path': prefix + '.collapsed',
+                'tf_trace_dir': self._start_tf_trace(prefix + '-tf')
+            }
+            self._stop = threading.Event()
+            self._thread = threading.Thread(target=self._run, args=(self._current, self._stop),
+                                            name='sampling-profiler', daemon=True)
+            self._thread.start()
+            return dict(self._current, running=True)
+
+    def stop(self):
+        """Stop a running profile early and wait for its files"""
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return self.last
+        self._stop.set()
+        thread.join()
+        return self.last
+
+    def status(self):
+        if self.running:
+            return dict(self._current, running=True)
+        return dict(self.last or {}, running=False)
+
+    def _run(self, profile, stop):
+        counts = Counter()
+        me = threading.get_ident()
+        deadline = time.perf_counter() + profile['seconds']
+        samples = 0
+        overhead = 0.0
+        while time.perf_counter() < deadline and not stop.wait(profile['interval']):
+            start = time.perf_counter()
+            counts.update(sample_stacks(skip_thread=me))
+            overhead += time.perf_counter() - start
+            samples += 1
+
+        with open(profile['stacks_path'], 'w') as f:
+            for stack, count in counts.most_common():
+                f.write(f"{stack} {count}\n")
+        self._stop_tf_trace(profile)
+        profile.update({
+            'samples': samples,
+            'duration': time.time() - profile['started'],
+            'sampling_ms': 1000 * overhead / max(samples, 1)
+        })
+        self.last = profile
+        print(f"Profile written to {profile['stacks_path']} ({samples} samples)")
+
+    @staticmethod
+    def _start_tf_trace(logdir):
+        # Never import TensorFlow here: under gunicorn the TFLite workers must not load it
+        tf = sys.modules.get('tensorflow')
+        if tf is None:
+            return None
+        try:
+            tf.profiler.experimental.start(logdir)
+        except Exception as e:
+            print(f"TF profiler not started: {e}")
+            return None
+        return logdir
+
+    @staticmethod
+    def _stop_tf_trace(profile):
+        if profile['tf_trace_dir'] is None:
+            return
+        try:
+            sys.modules['tensorflow'].profiler.experimental.stop()
+        except Exception as e:
+            print(f"TF profiler stop failed: {e}")
+            profile['tf_trace_dir'] = None
+
+
+profiler = SamplingProfiler()
+
+
+def install_signal_handler(signum=getattr(signal, 'SIGUSR2', None)):
+    """
+    Toggle a profile of this process on a signal (default SIGUSR2):
+    starts a FER_PROFILE_SECONDS profile, or stops the running one
+    Must be called from the main thread.
+    """
+    if signum is None:
+        return
+
+    def toggle():
+        if profiler.running:
+            profiler.stop()
+            return
+        try:
+            profiler.start()
+        except (RuntimeError, OSError) as e:
+            print(f"Profile not started: {e}")
+
+    # Off the interrupted thread: it may hold the profiler's lock
+    signal.signal(signum, lambda *_: threading.Thread(target=toggle, daemon=True).start())
+
+
+def register_flask(app):
+    """
+    Add the profiler admin endpoints to a Flask app
+        POST   /admin/profile?seconds=30&interval=0.01   start
+        GET    /admin/profile                            status / last result
+        DELETE /admin/profile                            stop early
+    Under gunicorn these profile the worker that answers the request.
+    """
+    from flask import request, jsonify
+
+    @app.route('/admin/profile', methods=['GET', 'POST', 'DELETE'])
+    def admin_profile():
+        if not authorized(request):
+            return jsonify({'error': 'Forbidden'}), 403
+        if request.method == 'POST':
+            try:
+                status = profiler.start(request.args.get('seconds', DEFAULT_SECONDS),
+                                        request.args.get('interval', DEFAULT_INTERVAL))
+            except ValueError:
+                return jsonify({'error': 'Invalid seconds or interval'}), 400
+            except RuntimeError as e:
+                return jsonify({'error': str(e)}), 409
+            return jsonify(status), 202
+        if request.method == 'DELETE':
+            profiler.stop()
+        return jsonify(profiler.status())
+
+    return app
@@ -0,0 +1,165 @@
+"""
+TensorFlow Lite backend for the emotion models
+The flatbuffer is memory-mapped by the interpreter, so every process
+serving the same .tflite file shares its weight pages through the OS
+page cache. Interpreters are created lazily per process and per thread,
+which keeps the wrapper safe to build before a pre-forking server forks.
+
+load_model() never imports TensorFlow itself: Keras models are loaded on
+first use, and with the default 'auto' backend a fresh .tflite export is
+preferred over its .h5 (much faster to open than building the Keras graph).
+"""
+
+import os
+import threading
+import numpy as np
+
+
+def tflite_path_for(h5_path):
+    """models/pretrained/x.h5 -> models/tflite/pretrained/x.tflite"""
+    rel = os.path.relpath(os.path.splitext(h5_path)[0] + '.tflite', 'models')
+    return os.path.join('models', 'tflite', rel)
+
+
+def tflite_is_fresh(h5_path):
+    """True if the .tflite export exists and is not older than the .h5"""
+    tflite_path = tflite_path_for(h5_path)
+    return (os.path.exists(tflite_path) and
+            (not os.path.exists(h5_path) or
+             os.path.getmtime(tflite_path) >= os.path.getmtime(h5_path)))
+
+
+def _interpreter_class():
+    try:
+        # Lightweight runtime (Raspberry Pi)
+        from tflite_runtime.interpreter import Interpreter
+    except ImportError:
+        import tensorflow as tf
+        Interpreter = tf.lite.Interpreter
+    return Interpreter
+
+
+class TFLiteModel:
+    """Keras-like predict_on_batch()/predict() over a .tflite file"""
+
+    def __init__(self, model_path, num_threads=None):
+        """
+        Args:
+            model_path: Path to a float .tflite model
+            num_threads: Interpreter threads ($FER_TFLITE_THREADS, default 1:
+                         parallelism comes from server workers/threads)
+        """
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(
+                f"{model_path} not found. Run: python export_tflite_models.py")
+        if num_threads is None:
+            num_threads = int(os.getenv('FER_TFLITE_THREADS', '1'))
+
+        self.model_path = model_path
+        self.num_threads = num_threads
+        self._local = threading.local()
+
+    def _interpreter(self):
+        local = self._local
+        # A forked child must not reuse its parent's interpreter
+        if getattr(local, 'pid', None) != os.getpid():
+            Interpreter = _interpreter_class()
+            interpreter = Interpreter(model_path=self.model_path,
+                                      num_threads=self.num_threads)
+            interpreter.allocate_tensors()
+            local.interpreter = interpreter
+            local.input = interpreter.get_input_details()[0]
+            local.output = interpreter.get_output_details()[0]
+            local.batch = local.input['shape'][0]
+            local.pid = os.getpid()
+        return local
+
+    @property
+    def input_shape(self):
+        shape = self._interpreter().input['shape']
+        return (None,) + tuple(int(d) for d in shape[1:])
+
+    def predict_on_batch(self, batch):
+        """Run one batch; returns a (N, classes) float32 array"""
+        local = self._interpreter()
+        interpreter = local.interpreter
+        batch = np.asarray(batch, dtype=local.input['dtype'])
+
+        if batch.shape[0] != local.batch:
+            interpreter.resize_tensor_input(local.input['index'], batch.shape)
+            interpreter.allocate_tensors()
+            local.input = interpreter.get_input_details()[0]
+            local.output = interpreter.get_output_details()[0]
+            local.batch = batch.shape[0]
+
+        interpreter.set_tensor(local.input['index'], batch)
+        interpreter.invoke()
+        # Copy: the output buffer is reused by the next invoke()
+        return interpreter.get_tensor(local.output['index']).copy()
+
+    def predict(self, batch, verbose=0):
+        return self.predict_on_batch(batch)
+
+
+class KerasModel:
+    """Keras model loaded (and TensorFlow imported) on first use"""
+
+    def __init__(self, model_path):
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"{model_path} not found")
+        self.model_path = model_path
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    import tensorflow as tf
+                    self._model = tf.keras.models.load_model(self.model_path)
+        return self._model
+
+    def predict_on_batch(self, batch):
+        return self.model.predict_on_batch(batch)
+
+    def __getattr__(self, name):
+        # input_shape, predict, ... of the loaded model
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.model, name)
+
+
+def resolve_model_path(path, backend=None):
+    """
+    File a model is loaded from
+    Args:
+        path: Keras .h5 (or a .tflite file, used as is)
+        backend: 'auto' (the .tflite export when up to date, else Keras),
+                 'keras' or 'tflite' (default: $FER_BACKEND or 'auto')
+    """
+    if backend is None:
+        backend = os.getenv('FER_BACKEND', 'auto')
+    if path.endswith('.tflite'):
+        return path
+    if backend == 'tflite' or (backend == 'auto' and tflite_is_fresh(path)):
+        return tflite_path_for(path)
+    return path
+
+
+def open_model(path):
+    """TFLiteModel for a .tflite file, otherwise a lazily loaded KerasModel"""
+    if path.endswith('.tflite'):
+        return TFLiteModel(path)
+    return KerasModel(path)
+
+
+def load_model(h5_path, backend=None):
+    """
+    Load a model with the configured backend (lazily: nothing is read or
+    imported until the first prediction)
+    Args:
+        h5_path: Path of the Keras model
+        backend: See resolve_model_path
+    """
+    return open_model(resolve_model_path(h5_path, backend))
@@ -0,0 +1,118 @@
+"""
+Sharded TFRecord storage for the image datasets
+Each split becomes a few large record files holding the original encoded
+images and labels, so an epoch reads a handful of files sequentially
+instead of opening every JPEG. Shards are balanced: images are shuffled
+once and dealt round-robin, so each shard has the same size and class mix.
+
+Layout (in $FER_TFRECORD_DIR, default data/tfrecord):
+    <key>-00000-of-00008.tfrecord[.gz]
+    <key>.json   manifest (classes, samples, shard files, compression)
+"""
+
+import os
+import json
+import math
+import random
+import tensorflow as tf
+
+from dataset_cache import list_image_files, stat_fingerprint
+
+FEATURES = {
+    'image': tf.io.FixedLenFeature([], tf.string),
+    'label': tf.io.FixedLenFeature([], tf.int64),
+}
+
+
+def default_tfrecord_dir():
+    return os.getenv('FER_TFRECORD_DIR', 'data/tfrecord')
+
+
+def split_key(directory):
+    """'data/fer2013/train' -> 'fer2013_train'"""
+    parts = os.path.normpath(directory).split(os.sep)
+    if parts[0] == 'data':
+        parts = parts[1:]
+    return '_'.join(parts)
+
+
+def _example(image_bytes, label):
+    return tf.train.Example(features=tf.train.Features(feature={
+        'image': tf.train.Feature(bytes_list=tf.train.BytesList(value=[image_bytes])),
+        'label': tf.train.Feature(int64_list=tf.train.Int64List(value=[label])),
+    })).SerializeToString()
+
+
+def export_split(directory, output_dir=None, num_shards=None, compression=None,
+                 shard_bytes=100 * 1024 * 1024, seed=0):
+    """
+    Write a class-folder split as balanced TFRecord shards
+    Args:
+        directory: e.g. 'data/fer2013/train'
+        output_dir: Destination (default: $FER_TFRECORD_DIR or data/tfrecord)
+        num_shards: Shard count (default: one per ~shard_bytes, at least 4
+                    so reads can be interleaved)
+        compression: None or 'GZIP'
+        seed: Seed of the one-off shuffle that deals images to shards
+    Returns:
+        Manifest dict
+    """
+    output_dir = output_dir or default_tfrecord_dir()
+    os.makedirs(output_dir, exist_ok=True)
+    key = split_key(directory)
+
+    paths, labels, class_names = list_image_files(directory)
+    if num_shards is None:
+        total_bytes = sum(os.path.getsize(path) for path in paths)
+        num_shards = max(4, math.ceil(total_bytes / shard_bytes))
+    num_shards = max(1, min(num_shards, len(paths)))
+
+    order = list(range(len(paths)))
+    random.Random(seed).shuffle(order)
+
+    suffix = '.tfrecord.gz' if compression == 'GZIP' else '.tfrecord'
+    options = tf.io.TFRecordOptions(compression_type=compression or '')
+    shard_files = [f"{key}-{i:05d}-of-{num_shards:05d}{suffix}" for i in range(num_shards)]
+
+    for shard, shard_file in enumerate(shard_files):
+        tmp_path = os.path.join(output_dir, shard_file + '.tmp')
+        with tf.io.TFRecordWriter(tmp_path, options) as writer:
+            for index in order[shard::num_shards]:
+                with open(paths[index], 'rb') as f:
+                    writer.write(_example(f.read(), int(labels[index])))
+        os.replace(tmp_path, os.path.join(output_dir, shard_file))
+
+    manifest = {
+        'directory': directory,
+        'class_names': class_names,
+        'samples': len(paths),
+        'shards': shard_files,
+        'compression': compression,
+        'stat_fingerprint': stat_fingerprint(directory, paths)
+    }
+    manifest_path = os.path.join(output_dir, key + '.json')
+    with open(manifest_path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(manifest_path + '.tmp', manifest_path)
+
+    # Drop shards of an earlier export with a different shard count
+    for filename in os.listdir(output_dir):
+        if filename.startswith(key + '-') and filename not in shard_files:
+            os.remove(os.path.join(output_dir, filename))
+    return manifest
+
+
+def read_manifest(directory, tfrecord_dir=None):
+    """Manifest of an exported split, or None if it was never exported"""
+    path = os.path.join(tfrecord_dir or default_tfrecord_dir(), split_key(directory) + '.json')
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def parse_example(serialized):
+    """Serialized record -> (encoded image bytes, label)"""
+    example = tf.io.parse_single_example(serialized, FEATURES)
+    return example['image'], tf.cast(example['label'], tf.int32)
@@ -1,6 +1,10 @@
+import os
 import numpy as np
 import cv2
-import tensorflow as tf
+from model_registry import registry, model_path
+from cascade import uncertainty, load_config
+from face_preprocessor import FacePreprocessor
+import metrics
 from collections import deque
 
 class ThreeDatasetEnsemble:
@@ -12,7 +16,16 @@ class ThreeDatasetEnsemble:
     Total training data: 14,065,000 images across 3 datasets!
     '''
     
-    def __init__(self):
+    MODEL_NAMES = ['fer2013', 'three_dataset']
+    MODEL_PATHS = [model_path(name) for name in MODEL_NAMES]
+    
+    def __init__(self, backend=None, cascade=None):
+        '''
+        Args:
+            backend: 'auto', 'keras' or 'tflite' (default: $FER_BACKEND or 'auto')
+            cascade: Run the three-dataset model only for faces the FER2013
+                     CNN is unsure about (default: $FER_CASCADE == '1')
+        '''
         print("Initializing Three-Dataset Ensemble...")
         
         self.emotions = ['Angry', 'Disgust', 'Fear', 'Happy', 
@@ -20,15 +33,13 @@ class ThreeDatasetEnsemble:
         
         # Model 1: FER2013 from scratch
         print("  [1/2] Loading FER2013 model (from scratch)...")
-        self.fer_model = tf.keras.models.load_model('models/fer_model_best.h5')
+        self.fer_model = registry.get(self.MODEL_NAMES[0], backend)
         print("      OK: FER2013 model loaded")
         print("        Training: FER2013 only (35K images)")
         
         # Model 2: Three-dataset transfer learning
         print("  [2/2] Loading Three-Dataset model...")
-        self.multi_model = tf.keras.models.load_model(
-            'models/pretrained/final_cross_dataset.h5'
-        )
+        self.multi_model = registry.get(self.MODEL_NAMES[1], backend)
         print("      OK: Three-dataset model loaded")
         print("        Stage 1: ImageNet (14M images)")
         print("        Stage 2: FER2013 (35K images)")
@@ -48,7 +59,20 @@ class ThreeDatasetEnsemble:
             'multi': 0.7         # Three datasets (more weight)
         }
         
+        if cascade is None:
+            cascade = os.getenv('FER_CASCADE', '0') == '1'
+        # {'criterion', 'threshold'} from calibrate_cascade.py
+        self.cascade = load_config() if cascade else None
+        self.cascade_counts = {'fer2013_only': 0, 'ensemble': 0}
+        if self.cascade:
+            print(f"  Cascade: {self.cascade['criterion']} uncertainty > "
+                  f"{self.cascade['threshold']:.3f} runs the three-dataset model")
+        
+        # Both model inputs from one resize, into reused batch buffers
+        self.preprocessor = FacePreprocessor((48, 'grayscale'), (96, 'rgb'))
+        
         self.emotion_history = deque(maxlen=10)
+        self.track_histories = {}
         
         self.emotion_colors = {
             'Angry': (0, 0, 255), 'Disgust': (0, 128, 0),
@@ -75,14 +99,53 @@ class ThreeDatasetEnsemble:
         normalized = resized.astype('float32') / 255.0
         return np.expand_dims(normalized, axis=0)
     
-    def predict_emotion(self, face_img, use_smoothing=True):
+    def predict_emotion(self, face_img, use_smoothing=True, single_model=False):
+        return self.predict_emotions([face_img], use_smoothing=use_smoothing,
+                                     single_model=single_model)[0]
+    
+    def predict_emotions(self, face_imgs, track_ids=None, use_smoothing=True,
+                         single_model=False):
+        '''
+        Batched prediction: one forward pass per model for all faces
+        Args:
+            face_imgs: List of face regions (BGR)
+            track_ids: Optional track ID per face; smoothing history is kept
+                       per track instead of shared
+            single_model: Only run the FER2013 CNN (the cheapest model),
+                          used when shedding load
+        Returns:
+            List of (emotion, confidence, probs, individual_preds, agreement);
+            agreement is None for faces only the FER2013 CNN saw
+        '''
+        if len(face_imgs) == 0:
+            return []
+        
+        with metrics.timer('fer_model_seconds', recognizer='three_dataset', stage='preprocess'):
+            if single_model:
+                fer_batch, = self.preprocessor(face_imgs, outputs=[0])
+            else:
+                fer_batch, multi_batch = self.preprocessor(face_imgs)
+        
         # FER2013 model prediction
-        fer_input = self.preprocess_fer(face_img)
-        fer_probs = self.fer_model.predict(fer_input, verbose=0)[0]
+        with metrics.timer('fer_model_seconds', recognizer='three_dataset', stage='fer2013'):
+            fer_probs = np.asarray(self.fer_model.predict_on_batch(fer_batch))
+        
+        # Faces that also get the three-dataset model
+        if single_model:
+            heavy = np.zeros(len(face_imgs), dtype=bool)
+        elif self.cascade:
+            heavy = uncertainty(fer_probs, self.cascade['criterion']) > self.cascade['threshold']
+            self._count_cascade(heavy)
+        else:
+            heavy = np.ones(len(face_imgs), dtype=bool)
         
-        # Three-dataset model prediction
-        multi_input = self.preprocess_multi(face_img)
-        multi_probs = self.multi_model.predict(multi_input, verbose=0)[0]
+        # Three-dataset model prediction (faces without it keep the CNN's output)
+        multi_probs = fer_probs.copy()
+        if heavy.any():
+            if not heavy.all():
+                multi_batch = FacePreprocessor.compact(multi_batch, heavy)
+            with metrics.timer('fer_model_seconds', recognizer='three_dataset', stage='multi'):
+                multi_probs[heavy] = np.asarray(self.multi_model.predict_on_batch(multi_batch))
         
         # Weighted ensemble
         ensemble_probs = (
@@ -90,26 +153,56 @@ class ThreeDatasetEnsemble:
             self.weights['multi'] * multi_probs
         )
         
-        emotion_idx = np.argmax(ensemble_probs)
-        confidence = ensemble_probs[emotion_idx]
-        emotion = self.emotions[emotion_idx]
-        
-        # Agreement
-        fer_pred = self.emotions[np.argmax(fer_probs)]
-        multi_pred = self.emotions[np.argmax(multi_probs)]
-        agreement = 1.0 if fer_pred == multi_pred else 0.5
-        
-        # Temporal smoothing
-        if use_smoothing:
-            self.emotion_history.append(emotion)
-            if len(self.emotion_history) >= 5:
-                emotion = max(set(self.emotion_history), 
-                            key=list(self.emotion_history).count)
-                confidence = list(self.emotion_history).count(emotion) / len(self.emotion_history)
-        
-        individual_preds = [fer_probs, multi_probs]
+        results = []
+        for i in range(len(face_imgs)):
+            emotion_idx = np.argmax(ensemble_probs[i])
+            confidence = ensemble_probs[i][emotion_idx]
+            emotion = self.emotions[emotion_idx]
+            
+            # Agreement (None when only the FER2013 CNN ran: nothing to compare)
+            agreement = None
+            if heavy[i]:
+                fer_pred = self.emotions[np.argmax(fer_probs[i])]
+                multi_pred = self.emotions[np.argmax(multi_probs[i])]
+                agreement = 1.0 if fer_pred == multi_pred else 0.5
+            
+            # Temporal smoothing
+            if use_smoothing:
+                history = self._history_for(None if track_ids is None else track_ids[i])
+                history.append(emotion)
+                if len(history) >= 5:
+                    emotion = max(set(history), key=list(history).count)
+                    confidence = list(history).count(emotion) / len(history)
+            
+            individual_preds = [fer_probs[i], multi_probs[i]] if heavy[i] else [fer_probs[i]]
+            results.append((emotion, confidence, ensemble_probs[i], individual_preds, agreement))
         
-        return emotion, confidence, ensemble_probs, individual_preds, agreement
+        return results
+    
+    def _count_cascade(self, heavy):
+        skipped = int(len(heavy) - heavy.sum())
+        self.cascade_counts['fer2013_only'] += skipped
+        self.cascade_counts['ensemble'] += int(heavy.sum())
+        metrics.inc('fer_cascade_faces_total', skipped, recognizer='three_dataset',
+                    path='fer2013_only')
+        metrics.inc('fer_cascade_faces_total', int(heavy.sum()), recognizer='three_dataset',
+                    path='ensemble')
+    
+    def cascade_skip_fraction(self):
+        '''Fraction of faces answered without the three-dataset model'''
+        total = sum(self.cascade_counts.values())
+        return self.cascade_counts['fer2013_only'] / total if total else None
+    
+    def _history_for(self, track_id):
+        if track_id is None:
+            return self.emotion_history
+        if track_id not in self.track_histories:
+            self.track_histories[track_id] = deque(maxlen=10)
+        return self.track_histories[track_id]
+    
+    def drop_tracks(self, track_ids):
+        for track_id in track_ids:
+            self.track_histories.pop(track_id, None)
     
     def get_emotion_color(self, emotion):
         return self.emotion_colors.get(emotion, (255, 255, 255))
@@ -124,6 +217,7 @@ class ThreeDatasetEnsemble:
     
     def reset_history(self):
         self.emotion_history.clear()
+        self.track_histories.clear()
     
     def get_ensemble_info(self):
         return {
@@ -131,5 +225,7 @@ class ThreeDatasetEnsemble:
             'datasets': ['FER2013: 35K', 'ImageNet: 14M + FER2013: 35K + RAF-DB: 30K'],
             'weights': self.weights,
             'total_images': '14,065,000',
-            'type': 'Three-Dataset Cross-Generalization Ensemble'
+            'type': 'Three-Dataset Cross-Generalization Ensemble',
+            'cascade': None if self.cascade is None else dict(
+                self.cascade, skip_fraction=self.cascade_skip_fraction())
         }
@@ -0,0 +1,209 @@
+"""
+Opt-in fast training mode: XLA compilation + mixed precision
+Enabled with FER_TRAIN_MODE=fast (default 'baseline'). The precision
+policy follows the hardware:
+    CPU with AVX512-BF16/AMX   -> mixed_bfloat16 (no loss scaling needed)
+    GPU                        -> mixed_float16 (dynamic loss scaling)
+    otherwise                  -> float32 (XLA only)
+FER_MIXED_PRECISION=bfloat16|float16|off overrides the choice.
+
+Output layers stay float32 so softmax and the loss are computed at full
+precision, and saved models are converted back to float32 so inference
+and the TFLite export are unaffected.
+"""
+
+import os
+import json
+import time
+import tensorflow as tf
+
+RESULTS_PATH = 'models/training_modes.json'
+
+
+def cpu_supports_bfloat16():
+    """True if the CPU has native bfloat16 instructions"""
+    try:
+        with open('/proc/cpuinfo') as f:
+            flags = f.read()
+    except OSError:
+        return False
+    return 'avx512_bf16' in flags or 'amx_bf16' in flags
+
+
+def select_policy():
+    choice = os.getenv('FER_MIXED_PRECISION', 'auto')
+    if choice == 'off':
+        return 'float32'
+    if choice == 'bfloat16':
+        return 'mixed_bfloat16'
+    if choice == 'float16':
+        return 'mixed_float16'
+    if tf.config.list_physical_devices('GPU'):
+        return 'mixed_float16'
+    if cpu_supports_bfloat16():
+        return 'mixed_bfloat16'
+    return 'float32'
+
+
+def _set_layer_dtypes(config, dtype, keep_float32):
+    """Rewrite the dtype of every layer in a (nested) model config"""
+    for layer in config.get('layers', []):
+        layer_config = layer['config']
+        if layer['class_name'] == 'InputLayer':
+            continue
+        if 'layers' in layer_config:
+            _set_layer_dtypes(layer_config, dtype, keep_float32)
+        layer_config['dtype'] = 'float32' if layer_config.get('name') in keep_float32 else dtype
+
+
+def convert_model(model, dtype):
+    """
+    Rebuild a functional/sequential model with another dtype policy
+    Weights are copied; output layers are always kept float32.
+    """
+    keep_float32 = {name.split('/')[0] for name in model.output_names}
+    keep_float32.add(model.layers[-1].name)
+    config = model.get_config()
+    _set_layer_dtypes(config, dtype, keep_float32)
+
+    if isinstance(model, tf.keras.Sequential):
+        converted = tf.keras.Sequential.from_config(config)
+    else:
+        converted = tf.keras.Model.from_config(config)
+    converted.set_weights(model.get_weights())
+    return converted
+
+
+class StepTimer(tf.keras.callbacks.Callback):
+    """
+    Mean training step time per fit() call (phase), ignoring the first
+    (compiling) steps of each. Phases train different layers, e.g. a frozen
+    backbone then the whole model, so their step times are kept apart.
+    """
+
+    def __init__(self, warmup_steps=10):
+        super().__init__()
+        self.warmup_steps = warmup_steps
+        self.phases = []  # [steps, timed_steps, total seconds] per fit()
+        self._start = None
+
+    def on_train_begin(self, logs=None):
+        # Each compile()/fit() traces (and with XLA compiles) again
+        self.phases.append([0, 0, 0.0])
+
+    def on_train_batch_begin(self, batch, logs=None):
+        self._start = time.perf_counter()
+
+    def on_train_batch_end(self, batch, logs=None):
+        phase = self.phases[-1]
+        phase[0] += 1
+        if phase[0] > self.warmup_steps:
+            phase[1] += 1
+            phase[2] += time.perf_counter() - self._start
+
+    @property
+    def ms_per_step_by_phase(self):
+        return [1000 * total / timed if timed else None for _, timed, total in self.phases]
+
+    @property
+    def ms_per_step(self):
+        """Step time of the last phase (the full fine-tune in the two-phase scripts)"""
+        phases = self.ms_per_step_by_phase
+        return phases[-1] if phases else None
+
+
+def _phase_steps(run):
+    # Runs recorded before per-phase timing only have one mixed value
+    return run.get('phase_ms_per_step') or [run['ms_per_step']]
+
+
+class TrainingMode:
+    """Precision policy, XLA flag and reporting for one training run"""
+
+    def __init__(self, mode=None):
+        """
+        Args:
+            mode: 'baseline' or 'fast' (default: $FER_TRAIN_MODE or 'baseline')
+
+        Create before building any layers: the global policy applies to
+        layers constructed afterwards.
+        """
+        if mode is None:
+            mode = os.getenv('FER_TRAIN_MODE', 'baseline')
+        if mode not in ('baseline', 'fast'):
+            raise ValueError(f"Unknown training mode: {mode}")
+
+        self.mode = mode
+        self.jit_compile = mode == 'fast'
+        self.policy = select_policy() if mode == 'fast' else 'float32'
+        tf.keras.mixed_precision.set_global_policy(self.policy)
+        self.timer = StepTimer()
+
+    def describe(self):
+        return f"{self.mode} (policy={self.policy}, xla={'on' if self.jit_compile else 'off'})"
+
+    def optimizer(self, optimizer):
+        """Add dynamic loss scaling when training in float16"""
+        if self.policy == 'mixed_float16':
+            return tf.keras.mixed_precision.LossScaleOptimizer(optimizer)
+        return optimizer
+
+    def compile_kwargs(self):
+        return {'jit_compile': True} if self.jit_compile else {}
+
+    def prepare_model(self, model):
+        """Switch a loaded float32 model to the training policy"""
+        if self.policy == 'float32':
+            return model
+        return convert_model(model, self.policy)
+
+    def save_float32(self, model, path):
+        """Save a float32 copy of the model (what inference expects)"""
+        if self.policy != 'float32':
+            model = convert_model(model, 'float32')
+        model.save(path)
+
+    def finalize_checkpoint(self, path):
+        """Rewrite a ModelCheckpoint file saved in mixed precision as float32"""
+        if self.policy != 'float32' and os.path.exists(path):
+            self.save_float32(tf.keras.models.load_model(path), path)
+
+    def report(self, script, accuracy):
+        """
+        Record this run and print it next to the other modes' latest runs
+        Args:
+            script: Training script name
+            accuracy: Final test accuracy (0-1)
+        """
+        try:
+            with open(RESULTS_PATH) as f:
+                results = json.load(f)
+        except (OSError, ValueError):
+            results = []
+
+        results.append({'script': script, 'mode': self.mode, 'policy': self.policy,
+                        'xla': self.jit_compile, 'ms_per_step': self.timer.ms_per_step,
+                        'phase_ms_per_step': self.timer.ms_per_step_by_phase,
+                        'accuracy': accuracy, 'time': time.time()})
+        os.makedirs(os.path.dirname(RESULTS_PATH), exist_ok=True)
+        with open(RESULTS_PATH, 'w') as f:
+            json.dump(results, f, indent=2)
+
+        latest = {}
+        for run in results:
+            if run['script'] == script:
+                latest[run['mode']] = run
+
+        print(f"\nTraining mode comparison ({script}):")
+        print(f"  {'Mode':<10} {'Policy':<16} {'XLA':<5} {'ms/step per phase':>20} {'Accuracy':>9}")
+        for mode, run in sorted(latest.items()):
+            steps = ' / '.join(f"{ms:.1f}" if ms else '-' for ms in _phase_steps(run)) or '-'
+            print(f"  {mode:<10} {run['policy']:<16} {'on' if run['xla'] else 'off':<5} "
+                  f"{steps:>20} {run['accuracy']*100:>8.2f}%")
+        if 'baseline' in latest and 'fast' in latest:
+            base, fast = latest['baseline'], latest['fast']
+            speedups = [f"{b / f:.2f}x" if b and f else '-'
+                        for b, f in zip(_phase_steps(base), _phase_steps(fast))]
+            if any(speedup != '-' for speedup in speedups):
+                print(f"  Speedup per phase: {' / '.join(speedups)}, "
+                      f"accuracy change: {(fast['accuracy'] - base['accuracy'])*100:+.2f} points")
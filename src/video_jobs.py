@@ -0,0 +1,368 @@
+"""
+Background job queue for uploaded video analysis
+Uploads are handed to a worker pool so Flask workers return immediately.
+Progress and results are persisted under a jobs directory so clients can
+poll, reconnect to the event stream, or cancel a running analysis.
+
+The jobs directory is the source of truth between processes: when the
+app runs under a pre-forking server, any worker can report on, stream or
+cancel a job owned by a sibling worker.
+"""
+
+import os
+import re
+import json
+import time
+import uuid
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+JOB_ID_PATTERN = re.compile(r'[0-9a-f]{32}')
+
+
+def new_job_id():
+    return uuid.uuid4().hex
+
+
+def is_valid_job_id(job_id):
+    """Job IDs end up in file paths, so only accept our own format"""
+    return bool(JOB_ID_PATTERN.fullmatch(job_id or ''))
+
+
+def _pid_alive(pid):
+    if os.name != 'posix' or not pid:
+        # Can't probe safely (os.kill terminates processes on Windows)
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class JobCancelled(Exception):
+    """Raised inside a job when cancellation was requested"""
+
+
+class VideoJob:
+    """State, event log and cancellation flag of one video analysis"""
+
+    FINISHED = ('done', 'failed', 'cancelled', 'interrupted')
+
+    # How often a running job looks for a cancel request from another process
+    CANCEL_POLL_INTERVAL = 1.0
+
+    def __init__(self, job_id, jobs_dir, remote=False):
+        """
+        Args:
+            job_id: Job identifier
+            jobs_dir: Directory for persisted job state
+            remote: True for a read-only view of a job owned by another
+                    process (refreshed from disk)
+        """
+        self.job_id = job_id
+        self.status = 'queued'
+        self.progress = 0
+        self.summary = None
+        self.error = None
+        self.created = time.time()
+        self.updated = self.created
+        self.events = []
+        self.pid = os.getpid()
+        self.remote = remote
+
+        self._cancel = threading.Event()
+        self._cancel_callbacks = []
+        self._last_cancel_poll = 0.0
+        self._events_offset = 0
+        self._cond = threading.Condition()
+        self._state_path = os.path.join(jobs_dir, f"{job_id}.json")
+        self._events_path = os.path.join(jobs_dir, f"{job_id}.events.jsonl")
+        self._cancel_path = os.path.join(jobs_dir, f"{job_id}.cancel")
+
+    @property
+    def finished(self):
+        return self.status in self.FINISHED
+
+    def emit(self, event):
+        """
+        Record a progress/result event
+        Args:
+            event: JSON-serialisable dict (may carry 'progress')
+        """
+        with self._cond:
+            if 'progress' in event:
+                self.progress = event['progress']
+            self.events.append(event)
+            self.updated = time.time()
+            with open(self._events_path, 'a') as f:
+                f.write(json.dumps(event) + '\n')
+            self._save_state()
+            self._cond.notify_all()
+
+    def cancel(self):
+        """Request cancellation (from any process)"""
+        if self.remote:
+            # The owning process picks this up in check_cancelled()
+            open(self._cancel_path, 'w').close()
+            return
+        self._cancel.set()
+        for callback in self._cancel_callbacks:
+            callback()
+
+    def add_cancel_callback(self, callback):
+        """Run callback when cancellation is requested (e.g. stop an upload)"""
+        self._cancel_callbacks.append(callback)
+
+    def is_cancelled(self):
+        if not self._cancel.is_set():
+            now = time.time()
+            if now - self._last_cancel_poll >= self.CANCEL_POLL_INTERVAL:
+                self._last_cancel_poll = now
+                if os.path.exists(self._cancel_path):
+                    self.cancel()
+        return self._cancel.is_set()
+
+    def check_cancelled(self):
+        """Raise JobCancelled if the job should stop"""
+        if self.is_cancelled():
+            raise JobCancelled()
+
+    def set_status(self, status, summary=None, error=None):
+        with self._cond:
+            self.status = status
+            if summary is not None:
+                self.summary = summary
+            if error is not None:
+                self.error = error
+            if status == 'done':
+                self.progress = 100
+            self.updated = time.time()
+            self._save_state()
+            self._cond.notify_all()
+
+    def wait_events(self, since=0, timeout=15.0, poll_interval=0.5):
+        """
+        Block until events newer than `since` exist or the job finishes
+        Returns:
+            (new_events, finished)
+        """
+        if self.remote:
+            deadline = time.time() + timeout
+            self.refresh()
+            while len(self.events) <= since and not self.finished and time.time() < deadline:
+                time.sleep(poll_interval)
+                self.refresh()
+            return self.events[since:], self.finished
+
+        with self._cond:
+            if len(self.events) <= since and not self.finished:
+                self._cond.wait(timeout)
+            return self.events[since:], self.finished
+
+    def to_dict(self, include_events=False):
+        data = {
+            'job_id': self.job_id,
+            'status': self.status,
+            'progress': self.progress,
+            'summary': self.summary,
+            'error': self.error,
+            'created': self.created,
+            'updated': self.updated,
+            'event_count': len(self.events),
+            'pid': self.pid
+        }
+        if include_events:
+            data['events'] = list(self.events)
+        return data
+
+    def _save_state(self):
+        """Atomically write job state next to the event log"""
+        tmp_path = f"{self._state_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp_path, self._state_path)
+
+    def refresh(self):
+        """Re-read state and any new events written by the owning process"""
+        with open(self._state_path) as f:
+            state = json.load(f)
+
+        self.status = state['status']
+        self.progress = state['progress']
+        self.summary = state.get('summary')
+        self.error = state.get('error')
+        self.created = state['created']
+        self.updated = state['updated']
+        self.pid = state.get('pid')
+
+        if os.path.exists(self._events_path):
+            with open(self._events_path) as f:
+                f.seek(self._events_offset)
+                while True:
+                    line = f.readline()
+                    # Stop at a line the owner is still writing
+                    if not line.endswith('\n'):
+                        break
+                    self._events_offset = f.tell()
+                    if line.strip():
+                        self.events.append(json.loads(line))
+
+        # Owner died (e.g. worker killed during a reload) mid-job
+        if self.remote and not self.finished and not _pid_alive(self.pid):
+            self.status = 'interrupted'
+            self.error = 'Worker process exited before the job finished'
+
+    @classmethod
+    def load(cls, job_id, jobs_dir, remote=False):
+        """
+        Restore a persisted job
+        Args:
+            remote: Keep it as a live view of another process's job instead
+                    of marking unfinished work as interrupted
+        """
+        job = cls(job_id, jobs_dir, remote=remote)
+        job.refresh()
+
+        # Work in flight when the server stopped cannot be resumed
+        if not remote and not job.finished:
+            job.status = 'interrupted'
+            job.error = 'Server restarted before the job finished'
+            job._save_state()
+        return job
+
+    def delete_files(self):
+        for path in (self._state_path, self._events_path, self._cancel_path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+class VideoJobQueue:
+    """Runs video analyses on a bounded worker pool"""
+
+    def __init__(self, worker_fn, max_workers=None, jobs_dir='jobs',
+                 job_ttl=None):
+        """
+        Args:
+            worker_fn: Callable(source, job) -> summary dict. Should call
+                       job.emit() for progress and job.check_cancelled()
+                       between frames.
+            max_workers: Concurrent analyses (default: $FER_VIDEO_WORKERS or 2)
+            jobs_dir: Directory for persisted job state
+            job_ttl: Seconds to keep finished jobs (default: $FER_JOB_TTL or 24h)
+
+        Construct once per server (before forking workers): jobs left
+        unfinished by a previous run are marked interrupted.
+        """
+        if max_workers is None:
+            max_workers = int(os.getenv('FER_VIDEO_WORKERS', '2'))
+        if job_ttl is None:
+            job_ttl = float(os.getenv('FER_JOB_TTL', str(24 * 3600)))
+
+        self.worker_fn = worker_fn
+        self.max_workers = max_workers
+        self.jobs_dir = jobs_dir
+        self.job_ttl = job_ttl
+
+        self.jobs = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix='video-job')
+
+        os.makedirs(jobs_dir, exist_ok=True)
+        self._load_existing()
+
+    def submit(self, source, cleanup_dir=None, job_id=None):
+        """
+        Queue a video for analysis
+        Args:
+            source: Video passed to worker_fn (path or frame source)
+            cleanup_dir: Directory removed once the job ends (any outcome)
+            job_id: Pre-allocated ID from new_job_id() (default: new one)
+        Returns:
+            VideoJob
+        """
+        self.prune()
+
+        job = VideoJob(job_id or new_job_id(), self.jobs_dir)
+        job.set_status('queued')
+        with self._lock:
+            self.jobs[job.job_id] = job
+
+        self._executor.submit(self._run, job, source, cleanup_dir)
+        return job
+
+    def get(self, job_id):
+        """Job owned by this process, or a live view of another process's job"""
+        if not is_valid_job_id(job_id):
+            return None
+        with self._lock:
+            job = self.jobs.get(job_id)
+        if job is not None:
+            return job
+        try:
+            return VideoJob.load(job_id, self.jobs_dir, remote=True)
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def cancel(self, job_id):
+        """Request cancellation; returns the job or None if unknown"""
+        job = self.get(job_id)
+        if job is not None and not job.finished:
+            job.cancel()
+        return job
+
+    def list_jobs(self):
+        """All jobs in the jobs directory, whichever process owns them"""
+        jobs = []
+        for filename in sorted(os.listdir(self.jobs_dir)):
+            if filename.endswith('.json'):
+                job = self.get(filename[:-len('.json')])
+                if job is not None:
+                    jobs.append(job.to_dict())
+        return jobs
+
+    def prune(self):
+        """Forget finished jobs older than the TTL"""
+        cutoff = time.time() - self.job_ttl
+        with self._lock:
+            expired = [job_id for job_id, job in self.jobs.items()
+                       if job.finished and job.updated < cutoff]
+            for job_id in expired:
+                self.jobs.pop(job_id).delete_files()
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            for job in self.jobs.values():
+                job.cancel()
+        self._executor.shutdown(wait=wait)
+
+    def _run(self, job, source, cleanup_dir):
+        try:
+            job.check_cancelled()
+            job.set_status('running')
+            summary = self.worker_fn(source, job)
+            job.set_status('done', summary=summary)
+        except JobCancelled:
+            job.set_status('cancelled')
+        except Exception as e:
+            print(f"Video job {job.job_id} failed: {str(e)}")
+            job.set_status('failed', error=str(e))
+        finally:
+            if cleanup_dir:
+                shutil.rmtree(cleanup_dir, ignore_errors=True)
+
+    def _load_existing(self):
+        for filename in os.listdir(self.jobs_dir):
+            if not filename.endswith('.json'):
+                continue
+            job_id = filename[:-len('.json')]
+            try:
+                self.jobs[job_id] = VideoJob.load(job_id, self.jobs_dir)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"⚠ Skipping unreadable job state {filename}: {e}")
@@ -0,0 +1,308 @@
+"""
+Video frame sources for background analysis
+- read_video_file: frames from a video already on disk (OpenCV)
+- StreamingVideoDecoder: frames decoded on the fly while an upload is
+  still arriving in chunks (ffmpeg pipe, bounded memory)
+"""
+
+import os
+import json
+import shutil
+import subprocess
+import threading
+import time
+import numpy as np
+import cv2
+
+
+def read_video_file(video_path):
+    """
+    Yield frames from a video file
+    Yields:
+        (frame, progress, timestamp) with progress in percent and
+        timestamp in seconds
+    """
+    cap = cv2.VideoCapture(video_path)
+    try:
+        total_frames = max(1, int(cap.get(cv2.CAP_PROP_FRAME_COUNT)))
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        frame_count = 0
+        while cap.isOpened():
+            ret, frame = cap.read()
+            if not ret:
+                break
+            yield (frame, min(99, int((frame_count + 1) / total_frames * 100)),
+                   frame_count / fps)
+            frame_count += 1
+    finally:
+        cap.release()
+
+
+class UploadOffsetError(ValueError):
+    """Chunk offset doesn't match the bytes received so far"""
+
+    def __init__(self, expected):
+        super().__init__(f"Expected offset {expected}")
+        self.expected = expected
+
+
+def _spool_path(work_dir):
+    return os.path.join(work_dir, 'upload.spool')
+
+
+def _complete_path(work_dir):
+    return os.path.join(work_dir, 'complete')
+
+
+def create_upload(work_dir, total_bytes=None):
+    """Prepare an empty chunked upload in work_dir"""
+    os.makedirs(work_dir, exist_ok=True)
+    with open(os.path.join(work_dir, 'meta.json'), 'w') as f:
+        json.dump({'size': total_bytes}, f)
+    open(_spool_path(work_dir), 'wb').close()
+
+
+def append_upload_chunk(work_dir, offset, stream, piece_size=64 * 1024):
+    """
+    Append a chunk to an upload (callable from any server process)
+    Args:
+        work_dir: Upload directory from create_upload()
+        offset: Expected current size, or None to skip the check
+        stream: File-like request body, copied in small pieces
+    Returns:
+        New upload size in bytes
+    Raises:
+        FileNotFoundError: unknown or finished upload
+        UploadOffsetError: offset mismatch or upload already complete
+    """
+    spool_path = _spool_path(work_dir)
+    if not os.path.exists(spool_path):
+        raise FileNotFoundError(spool_path)
+    with open(spool_path, 'ab') as f:
+        size = f.tell()
+        if os.path.exists(_complete_path(work_dir)) or \
+                (offset is not None and offset != size):
+            raise UploadOffsetError(size)
+        while True:
+            piece = stream.read(piece_size)
+            if not piece:
+                break
+            f.write(piece)
+        return f.tell()
+
+
+def finish_upload(work_dir):
+    """Mark an upload complete; returns its final size"""
+    spool_path = _spool_path(work_dir)
+    if not os.path.exists(spool_path):
+        raise FileNotFoundError(spool_path)
+    open(_complete_path(work_dir), 'w').close()
+    return os.path.getsize(spool_path)
+
+
+class StreamingVideoDecoder:
+    """
+    Decode an upload while it is still being received
+
+    Chunks are appended to a spool file on disk by whichever server
+    process receives them (append_upload_chunk). A feeder thread tails the
+    spool into ffmpeg, which emits raw BGR frames as soon as each GOP is
+    decodable. Frames are resampled to a constant rate and letterboxed to
+    a fixed size so they can be read from the pipe, with timestamps,
+    without probing the container. Memory stays bounded regardless of
+    video size.
+
+    If ffmpeg is not installed, or the container cannot be decoded from a
+    pipe (e.g. MP4 with the index at the end), frames are read from the
+    spool once the upload completes.
+    """
+
+    def __init__(self, work_dir, frame_size=None, fps=None, idle_timeout=None):
+        """
+        Args:
+            work_dir: Upload directory from create_upload()
+            frame_size: (width, height) of decoded frames
+                        (default: $FER_STREAM_FRAME_SIZE or 640x480)
+            fps: Constant output frame rate (default: $FER_STREAM_FPS or 15)
+            idle_timeout: Seconds without new data before the upload is
+                          abandoned (default: $FER_UPLOAD_IDLE_TIMEOUT or 300)
+        """
+        if frame_size is None:
+            w, h = os.getenv('FER_STREAM_FRAME_SIZE', '640x480').split('x')
+            frame_size = (int(w), int(h))
+        if fps is None:
+            fps = float(os.getenv('FER_STREAM_FPS', '15'))
+        if idle_timeout is None:
+            idle_timeout = float(os.getenv('FER_UPLOAD_IDLE_TIMEOUT', '300'))
+
+        with open(os.path.join(work_dir, 'meta.json')) as f:
+            self.total_bytes = json.load(f).get('size')
+
+        self.width, self.height = frame_size
+        self.fps = fps
+        self.idle_timeout = idle_timeout
+        self.work_dir = work_dir
+        self.spool_path = _spool_path(work_dir)
+        self.log_path = os.path.join(work_dir, 'ffmpeg.log')
+        self.bytes_fed = 0
+        self.error = None
+        # Optional callable polled while waiting for data, e.g. a job's
+        # is_cancelled(), so a cancel from another process stops the wait
+        self.cancel_check = None
+
+        self._aborted = False
+        self._feeding = False
+        self._proc = None
+
+    def _start_ffmpeg(self):
+        ffmpeg = shutil.which('ffmpeg')
+        if ffmpeg is None:
+            print("⚠ ffmpeg not found, video will be decoded after upload completes")
+            return None
+
+        w, h = self.width, self.height
+        scale = (f"fps={self.fps},"
+                 f"scale={w}:{h}:force_original_aspect_ratio=decrease,"
+                 f"pad={w}:{h}:(ow-iw)/2:(oh-ih)/2")
+        cmd = [ffmpeg, '-loglevel', 'error', '-i', 'pipe:0',
+               '-vf', scale, '-f', 'rawvideo', '-pix_fmt', 'bgr24', 'pipe:1']
+        with open(self.log_path, 'wb') as log:
+            return subprocess.Popen(cmd, stdin=subprocess.PIPE,
+                                    stdout=subprocess.PIPE, stderr=log)
+
+    @property
+    def progress(self):
+        if not self.total_bytes:
+            return 0
+        return min(99, int(self.bytes_fed / self.total_bytes * 100))
+
+    def abort(self):
+        """Stop decoding"""
+        self._aborted = True
+        if self._proc is not None and self._proc.poll() is None:
+            self._proc.kill()
+
+    def _cancel_requested(self):
+        if not self._aborted and self.cancel_check is not None and self.cancel_check():
+            self.abort()
+        return self._aborted
+
+    def _feed(self):
+        """Tail the spool file into ffmpeg until the upload completes"""
+        last_data = time.time()
+        with open(self.spool_path, 'rb') as spool:
+            while self._feeding and not self._cancel_requested():
+                # Check before reading: once complete, an empty read is EOF
+                complete = os.path.exists(_complete_path(self.work_dir))
+                chunk = spool.read(64 * 1024)
+                if chunk:
+                    try:
+                        self._proc.stdin.write(chunk)
+                    except (BrokenPipeError, OSError, ValueError):
+                        # Decoder gave up on the container; the spool
+                        # fallback still has the full upload
+                        break
+                    self.bytes_fed += len(chunk)
+                    last_data = time.time()
+                    continue
+                if complete:
+                    break
+                if time.time() - last_data > self.idle_timeout:
+                    self.error = 'Upload stalled'
+                    self.abort()
+                    break
+                time.sleep(0.05)
+        try:
+            self._proc.stdin.close()
+        except (BrokenPipeError, OSError):
+            pass
+
+    def _wait_for_upload(self):
+        """Block until the spool holds the whole upload"""
+        last_size, last_data = -1, time.time()
+        while not self._cancel_requested() and \
+                not os.path.exists(_complete_path(self.work_dir)):
+            size = os.path.getsize(self.spool_path)
+            if size != last_size:
+                last_size, last_data = size, time.time()
+            elif time.time() - last_data > self.idle_timeout:
+                self.error = 'Upload stalled'
+                self.abort()
+                break
+            time.sleep(0.2)
+        self.bytes_fed = os.path.getsize(self.spool_path)
+
+    def _ffmpeg_error(self):
+        try:
+            with open(self.log_path, 'rb') as f:
+                log = f.read().decode('utf-8', 'replace').strip()
+        except OSError:
+            log = ''
+        return log.splitlines()[-1] if log else f"exit code {self._proc.returncode}"
+
+    def _read_spool(self):
+        self._wait_for_upload()
+        if self.error:
+            raise RuntimeError(self.error)
+        if not self._aborted:
+            yield from read_video_file(self.spool_path)
+
+    def frames(self):
+        """
+        Yield decoded frames as they become available
+        Yields:
+            (frame, progress, timestamp) with progress in percent of bytes
+            received and timestamp in seconds
+        """
+        self._proc = self._start_ffmpeg()
+        if self._proc is None:
+            yield from self._read_spool()
+            return
+
+        self._feeding = True
+        feeder = threading.Thread(target=self._feed, daemon=True)
+        feeder.start()
+
+        decoded = 0
+        at_eof = False
+        frame_bytes = self.width * self.height * 3
+        buffer = bytearray(frame_bytes)
+        view = memoryview(buffer)
+        try:
+            while True:
+                filled = 0
+                while filled < frame_bytes:
+                    n = self._proc.stdout.readinto(view[filled:])
+                    if not n:
+                        break
+                    filled += n
+                if filled < frame_bytes:
+                    at_eof = True
+                    break
+                # Copy out of the reusable read buffer
+                frame = np.frombuffer(buffer, np.uint8).reshape(
+                    self.height, self.width, 3).copy()
+                yield frame, self.progress, decoded / self.fps
+                decoded += 1
+        finally:
+            # Consumer may have stopped early: stop feeding and decoding.
+            # At EOF ffmpeg is exiting by itself; keep its exit code.
+            self._feeding = False
+            if not at_eof and self._proc.poll() is None:
+                self._proc.kill()
+            try:
+                self._proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self._proc.kill()
+                self._proc.wait()
+            feeder.join()
+
+        if self.error:
+            raise RuntimeError(self.error)
+        if self._aborted:
+            return
+        if decoded == 0:
+            yield from self._read_spool()
+        elif self._proc.returncode != 0:
+            # Don't pass a truncated video off as complete
+            raise RuntimeError(f"ffmpeg failed after {decoded} frames: {self._ffmpeg_error()}")
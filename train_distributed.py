@@ -0,0 +1,165 @@
+"""
+Data-parallel training of the FER2013 CNN across CPU worker processes
+Uses tf.distribute.MultiWorkerMirroredStrategy: every worker holds a copy
+of the model, reads its own shard of data/fer2013/train and gradients are
+all-reduced after each step, so an epoch is split between the workers.
+
+Launch N workers on this machine (cores are divided between them):
+    python train_distributed.py --workers 4 [--epochs 50] [--batch-size 64]
+
+Across machines, start one process per machine with TF_CONFIG set
+(same 'cluster' everywhere, each with its own task index):
+    TF_CONFIG='{"cluster": {"worker": ["host1:12345", "host2:12345"]},
+                "task": {"type": "worker", "index": 0}}' python train_distributed.py
+
+Checkpoints are written by the chief (worker 0) on synchronized metrics;
+an interrupted run resumes from models/distributed/backup.
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.append('src')
+
+import tensorflow as tf
+from tensorflow.keras.callbacks import (ModelCheckpoint, EarlyStopping,
+                                        ReduceLROnPlateau, BackupAndRestore)
+
+from data_pipeline import image_dataset
+from dataset_cache import list_image_files
+from fer_cnn import create_fer_model
+from distributed_training import (worker_info, configure_threads, launch_local_workers,
+                                  summarize_run, ThroughputLogger, LOG_DIR)
+
+TRAIN_DIR = 'data/fer2013/train'
+TEST_DIR = 'data/fer2013/test'
+
+# Same augmentation as model_training.py
+TRAIN_AUGMENT = dict(
+    rotation_range=20,
+    width_shift_range=0.2,
+    height_shift_range=0.2,
+    horizontal_flip=True,
+    zoom_range=0.2,
+    shear_range=0.2,
+    fill_mode='nearest'
+)
+
+
+def run_worker(args):
+    worker_index, num_workers = worker_info()
+    threads = configure_threads(num_workers)
+
+    communication = tf.distribute.experimental.CommunicationOptions(
+        implementation=tf.distribute.experimental.CommunicationImplementation.RING)
+    strategy = tf.distribute.MultiWorkerMirroredStrategy(communication_options=communication)
+    is_chief = worker_index == 0
+
+    global_batch = args.batch_size * num_workers
+    train_samples = len(list_image_files(TRAIN_DIR)[0])
+    test_samples = len(list_image_files(TEST_DIR)[0])
+    # Every worker must run the same number of steps, so shards repeat
+    # and an epoch is a fixed step count
+    steps_per_epoch = train_samples // global_batch
+    validation_steps = max(1, test_samples // global_batch)
+
+    if is_chief:
+        print(f"\nWorkers: {num_workers} ({threads} threads each), "
+              f"batch {args.batch_size}/worker = {global_batch} global")
+        print(f"Steps per epoch: {steps_per_epoch}, validation steps: {validation_steps}")
+
+    def input_fn(directory, shuffle, augment):
+        def dataset_fn(context):
+            ds, _ = image_dataset(
+                directory,
+                image_size=(48, 48),
+                batch_size=context.get_per_replica_batch_size(global_batch),
+                color_mode='grayscale',
+                shuffle=shuffle,
+                augment=augment,
+                shard=(context.num_input_pipelines, context.input_pipeline_id)
+            )
+            return ds.repeat()
+        return strategy.distribute_datasets_from_function(dataset_fn)
+
+    train_ds = input_fn(TRAIN_DIR, True, TRAIN_AUGMENT)
+    test_ds = input_fn(TEST_DIR, False, None)
+
+    with strategy.scope():
+        model = create_fer_model(learning_rate=args.learning_rate)
+    if is_chief:
+        model.summary()
+
+    os.makedirs('models', exist_ok=True)
+    callbacks = [
+        # Restores model, optimizer and epoch on all workers after a restart
+        BackupAndRestore(os.path.join(LOG_DIR, 'backup')),
+        # Metrics are all-reduced, so every worker takes the same decision;
+        # non-chief workers write to temporary paths that Keras removes
+        ModelCheckpoint(args.output, save_best_only=True, monitor='val_accuracy',
+                        mode='max', verbose=1 if is_chief else 0),
+        EarlyStopping(monitor='val_loss', patience=15, verbose=1 if is_chief else 0),
+        ReduceLROnPlateau(monitor='val_loss', factor=0.5, patience=5, min_lr=0.00001,
+                          verbose=1 if is_chief else 0),
+        ThroughputLogger(worker_index, args.batch_size)
+    ]
+
+    model.fit(
+        train_ds,
+        validation_data=test_ds,
+        epochs=args.epochs,
+        steps_per_epoch=steps_per_epoch,
+        validation_steps=validation_steps,
+        callbacks=callbacks,
+        verbose=1 if is_chief else 2
+    )
+
+    if is_chief:
+        # Whole test set, outside the strategy (no other worker involved)
+        best = tf.keras.models.load_model(args.output)
+        eval_ds, _ = image_dataset(TEST_DIR, image_size=(48, 48), batch_size=64,
+                                   color_mode='grayscale', shuffle=False)
+        test_loss, test_accuracy = best.evaluate(eval_ds, verbose=0)
+        print(f"\nTest Loss: {test_loss:.4f}")
+        print(f"Test Accuracy: {test_accuracy*100:.2f}%")
+        print(f"✓ Best model saved to: {args.output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=0,
+                        help='Launch this many localhost workers (default: run as one worker)')
+    parser.add_argument('--epochs', type=int, default=50)
+    parser.add_argument('--batch-size', type=int, default=64, help='Images per step per worker')
+    parser.add_argument('--learning-rate', type=float, default=0.001)
+    parser.add_argument('--output', default='models/fer_model_distributed.h5')
+    args = parser.parse_args()
+
+    if args.workers > 0 and 'TF_CONFIG' not in os.environ:
+        print("=" * 60)
+        print(f"Distributed Training - {args.workers} local workers")
+        print("=" * 60)
+        # Same command line minus --workers
+        worker_args, skip = [], False
+        for arg in sys.argv:
+            if skip or arg.startswith('--workers='):
+                skip = False
+            elif arg == '--workers':
+                skip = True
+            else:
+                worker_args.append(arg)
+        exit_code = launch_local_workers(worker_args, args.workers)
+        if exit_code != 0:
+            print(f"\n✗ Training failed (logs in {LOG_DIR}/)")
+            sys.exit(exit_code)
+        summarize_run(args.workers)
+        print("\n✓ Distributed training complete!")
+        return
+
+    run_worker(args)
+
+
+if __name__ == '__main__':
+    main()
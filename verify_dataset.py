@@ -1,31 +1,42 @@
-import os
+"""
+Verify the FER2013 dataset before training
+Decodes every image (changed files only on re-runs) and reports class
+counts, image sizes, corrupt files and duplicates.
+
+Usage:
+    python verify_dataset.py [--full] [--root data/fer2013]
+"""
+
+import sys
+import argparse
+
+sys.path.append('src')
+
+from dataset_verify import verify_dataset, print_report
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--root', default='data/fer2013')
+parser.add_argument('--full', action='store_true', help='Re-check unchanged files too')
+args = parser.parse_args()
 
 # Check dataset structure
-base_path = 'data/fer2013'
+base_path = args.root
 emotions = ['angry', 'disgust', 'fear', 'happy', 'neutral', 'sad', 'surprise']
 
 print("=" * 50)
 print("FER2013 Dataset Verification")
 print("=" * 50)
 
+report = verify_dataset(base_path, full=args.full)
+ok = print_report(report, expected_classes=emotions)
+
 for split in ['train', 'test']:
-    print(f"\n{split.upper()} SET:")
-    split_path = os.path.join(base_path, split)
-    
-    if not os.path.exists(split_path):
-        print(f"  ❌ {split} folder not found!")
-        continue
-    
-    total_images = 0
-    for emotion in emotions:
-        emotion_path = os.path.join(split_path, emotion)
-        if os.path.exists(emotion_path):
-            count = len([f for f in os.listdir(emotion_path) if f.endswith(('.jpg', '.png'))])
-            total_images += count
-            print(f"  ✓ {emotion:10s}: {count:5d} images")
-        else:
-            print(f"  ❌ {emotion:10s}: folder not found")
-    
-    print(f"  Total: {total_images} images")
-
-print("\n" + "=" * 50)
\ No newline at end of file
+    if split not in report['counts']:
+        print(f"\n❌ {split} folder not found or empty!")
+        ok = False
+
+print("\n" + "=" * 50)
+if not ok:
+    print("❌ Fix the issues above before training")
+    sys.exit(1)
+print("✓ Dataset OK")
@@ -1,8 +1,14 @@
 """
 Verify RAF-DB dataset structure before training
+Every organized image is decode-checked (changed files only on re-runs).
 """
 
 import os
+import sys
+
+sys.path.append('src')
+
+from dataset_verify import verify_dataset, print_report
 
 print("=" * 70)
 print("RAF-DB Dataset Verification")
@@ -37,41 +43,8 @@ if not os.path.exists(rafdb_path):
     print("\nRun: python organize_rafdb.py")
 else:
     print(f"✓ Found: {rafdb_path}")
-    
-    for split in ['train', 'test']:
-        print(f"\n{split.upper()}:")
-        split_path = os.path.join(rafdb_path, split)
-        
-        if not os.path.exists(split_path):
-            print(f"  ❌ Missing {split} folder")
-            continue
-        
-        total = 0
-        missing = []
-        
-        for emotion in expected_emotions:
-            emotion_path = os.path.join(split_path, emotion)
-            if os.path.exists(emotion_path):
-                count = len([f for f in os.listdir(emotion_path) 
-                            if f.lower().endswith(('.jpg', '.jpeg', '.png'))])
-                total += count
-                status = "✓" if count > 0 else "⚠"
-                print(f"  {status} {emotion:10s}: {count:5d} images")
-                
-                if count == 0:
-                    missing.append(emotion)
-            else:
-                print(f"  ❌ {emotion:10s}: folder missing")
-                missing.append(emotion)
-        
-        print(f"  {'='*20}")
-        print(f"  {'TOTAL':10s}: {total:5d} images")
-        
-        if missing:
-            print(f"  ⚠ Missing/empty: {', '.join(missing)}")
-        
-        if total == 0:
-            print(f"\n  ❌ ERROR: No images found in {split}!")
+    report = verify_dataset(rafdb_path)
+    images_ok = print_report(report, expected_classes=expected_emotions)
 
 # Check if ready for training
 print("\n" + "=" * 70)
@@ -86,38 +59,16 @@ if not os.path.exists(rafdb_path):
     print("   Run: python organize_rafdb.py")
     ready = False
 else:
-    # Check train folder
-    train_path = os.path.join(rafdb_path, 'train')
-    if os.path.exists(train_path):
-        train_count = sum([len([f for f in os.listdir(os.path.join(train_path, emotion))
-                               if f.lower().endswith(('.jpg', '.jpeg', '.png'))])
-                          for emotion in expected_emotions
-                          if os.path.exists(os.path.join(train_path, emotion))])
-        
-        if train_count > 0:
-            print(f"✓ Train set ready: {train_count} images")
+    for split in ['train', 'test']:
+        count = sum(report['counts'].get(split, {}).values())
+        if count > 0:
+            print(f"✓ {split.capitalize()} set ready: {count} images")
         else:
-            print("❌ Train set empty")
+            print(f"❌ {split.capitalize()} set missing or empty")
             ready = False
-    else:
-        print("❌ Train folder missing")
-        ready = False
     
-    # Check test folder
-    test_path = os.path.join(rafdb_path, 'test')
-    if os.path.exists(test_path):
-        test_count = sum([len([f for f in os.listdir(os.path.join(test_path, emotion))
-                              if f.lower().endswith(('.jpg', '.jpeg', '.png'))])
-                         for emotion in expected_emotions
-                         if os.path.exists(os.path.join(test_path, emotion))])
-        
-        if test_count > 0:
-            print(f"✓ Test set ready: {test_count} images")
-        else:
-            print("❌ Test set empty")
-            ready = False
-    else:
-        print("❌ Test folder missing")
+    if not images_ok:
+        print(f"❌ {len(report['corrupt'])} corrupt images (remove or replace them)")
         ready = False
 
 # Check prerequisite model